@@ -1,3 +1,3 @@
-from . import admin, games, people
+from . import admin, changes, games, links, metrics, people
 
-__all__ = ["admin", "games", "people"]
+__all__ = ["admin", "changes", "games", "links", "metrics", "people"]
@@ -1,14 +1,69 @@
-from typing import Optional
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, Query, Request
 
 from ..services import admin_service
-from ..core.security import require_master
+from ..core.concurrency import run_blocking
+from ..core.security import require_configured_master, require_master
+from .routing import ProfiledRoute
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=ProfiledRoute)
 
 
 @router.get("/export")
-def export_state(x_master_password: Optional[str] = Header(None)):
+def export_state(
+  format: str = Query("json", pattern="^(json|ndjson)$"),
+  gzip: bool = Query(False),
+  x_master_password: Optional[str] = Header(None),
+):
   require_master(x_master_password)
-  return admin_service.export_state()
+  return admin_service.export_state(format, gzip)
+
+
+@router.post("/import")
+async def import_state(
+  request: Request,
+  mode: str = Query("merge", pattern="^(merge|replace)$"),
+  x_master_password: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+  """Body: an export file as-is (JSON or NDJSON, optionally gzipped)."""
+  require_configured_master(x_master_password)
+  # Spool the upload to disk so large imports never sit in memory.
+  fd, path = tempfile.mkstemp(suffix=".import")
+  try:
+    with os.fdopen(fd, "wb") as spool:
+      async for chunk in request.stream():
+        await run_blocking(spool.write, chunk)
+    return await run_blocking(admin_service.import_state, path, mode)
+  finally:
+    os.remove(path)
+
+
+@router.get("/profiles")
+def list_profiles(x_master_password: Optional[str] = Header(None)) -> List[Dict[str, Any]]:
+  require_master(x_master_password)
+  return admin_service.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+  profile_id: str,
+  format: str = Query("pstats", pattern="^(pstats|collapsed)$"),
+  x_master_password: Optional[str] = Header(None),
+):
+  require_master(x_master_password)
+  return admin_service.download_profile(profile_id, format)
+
+
+@router.get("/backup")
+def backup_status(x_master_password: Optional[str] = Header(None)) -> Dict[str, Any]:
+  require_master(x_master_password)
+  return admin_service.backup_status()
+
+
+@router.post("/backup")
+def run_backup(x_master_password: Optional[str] = Header(None)) -> Dict[str, Any]:
+  require_master(x_master_password)
+  return admin_service.run_backup()
@@ -0,0 +1,19 @@
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, Query
+
+from ..services import changes_service
+from ..core.security import require_master
+from .routing import ProfiledRoute
+
+router = APIRouter(prefix="/api/changes", tags=["changes"], route_class=ProfiledRoute)
+
+
+@router.get("")
+def list_changes(
+  since: Optional[int] = Query(None),
+  limit: int = Query(changes_service.MAX_CHANGES, ge=1, le=changes_service.MAX_CHANGES),
+  x_master_password: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+  require_master(x_master_password)
+  return changes_service.list_changes(since, limit)
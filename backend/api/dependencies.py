@@ -0,0 +1,19 @@
+from typing import Optional
+
+from fastapi import Header
+
+from ..core.etags import parse_if_match
+from ..core.security import AdminCredentials
+
+
+def admin_credentials(
+  x_admin_password: Optional[str] = Header(None),
+  x_admin_session: Optional[str] = Header(None),
+) -> AdminCredentials:
+  """Admin routes accept the game password or a session token from POST /{game_id}/session."""
+  return AdminCredentials(password=x_admin_password, session=x_admin_session)
+
+
+def expected_revision(if_match: Optional[str] = Header(None)) -> Optional[int]:
+  """Game revision the client last saw (If-Match: "<revision>"); None = unconditional."""
+  return parse_if_match(if_match)
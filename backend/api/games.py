@@ -1,6 +1,8 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
 
-from fastapi import APIRouter, Header, Request
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from ..models import (
   CreateGameRequest,
@@ -14,11 +16,50 @@ from ..models import (
   RevealResponse,
   WishListItemRequest,
 )
-from ..services import games_service
+from ..services import events_service, games_service
+from ..core.concurrency import run_blocking
+from ..core.etags import etag_matches, format_etag
+from ..core.security import AdminCredentials
+from .dependencies import admin_credentials, expected_revision
+from .routing import ProfiledRoute
 from ..core.errors import app_error
 from ..core.error_codes import ErrorCode
 
-router = APIRouter(prefix="/api/games", tags=["games"])
+T = TypeVar("T")
+
+router = APIRouter(prefix="/api/games", tags=["games"], route_class=ProfiledRoute)
+
+
+# Browsers may keep these reads but must revalidate them (If-None-Match) every time.
+REVALIDATE = "private, no-cache"
+
+
+def _tagged(
+  request: Request,
+  response: Response,
+  game_id: str,
+  build: Callable[[], T],
+  authorize: Callable[[], None],
+) -> Union[T, Response]:
+  """Build a game read and tag it with the game's revision as ETag.
+
+  If the client already holds the current revision (If-None-Match) the caller
+  is still authorized, but the body is never built: the answer is a bare 304.
+  The revision is read first, so a body is never older than its ETag; at worst
+  a client's If-Match is stale and its write gets a harmless 412.
+  """
+  revision = games_service.game_revision(game_id)
+  if revision is not None and etag_matches(request.headers.get("if-none-match"), revision):
+    authorize()
+    headers = {"ETag": format_etag(revision), "Cache-Control": REVALIDATE}
+    if "vary" in response.headers:
+      headers["Vary"] = response.headers["vary"]
+    return Response(status_code=304, headers=headers)
+  body = build()
+  if revision is not None:
+    response.headers["ETag"] = format_etag(revision)
+    response.headers["Cache-Control"] = REVALIDATE
+  return body
 
 
 @router.post("", status_code=201)
@@ -27,59 +68,124 @@ def create_game(request: Request, payload: CreateGameRequest) -> Dict[str, Any]:
   return games_service.create_game(payload, origin)
 
 
+@router.post("/{game_id}/session")
+def create_admin_session(game_id: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
+  return games_service.create_admin_session(game_id, x_admin_password)
+
+
 @router.get("/{game_id}")
-def get_game_status(game_id: str, x_admin_password: Optional[str] = Header(None)) -> GameStatusResponse:
-  return games_service.get_game_status(game_id, x_admin_password)
+def get_game_status(
+  game_id: str, request: Request, response: Response, admin: AdminCredentials = Depends(admin_credentials)
+) -> GameStatusResponse:
+  return _tagged(
+    request,
+    response,
+    game_id,
+    lambda: games_service.get_game_status(game_id, admin),
+    lambda: games_service.authorize_admin_read(game_id, admin),
+  )
+
+
+@router.get("/{game_id}/events")
+async def game_events(
+  game_id: str,
+  request: Request,
+  session: Optional[str] = Query(None),
+  admin: AdminCredentials = Depends(admin_credentials),
+) -> StreamingResponse:
+  """Server-Sent Events for the admin dashboard.
+
+  EventSource cannot send headers, so the admin session token may also be
+  passed as `?session=`. Browsers resend `Last-Event-ID` when reconnecting.
+  """
+  if session and not admin.session:
+    admin = AdminCredentials(password=admin.password, session=session)
+  admin_hash = await run_blocking(events_service.authorize_stream, game_id, admin)
+  stream = events_service.stream_events(
+    game_id, admin, admin_hash, request.headers.get("last-event-id"), request.is_disconnected
+  )
+  return StreamingResponse(
+    stream,
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+  )
 
 
 @router.get("")
-def list_games() -> List[GameSummary]:
-  return games_service.list_games()
+def list_games(
+  response: Response,
+  limit: int = Query(games_service.GAMES_PAGE_SIZE, ge=1, le=games_service.MAX_GAMES_PAGE_SIZE),
+  cursor: Optional[str] = Query(None),
+  active: Optional[bool] = Query(None),
+  any_revealed: Optional[bool] = Query(None),
+  title_prefix: Optional[str] = Query(None),
+) -> List[GameSummary]:
+  page, next_cursor = games_service.list_games(limit, cursor, active, any_revealed, title_prefix)
+  if next_cursor:
+    response.headers["X-Next-Cursor"] = next_cursor
+  return page
 
 
 @router.patch("/{game_id}")
-def update_game(game_id: str, payload: UpdateGameRequest, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.update_game(game_id, payload, x_admin_password)
+def update_game(
+  game_id: str,
+  payload: UpdateGameRequest,
+  admin: AdminCredentials = Depends(admin_credentials),
+  revision: Optional[int] = Depends(expected_revision),
+) -> Dict[str, Any]:
+  return games_service.update_game(game_id, payload, admin, revision)
 
 
 @router.delete("/{game_id}", status_code=204)
-def delete_game(game_id: str, x_admin_password: Optional[str] = Header(None)) -> None:
-  games_service.delete_game(game_id, x_admin_password)
+def delete_game(game_id: str, admin: AdminCredentials = Depends(admin_credentials)) -> None:
+  games_service.delete_game(game_id, admin)
 
 
 @router.post("/{game_id}/deactivate_game")
-def deactivate_game(game_id: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.set_game_active(game_id, x_admin_password, False)
+def deactivate_game(game_id: str, admin: AdminCredentials = Depends(admin_credentials)) -> Dict[str, Any]:
+  return games_service.set_game_active(game_id, admin, False)
 
 
 @router.post("/{game_id}/reactivate_game")
-def reactivate_game(game_id: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.set_game_active(game_id, x_admin_password, True)
+def reactivate_game(game_id: str, admin: AdminCredentials = Depends(admin_credentials)) -> Dict[str, Any]:
+  return games_service.set_game_active(game_id, admin, True)
 
 
 @router.get("/{game_id}/links")
-def get_links(game_id: str, request: Request, x_admin_password: Optional[str] = Header(None)) -> List[Dict[str, str]]:
+def get_links(game_id: str, request: Request, response: Response, admin: AdminCredentials = Depends(admin_credentials)) -> List[Dict[str, str]]:
   origin = request.headers.get("origin")
-  return games_service.get_links(game_id, x_admin_password, origin)
+  response.headers["Vary"] = "Origin"  # links are built from the caller's origin
+  return _tagged(
+    request,
+    response,
+    game_id,
+    lambda: games_service.get_links(game_id, admin, origin),
+    lambda: games_service.authorize_admin_read(game_id, admin),
+  )
 
 
 @router.post("/{game_id}/participants")
-def add_participants_disabled(game_id: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
+def add_participants_disabled(game_id: str, admin: AdminCredentials = Depends(admin_credentials)) -> Dict[str, Any]:
   raise app_error(400, ErrorCode.FEATURE_DISABLED, "Adding by names is disabled; use /participants/by_ids")
 
 
 @router.post("/{game_id}/participants/by_ids")
-def add_participants_by_ids(game_id: str, payload: AddParticipantsByIdsRequest, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.add_participants_by_ids(game_id, payload, x_admin_password)
+def add_participants_by_ids(game_id: str, payload: AddParticipantsByIdsRequest, admin: AdminCredentials = Depends(admin_credentials)) -> Dict[str, Any]:
+  return games_service.add_participants_by_ids(game_id, payload, admin)
 
 
 @router.delete("/{game_id}/participants/{participant_id}", status_code=204)
-def remove_participant(game_id: str, participant_id: str, x_admin_password: Optional[str] = Header(None)) -> None:
-  games_service.remove_participant(game_id, participant_id, x_admin_password)
+def remove_participant(game_id: str, participant_id: str, admin: AdminCredentials = Depends(admin_credentials)) -> None:
+  games_service.remove_participant(game_id, participant_id, admin)
 
 
 @router.post("/{game_id}/draw")
-async def draw_assignments(game_id: str, request: Request, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
+async def draw_assignments(
+  game_id: str,
+  request: Request,
+  admin: AdminCredentials = Depends(admin_credentials),
+  revision: Optional[int] = Depends(expected_revision),
+) -> Dict[str, Any]:
   data: Dict[str, Any] = {}
   try:
     incoming = await request.json()
@@ -87,23 +193,32 @@ async def draw_assignments(game_id: str, request: Request, x_admin_password: Opt
       data = incoming
   except Exception:
     data = {}
-  payload = DrawRequest(**data) if data else DrawRequest()
-  return games_service.draw_assignments(game_id, payload, x_admin_password)
+  try:
+    payload = DrawRequest(**data)
+  except ValidationError as exc:
+    raise app_error(400, ErrorCode.INVALID_REQUEST_BODY, str(exc))
+  return await run_blocking(games_service.draw_assignments, game_id, payload, admin, revision)
 
 
 @router.post("/{game_id}/{token}/deactivate")
-def deactivate_token(game_id: str, token: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.set_token_active(game_id, token, x_admin_password, False)
+def deactivate_token(game_id: str, token: str, admin: AdminCredentials = Depends(admin_credentials)) -> Dict[str, Any]:
+  return games_service.set_token_active(game_id, token, admin, False)
 
 
 @router.post("/{game_id}/{token}/reactivate")
-def reactivate_token(game_id: str, token: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.set_token_active(game_id, token, x_admin_password, True)
+def reactivate_token(game_id: str, token: str, admin: AdminCredentials = Depends(admin_credentials)) -> Dict[str, Any]:
+  return games_service.set_token_active(game_id, token, admin, True)
 
 
 @router.get("/{game_id}/{token}")
-def participant_preview(game_id: str, token: str) -> ParticipantPreviewResponse:
-  return games_service.participant_preview(game_id, token)
+def participant_preview(game_id: str, token: str, request: Request, response: Response) -> ParticipantPreviewResponse:
+  return _tagged(
+    request,
+    response,
+    game_id,
+    lambda: games_service.participant_preview(game_id, token),
+    lambda: games_service.authorize_link_read(game_id, token),
+  )
 
 
 @router.post("/{game_id}/{token}/reveal")
@@ -112,35 +227,75 @@ def reveal_assignment(game_id: str, token: str) -> RevealResponse:
 
 
 @router.patch("/{game_id}/participants/{participant_id}")
-def rename_participant(game_id: str, participant_id: str, payload: UpdateParticipantRequest, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.rename_participant(game_id, participant_id, payload, x_admin_password)
+def rename_participant(
+  game_id: str,
+  participant_id: str,
+  payload: UpdateParticipantRequest,
+  admin: AdminCredentials = Depends(admin_credentials),
+  revision: Optional[int] = Depends(expected_revision),
+) -> Dict[str, Any]:
+  return games_service.rename_participant(game_id, participant_id, payload, admin, revision)
 
 
 @router.get("/{game_id}/participants/{participant_id}/wishlist")
-def get_participant_wishlist(game_id: str, participant_id: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.get_wish_list_admin(game_id, participant_id, x_admin_password)
+def get_participant_wishlist(
+  game_id: str,
+  participant_id: str,
+  request: Request,
+  response: Response,
+  admin: AdminCredentials = Depends(admin_credentials),
+) -> Dict[str, Any]:
+  return _tagged(
+    request,
+    response,
+    game_id,
+    lambda: games_service.get_wish_list_admin(game_id, participant_id, admin),
+    lambda: games_service.authorize_admin_read(game_id, admin),
+  )
 
 
 @router.post("/{game_id}/participants/{participant_id}/wishlist")
-def add_participant_wishlist_item(game_id: str, participant_id: str, payload: WishListItemRequest, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.add_wish_list_item_admin(game_id, participant_id, payload, x_admin_password)
+def add_participant_wishlist_item(
+  game_id: str,
+  participant_id: str,
+  payload: WishListItemRequest,
+  admin: AdminCredentials = Depends(admin_credentials),
+  revision: Optional[int] = Depends(expected_revision),
+) -> Dict[str, Any]:
+  return games_service.add_wish_list_item_admin(game_id, participant_id, payload, admin, revision)
 
 
 @router.delete("/{game_id}/participants/{participant_id}/wishlist/{item_id}")
-def remove_participant_wishlist_item(game_id: str, participant_id: str, item_id: str, x_admin_password: Optional[str] = Header(None)) -> Dict[str, Any]:
-  return games_service.remove_wish_list_item_admin(game_id, participant_id, item_id, x_admin_password)
+def remove_participant_wishlist_item(
+  game_id: str,
+  participant_id: str,
+  item_id: str,
+  admin: AdminCredentials = Depends(admin_credentials),
+  revision: Optional[int] = Depends(expected_revision),
+) -> Dict[str, Any]:
+  return games_service.remove_wish_list_item_admin(game_id, participant_id, item_id, admin, revision)
 
 
 @router.get("/{game_id}/{token}/wishlist")
-def get_wishlist_by_token(game_id: str, token: str) -> Dict[str, Any]:
-  return games_service.get_wish_list_by_token(game_id, token)
+def get_wishlist_by_token(game_id: str, token: str, request: Request, response: Response) -> Dict[str, Any]:
+  return _tagged(
+    request,
+    response,
+    game_id,
+    lambda: games_service.get_wish_list_by_token(game_id, token),
+    lambda: games_service.authorize_link_read(game_id, token),
+  )
 
 
 @router.post("/{game_id}/{token}/wishlist")
-def add_wishlist_item_by_token(game_id: str, token: str, payload: WishListItemRequest) -> Dict[str, Any]:
-  return games_service.add_wish_list_item_by_token(game_id, token, payload)
+def add_wishlist_item_by_token(
+  game_id: str, token: str, payload: WishListItemRequest, revision: Optional[int] = Depends(expected_revision)
+) -> Dict[str, Any]:
+  return games_service.add_wish_list_item_by_token(game_id, token, payload, revision)
 
 
 @router.delete("/{game_id}/{token}/wishlist/{item_id}")
-def remove_wishlist_item_by_token(game_id: str, token: str, item_id: str) -> Dict[str, Any]:
-  return games_service.remove_wish_list_item_by_token(game_id, token, item_id)
+def remove_wishlist_item_by_token(
+  game_id: str, token: str, item_id: str, revision: Optional[int] = Depends(expected_revision)
+) -> Dict[str, Any]:
+  return games_service.remove_wish_list_item_by_token(game_id, token, item_id, revision)
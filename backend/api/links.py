@@ -0,0 +1,21 @@
+from typing import Dict
+
+from fastapi import APIRouter, Request
+from fastapi.responses import RedirectResponse
+
+from ..services import games_service
+from .routing import ProfiledRoute
+
+router = APIRouter(tags=["links"], route_class=ProfiledRoute)
+
+
+@router.get("/api/t/{token}")
+def resolve_link(token: str, request: Request) -> Dict[str, str]:
+  origin = request.headers.get("origin")
+  return games_service.resolve_short_link(token, origin)
+
+
+@router.get("/t/{token}", response_class=RedirectResponse, status_code=307)
+def follow_link(token: str, request: Request) -> RedirectResponse:
+  origin = request.headers.get("origin")
+  return RedirectResponse(games_service.resolve_short_link(token, origin)["link"], status_code=307)
@@ -0,0 +1,21 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import PlainTextResponse
+
+from .. import metrics
+from ..core.errors import app_error
+from ..core.error_codes import ErrorCode
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def scrape(authorization: Optional[str] = Header(None)) -> PlainTextResponse:
+  """Prometheus scrape endpoint; set METRICS_TOKEN to require `Authorization: Bearer <token>`."""
+  token = os.getenv("METRICS_TOKEN")
+  if token and not hmac.compare_digest((authorization or "").encode(), f"Bearer {token}".encode()):
+    raise app_error(401, ErrorCode.INVALID_METRICS_TOKEN, "Invalid metrics token")
+  return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,16 +1,31 @@
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, Query, Response
 
 from ..models import Person, UpdateParticipantRequest, CreatePeopleRequest
 from ..services import people_service
+from .routing import ProfiledRoute
 
-router = APIRouter(prefix="/api/people", tags=["people"])
+router = APIRouter(prefix="/api/people", tags=["people"], route_class=ProfiledRoute)
 
 
 @router.get("")
-def list_people() -> List[Person]:
-  return people_service.list_people()
+def list_people(
+  response: Response,
+  limit: int = Query(people_service.PEOPLE_PAGE_SIZE, ge=1, le=people_service.MAX_PEOPLE_PAGE_SIZE),
+  cursor: Optional[str] = Query(None),
+  q: Optional[str] = Query(None, max_length=100),
+  active: Optional[bool] = Query(None),
+) -> List[Person]:
+  page, next_cursor = people_service.list_people(limit, cursor, q, active)
+  if next_cursor:
+    response.headers["X-Next-Cursor"] = next_cursor
+  return page
+
+
+@router.get("/{person_id}/games")
+def list_person_games(person_id: str, x_master_password: Optional[str] = Header(None)) -> List[Dict[str, Any]]:
+  return people_service.list_person_games(person_id, x_master_password)
 
 
 @router.post("")
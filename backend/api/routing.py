@@ -0,0 +1,54 @@
+import asyncio
+import hmac
+import os
+import time
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from ..profiling import collecting, profile_store, wrap_endpoint
+
+
+def _may_profile(request: Request) -> bool:
+  # Profiling is only offered when a master password is configured and sent.
+  if "x-profile" not in request.headers:
+    return False
+  expected = os.getenv("MASTER_ADMIN_PASSWORD")
+  provided = request.headers.get("x-master-password") or ""
+  return bool(expected) and hmac.compare_digest(provided.encode(), expected.encode())
+
+
+class ProfiledRoute(APIRoute):
+  """APIRoute that runs a request under the profiler when it asks for it with `X-Profile: 1`.
+
+  Sync handlers are profiled in the worker thread that runs them; async ones
+  through `run_blocking`. Other requests only pay for one header lookup.
+  """
+
+  def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+    if not asyncio.iscoroutinefunction(endpoint):
+      endpoint = wrap_endpoint(endpoint)
+    super().__init__(path, endpoint, **kwargs)
+
+  def get_route_handler(self) -> Callable[[Request], Any]:
+    handler = super().get_route_handler()
+
+    async def route_handler(request: Request) -> Response:
+      if not _may_profile(request):
+        return await handler(request)
+      started = time.perf_counter()
+      with collecting() as collector:
+        response = await handler(request)
+      profile_id = profile_store.save(
+        collector,
+        method=request.method,
+        path=request.url.path,
+        route=self.path,
+        status=response.status_code,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+      )
+      response.headers["X-Profile-Id"] = profile_id
+      return response
+
+    return route_handler
@@ -29,6 +29,7 @@ class GameRecord(TypedDict):
   active: bool
   assignment_version: int
   any_revealed: bool
+  revision: int  # bumped by storage on every commit that changes the game
   participants: List[ParticipantRecord]
 
 
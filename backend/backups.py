@@ -0,0 +1,191 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = "data-"
+BACKUP_SUFFIX = ".sqlite"
+
+
+class BackupService:
+    """Online SQLite snapshots taken off the request path.
+
+    A background thread copies the live database with `sqlite3.Connection.backup`
+    every `interval_seconds` and/or after `every_commits` commits, then keeps the
+    newest `keep` timestamped files in `directory` (default: <DATA_DIR>/backups).
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 3600,
+        every_commits: int = 0,
+        keep: int = 24,
+        directory: Optional[str] = None,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.every_commits = every_commits
+        self.keep = max(1, keep)
+        self._directory = directory
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._commits_since = 0
+        self._run_lock = threading.Lock()
+        self.last_backup_at: Optional[float] = None
+        self.last_backup_path: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "BackupService":
+        return cls(
+            interval_seconds=float(os.getenv("BACKUP_INTERVAL_SECONDS", "3600")),
+            every_commits=int(os.getenv("BACKUP_EVERY_COMMITS", "0")),
+            keep=int(os.getenv("BACKUP_KEEP", "24")),
+            directory=os.getenv("BACKUP_DIR") or None,
+        )
+
+    @property
+    def directory(self) -> str:
+        return self._directory or os.path.join(storage.DATA_DIR, "backups")
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0 or self.every_commits > 0
+
+    def start(self) -> None:
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping = False
+        storage.add_commit_listener(self._on_commit)
+        self._thread = threading.Thread(target=self._run, name="sqlite-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        storage.remove_commit_listener(self._on_commit)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+    def _on_commit(self, _: storage.CommitInfo) -> None:
+        with self._cond:
+            self._commits_since += 1
+            if self.every_commits and self._commits_since >= self.every_commits:
+                self._cond.notify_all()
+
+    def _due(self, started: float) -> bool:
+        if self.every_commits and self._commits_since >= self.every_commits:
+            return True
+        return self.interval_seconds > 0 and time.monotonic() - started >= self.interval_seconds
+
+    def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            with self._cond:
+                while not self._stopping and not self._due(started):
+                    timeout = None
+                    if self.interval_seconds > 0:
+                        timeout = max(0.0, self.interval_seconds - (time.monotonic() - started))
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("scheduled backup failed")
+
+    def run_once(self) -> str:
+        """Snapshot the database now and rotate old files; returns the new file path."""
+        with self._run_lock:
+            with self._cond:
+                self._commits_since = 0
+            directory = self.directory
+            os.makedirs(directory, exist_ok=True)
+            now = datetime.now(timezone.utc)
+            name = f"{BACKUP_PREFIX}{now.strftime('%Y%m%dT%H%M%S%fZ')}{BACKUP_SUFFIX}"
+            path = os.path.join(directory, name)
+            partial = path + ".partial"
+            try:
+                source = sqlite3.connect(storage.DB_PATH)
+                try:
+                    target = sqlite3.connect(partial)
+                    try:
+                        # Copy in steps so writers are never blocked for the whole file.
+                        source.backup(target, pages=1024)
+                    finally:
+                        target.close()
+                finally:
+                    source.close()
+                os.replace(partial, path)
+            except Exception as exc:
+                self.last_error = str(exc)
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+            self.last_backup_at = time.time()
+            self.last_backup_path = path
+            self.last_error = None
+            self._rotate(directory)
+            return path
+
+    def list_backups(self) -> List[str]:
+        directory = self.directory
+        if not os.path.isdir(directory):
+            return []
+        names = [
+            name
+            for name in os.listdir(directory)
+            if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)
+        ]
+        return sorted(names)
+
+    def _rotate(self, directory: str) -> None:
+        names = self.list_backups()
+        for name in names[: max(0, len(names) - self.keep)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                logger.warning("could not remove old backup %s", name)
+
+    def _latest_backup_time(self) -> Optional[float]:
+        if self.last_backup_at is not None:
+            return self.last_backup_at
+        names = self.list_backups()
+        if not names:
+            return None
+        try:
+            return os.path.getmtime(os.path.join(self.directory, names[-1]))
+        except OSError:
+            return None
+
+    def status(self) -> Dict[str, Any]:
+        latest = self._latest_backup_time()
+        age = None if latest is None else round(time.time() - latest, 3)
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval_seconds,
+            "every_commits": self.every_commits,
+            "keep": self.keep,
+            "directory": self.directory,
+            "last_backup_at": (
+                datetime.fromtimestamp(latest, timezone.utc).isoformat() if latest is not None else None
+            ),
+            "last_backup_age_seconds": age,
+            "last_backup_path": self.last_backup_path,
+            "last_error": self.last_error,
+            "commits_since_backup": self._commits_since,
+            "backups": self.list_backups(),
+        }
+
+
+backup_service = BackupService.from_env()
@@ -0,0 +1 @@
+"""Micro-benchmarks for backend hot paths (run with `python -m backend.benchmarks.<name>`)."""
@@ -0,0 +1,63 @@
+"""Time `derangement_assignment` with and without exclusion constraints.
+
+    python -m backend.benchmarks.derangement [--sizes 10,100,1000,5000] [--repeat 20]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from ..utils import derangement_assignment
+
+
+def _couples(ids: List[str]) -> List[Tuple[str, str]]:
+    pairs: List[Tuple[str, str]] = []
+    for i in range(0, len(ids) - 1, 2):
+        pairs += [(ids[i], ids[i + 1]), (ids[i + 1], ids[i])]
+    return pairs
+
+
+def _time(func, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        ids = [f"p{i}" for i in range(n)]
+        couples = _couples(ids)
+        previous = list(derangement_assignment(ids).items())
+        constrained = couples + previous
+        cases = {
+            "plain": lambda: derangement_assignment(ids),
+            "couples": lambda: derangement_assignment(ids, couples),
+            "couples+previous": lambda: derangement_assignment(ids, constrained),
+            "solver_only": lambda: derangement_assignment(ids, constrained, attempts=0),
+        }
+        for name, func in cases.items():
+            results.append({"n": n, "case": name, **_time(func, repeat)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    for row in run(sizes, args.repeat):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Reveals per second when every participant opens their link at once.
+
+    python -m backend.benchmarks.reveals [--participants 200] [--threads 16]
+
+Runs the burst with group commit disabled (one transaction per reveal) and
+enabled, against a throwaway database.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from .. import storage
+from ..models import CreateGameRequest, DrawRequest
+from ..services import games_service
+
+
+def _burst(participants: int, threads: int, max_batch: int, window_ms: float) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.close_pool()
+        storage.DATA_DIR = tmp
+        storage.JSON_FALLBACK = os.path.join(tmp, "data.json")
+        storage.DB_PATH = os.path.join(tmp, "data.sqlite")
+        storage.GROUP_COMMIT_MAX_BATCH = max_batch
+        storage.GROUP_COMMIT_WINDOW_MS = window_ms
+        names = [f"Player {i}" for i in range(participants)]
+        gid = games_service.create_game(
+            CreateGameRequest(title="Benchmark", admin_password="benchmark", participants=names)
+        )["game_id"]
+        games_service.draw_assignments(gid, DrawRequest(), "benchmark")
+        tokens = [p["token"] for p in storage.load_game(gid)["participants"]]
+        commits = []
+        storage.add_commit_listener(commits.append)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(lambda token: games_service.reveal_assignment(gid, token), tokens))
+            elapsed = time.perf_counter() - started
+        finally:
+            storage.remove_commit_listener(commits.append)
+            storage.close_pool()
+    return {
+        "max_batch": max_batch,
+        "window_ms": window_ms,
+        "reveals": participants,
+        "transactions": len(commits),
+        "seconds": round(elapsed, 4),
+        "reveals_per_second": round(participants / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--window-ms", type=float, default=storage.GROUP_COMMIT_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=max(2, storage.GROUP_COMMIT_MAX_BATCH))
+    args = parser.parse_args()
+    for max_batch in (1, args.max_batch):
+        print(json.dumps(_burst(args.participants, args.threads, max_batch, args.window_ms)))
+
+
+if __name__ == "__main__":
+    main()
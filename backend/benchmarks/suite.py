@@ -0,0 +1,264 @@
+"""Time the storage and service hot paths against synthetic states of several sizes.
+
+    python -m backend.benchmarks.suite [--scale small --scale medium=500x20x5x2000]
+        [--repeat 20] [--out results.json] [--baseline baseline.json] [--threshold 0.25]
+
+A scale is GAMESxPARTICIPANTSxWISHESxPEOPLE: games, participants per game,
+wish list items per participant and directory size. Each scale is generated in
+a throwaway database. Every case prints one JSON line; `--out` also writes the
+whole run as one JSON document, which a later run can take as `--baseline`.
+Cases whose median got slower than the baseline by more than `--threshold`
+(and by at least `--min-delta-ms`) are reported, and the exit status is 1.
+
+Synthetic games use the legacy sha256 admin hash so draw timings are not
+dominated by bcrypt; `create_game` still hashes with bcrypt, as in production.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .. import storage
+from ..models import CreateGameRequest, DrawRequest
+from ..services import games_service, people_service
+from ..utils import derangement_assignment, generate_token
+
+PRESETS = {
+    "small": "50x8x3x200",
+    "medium": "500x20x5x2000",
+    "large": "2000x30x10x10000",
+}
+BATCH_SIZE = 200  # games per transaction while generating
+PASSWORD = "benchmark"
+
+
+class Scale(NamedTuple):
+    name: str
+    games: int
+    participants: int
+    wishes: int
+    people: int
+
+
+def parse_scale(spec: str) -> Scale:
+    """`small`, `medium=500x20x5x2000` or a bare `500x20x5x2000`."""
+    name, _, sizes = spec.partition("=")
+    if not sizes:
+        sizes = PRESETS.get(name, name)
+    try:
+        games, participants, wishes, people = (int(n) for n in sizes.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected GAMESxPARTICIPANTSxWISHESxPEOPLE, got {spec!r}")
+    if games < 2 or participants < 2 or wishes < 0 or people < 0:
+        raise argparse.ArgumentTypeError(f"scale needs at least two games of two participants: {spec!r}")
+    return Scale(name, games, participants, wishes, people)
+
+
+def _active_game(i: int) -> bool:
+    return i % 5 != 0  # every fifth game is archived
+
+
+def _person(i: int) -> Dict[str, Any]:
+    return {"id": f"person-{i}", "name": f"Person {i:06d}", "active": i % 10 != 0}
+
+
+def _game(i: int, scale: Scale, created: datetime) -> Dict[str, Any]:
+    gid = f"g{i:06d}"
+    participants = []
+    for n in range(1, scale.participants + 1):
+        person = (i * scale.participants + n) % scale.people if scale.people else None
+        participants.append({
+            "id": f"p{n}",
+            "person_id": f"person-{person}" if person is not None and n % 2 else None,
+            "name": f"Player {n}",
+            "token": generate_token(16),
+            "assigned_to_participant_id": None,
+            "viewed": False,
+            "viewed_at": None,
+            "active": True,
+            "wish_list": [
+                {"id": f"w{n}-{w}", "title": f"Gift {w}", "price": "20", "url": None}
+                for w in range(scale.wishes)
+            ],
+        })
+    stamp = (created + timedelta(seconds=i)).isoformat()
+    return {
+        "game_id": gid,
+        "title": f"Game {i:06d}",
+        "admin_password_hash": "sha256:" + hashlib.sha256(PASSWORD.encode("utf-8")).hexdigest(),
+        "created_at": stamp,
+        "updated_at": stamp,
+        "active": _active_game(i),
+        "assignment_version": 0,
+        "any_revealed": False,
+        "participants": participants,
+    }
+
+
+def generate(scale: Scale) -> List[str]:
+    """Write the synthetic state for `scale` into the current database; returns the game ids."""
+    with storage.edit_state([], include_people=True) as state:
+        state["people"] = [_person(i) for i in range(scale.people)]  # type: ignore[assignment]
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    game_ids = []
+    for start in range(0, scale.games, BATCH_SIZE):
+        batch = [_game(i, scale, created) for i in range(start, min(scale.games, start + BATCH_SIZE))]
+        with storage.edit_state([g["game_id"] for g in batch], include_people=False) as state:
+            for game in batch:
+                state["games"][game["game_id"]] = game  # type: ignore[assignment]
+        game_ids += [g["game_id"] for g in batch]
+    return game_ids
+
+
+def _time(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Median, p95 and max of `repeat` calls in milliseconds, after one untimed warm-up."""
+    samples = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        if i:
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def _cases(scale: Scale, game_ids: List[str]) -> Dict[str, Any]:
+    """Case name -> callable, or (callable, setup) when state must be reset between calls."""
+    active = [gid for i, gid in enumerate(game_ids) if _active_game(i)]
+    middle = active[len(active) // 2]
+    drawn = active[-1]
+    names = [f"Player {n}" for n in range(1, scale.participants + 1)]
+    ids = [f"p{n}" for n in range(1, scale.participants + 1)]
+    edits = iter(range(1, 1 << 62))
+    tokens: List[str] = []
+
+    def edit_one_game() -> None:
+        with storage.edit_state([middle], include_people=False) as state:
+            state["games"][middle]["participants"][0]["name"] = f"Renamed {next(edits)}"
+
+    def next_token() -> None:
+        # Redraw (untimed) once every participant of the drawn game has revealed.
+        if not tokens:
+            games_service.draw_assignments(drawn, DrawRequest(force=True), PASSWORD)
+            tokens.extend(p["token"] for p in storage.load_game(drawn)["participants"])
+
+    return {
+        "load_state": (lambda: storage.load_state(), storage._cache.clear),
+        "load_state_cached": lambda: storage.load_state(),
+        "load_state_one_game": (lambda: storage.load_state([middle], include_people=False), storage._cache.clear),
+        "edit_state": edit_one_game,
+        "create_game": lambda: games_service.create_game(
+            CreateGameRequest(title="Benchmark", admin_password=PASSWORD, participants=names)
+        ),
+        "draw_assignments": lambda: games_service.draw_assignments(middle, DrawRequest(force=True), PASSWORD),
+        "reveal_assignment": (lambda: games_service.reveal_assignment(drawn, tokens.pop()), next_token),
+        "list_games": lambda: games_service.list_games(),
+        "list_games_title_prefix": lambda: games_service.list_games(title_prefix="Game 0001"),
+        "list_people": lambda: people_service.list_people(),
+        "list_people_search": lambda: people_service.list_people(q="person 0001"),
+        "derangement_assignment": lambda: derangement_assignment(ids),
+    }
+
+
+def run_scale(scale: Scale, repeat: int, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.close_pool()
+        storage._cache.clear()
+        storage.DATA_DIR = tmp
+        storage.JSON_FALLBACK = os.path.join(tmp, "data.json")
+        storage.DB_PATH = os.path.join(tmp, "data.sqlite")
+        try:
+            started = time.perf_counter()
+            game_ids = generate(scale)
+            results: Dict[str, Any] = {"generate_s": round(time.perf_counter() - started, 3), "cases": {}}
+            for name, case in _cases(scale, game_ids).items():
+                if only and name not in only:
+                    continue
+                func, setup = case if isinstance(case, tuple) else (case, None)
+                results["cases"][name] = _time(func, repeat, setup)
+        finally:
+            storage.close_pool()
+            storage._cache.clear()
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta_ms: float) -> List[Dict[str, Any]]:
+    """Cases present in both runs, with the change of their median; slow ones flagged."""
+    rows = []
+    for scale, result in current["results"].items():
+        before = baseline.get("results", {}).get(scale)
+        if before is None:
+            continue
+        if before.get("scale") != result["scale"]:
+            continue  # same name, different sizes: not comparable
+        for name, timing in result["cases"].items():
+            old = before["cases"].get(name)
+            if old is None:
+                continue
+            delta = timing["median_ms"] - old["median_ms"]
+            change = delta / old["median_ms"] if old["median_ms"] else 0.0
+            rows.append({
+                "scale": scale,
+                "case": name,
+                "baseline_ms": old["median_ms"],
+                "median_ms": timing["median_ms"],
+                "change": round(change, 3),
+                "regression": change > threshold and delta >= min_delta_ms,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=parse_scale, action="append", help="preset name or NAME=GxPxWxN (repeatable)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--case", action="append", help="only run these cases (repeatable)")
+    parser.add_argument("--out", help="write the run as a JSON document")
+    parser.add_argument("--baseline", help="JSON document of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed median slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    scales = args.scale or [parse_scale("small"), parse_scale("medium")]
+    run: Dict[str, Any] = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for scale in scales:
+        result = run_scale(scale, max(1, args.repeat), args.case)
+        run["results"][scale.name] = {"scale": scale._asdict(), **result}
+        for name, timing in result["cases"].items():
+            print(json.dumps({"scale": scale.name, "case": name, **timing}))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(run, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        rows = compare(run, baseline, args.threshold, args.min_delta_ms)
+        for row in rows:
+            print(json.dumps(row))
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            parser.exit(1, f"{len(regressions)} case(s) slower than the baseline\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from .. import profiling
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+  global _executor
+  with _executor_lock:
+    if _executor is None:
+      workers = int(os.getenv("BLOCKING_WORKERS", "8"))
+      _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="blocking")
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+  """Run blocking service work (locks, bcrypt, SQLite) off the event loop.
+
+  Async routes must go through this instead of calling services directly; the
+  pool is bounded by BLOCKING_WORKERS and the caller's context variables follow
+  the call into the worker thread.
+  """
+  loop = asyncio.get_running_loop()
+  call = functools.partial(contextvars.copy_context().run, profiling.wrap_call(func), *args, **kwargs)
+  return await loop.run_in_executor(_get_executor(), call)
+
+
+def shutdown_executor() -> None:
+  """Stop the worker pool (application shutdown); a new one is created on next use."""
+  global _executor
+  with _executor_lock:
+    executor, _executor = _executor, None
+  if executor is not None:
+    executor.shutdown(wait=True)
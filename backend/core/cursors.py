@@ -0,0 +1,22 @@
+import base64
+import json
+from typing import List, Optional
+
+
+def encode_cursor(values: List[str]) -> str:
+  """Opaque, URL-safe page cursor holding the sort key of the last row served."""
+  raw = json.dumps(values, separators=(",", ":")).encode()
+  return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[str]]:
+  """Inverse of `encode_cursor`; raises ValueError for anything we did not issue."""
+  if not cursor:
+    return None
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+  except (ValueError, TypeError) as exc:
+    raise ValueError("malformed cursor") from exc
+  if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+    raise ValueError("malformed cursor")
+  return values
@@ -4,6 +4,7 @@ from enum import Enum
 class ErrorCode(str, Enum):
   MISSING_ADMIN_PASSWORD = "missing_admin_password"
   INVALID_ADMIN_PASSWORD = "invalid_admin_password"
+  INVALID_ADMIN_SESSION = "invalid_admin_session"
   GAME_NOT_FOUND = "game_not_found"
   PERSON_NOT_FOUND = "person_not_found"
   PARTICIPANT_NOT_FOUND = "participant_not_found"
@@ -19,11 +20,19 @@ class ErrorCode(str, Enum):
   ASSIGNMENT_NOT_READY = "assignment_not_ready"
   ASSIGNMENT_ALREADY_VIEWED = "assignment_already_viewed"
   INVALID_ASSIGNMENT_STATE = "invalid_assignment_state"
+  DRAW_IMPOSSIBLE = "draw_impossible"
+  REVISION_MISMATCH = "revision_mismatch"
+  CURSOR_EXPIRED = "cursor_expired"
+  INVALID_CURSOR = "invalid_cursor"
+  INVALID_IMPORT = "invalid_import"
+  INVALID_METRICS_TOKEN = "invalid_metrics_token"
+  PROFILE_NOT_FOUND = "profile_not_found"
   NAME_REQUIRED = "name_required"
   NAME_DUPLICATE = "name_duplicate"
   FEATURE_DISABLED = "feature_disabled"
   MISSING_MASTER_PASSWORD = "missing_master_password"
   INVALID_MASTER_PASSWORD = "invalid_master_password"
+  MASTER_PASSWORD_NOT_CONFIGURED = "master_password_not_configured"
   INVALID_PAYLOAD_BYTES = "invalid_payload_bytes"
   INVALID_REQUEST_BODY = "invalid_request_body"
   INVALID_PEOPLE_REQUEST = "invalid_people_request"
@@ -0,0 +1,40 @@
+from typing import Optional
+
+
+def format_etag(revision: int) -> str:
+  """Strong ETag for a game revision."""
+  return f'"{int(revision)}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+  """Expected revision from an If-Match header.
+
+  `None` when the header is absent or `*` (no precondition). An ETag we did not
+  issue maps to -1, which never matches, so the write fails with 412.
+  """
+  if value is None or value.strip() in ("", "*"):
+    return None
+  first = value.split(",")[0].strip()
+  if first.startswith("W/"):
+    first = first[2:]
+  first = first.strip('"')
+  try:
+    return int(first)
+  except ValueError:
+    return -1
+
+
+def etag_matches(if_none_match: Optional[str], revision: int) -> bool:
+  """Weak comparison of an If-None-Match header against a revision's ETag."""
+  if not if_none_match:
+    return False
+  if if_none_match.strip() == "*":
+    return True
+  current = format_etag(revision)
+  for candidate in if_none_match.split(","):
+    candidate = candidate.strip()
+    if candidate.startswith("W/"):
+      candidate = candidate[2:]
+    if candidate == current:
+      return True
+  return False
@@ -1,10 +1,52 @@
+import time
+
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from .. import metrics, slowlog
+
 
 class NoStoreCacheMiddleware(BaseHTTPMiddleware):
-  """Avoid caching API responses to guarantee real-time state."""
+  """Avoid caching API responses to guarantee real-time state.
+
+  Routes that set their own Cache-Control keep it (ETag-tagged game reads use
+  `private, no-cache`); everything else, reveals included, stays `no-store`.
+  """
 
   async def dispatch(self, request, call_next):
     response = await call_next(request)
     response.headers.setdefault("Cache-Control", "no-store")
     return response
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+  """Count requests and time them per route template (`/api/games/{game_id}`), not per URL."""
+
+  async def dispatch(self, request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+      response = await call_next(request)
+      status = response.status_code
+      return response
+    finally:
+      route = request.scope.get("route")
+      template = getattr(route, "path", None) or "<unmatched>"
+      metrics.http_latency.observe(time.perf_counter() - started, method=request.method, route=template)
+      metrics.http_requests.inc(method=request.method, route=template, status=str(status))
+
+
+class SlowRequestMiddleware(BaseHTTPMiddleware):
+  """Log one JSON line with a per-phase breakdown for requests over SLOW_REQUEST_MS."""
+
+  async def dispatch(self, request, call_next):
+    with slowlog.span("request", slowlog.SLOW_REQUEST_MS, method=request.method, path=request.url.path) as span:
+      response = await call_next(request)
+      if span is not None:
+        route = request.scope.get("route")
+        span.fields.update(
+          route=getattr(route, "path", None),
+          game_id=request.scope.get("path_params", {}).get("game_id"),
+          status=response.status_code,
+          response_bytes=response.headers.get("content-length"),
+        )
+      return response
@@ -1,5 +1,10 @@
+import base64
+import hashlib
+import hmac
 import os
-from typing import Optional
+import secrets
+import time
+from typing import NamedTuple, Optional, Tuple, Union
 
 from .errors import app_error
 from .error_codes import ErrorCode
@@ -7,14 +12,100 @@ from ..utils import verify_password
 from ..app_types import AppState, GameRecord
 
 
-def require_admin(state: AppState, game_id: str, admin_password: Optional[str]) -> GameRecord:
-  """Ensure a valid admin password is provided for the given game."""
-  if not admin_password:
+class AdminCredentials(NamedTuple):
+  """What an admin request carried: the game password and/or a session token."""
+  password: Optional[str] = None
+  session: Optional[str] = None
+
+
+# Services accept a bare password string (tests, scripts) or the full credentials.
+AdminAuth = Union[str, AdminCredentials, None]
+
+_process_secret = secrets.token_bytes(32)
+
+
+def _session_secret() -> bytes:
+  # Set ADMIN_SESSION_SECRET when running several workers so they accept each other's tokens.
+  configured = os.getenv("ADMIN_SESSION_SECRET")
+  return configured.encode("utf-8") if configured else _process_secret
+
+
+def _session_ttl() -> int:
+  return int(os.getenv("ADMIN_SESSION_TTL_SECONDS", "3600"))
+
+
+def _session_signature(game_id: str, expires: int, password_hash: str) -> str:
+  # The current password hash is part of the signed message, so changing the
+  # password (or deleting the game) invalidates every outstanding token.
+  message = f"{game_id}.{expires}.{password_hash}".encode("utf-8")
+  digest = hmac.new(_session_secret(), message, hashlib.sha256).digest()
+  return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def issue_admin_session(game: GameRecord) -> Tuple[str, int]:
+  """Return a signed session token for `game` and its expiry (unix seconds)."""
+  expires = int(time.time()) + _session_ttl()
+  signature = _session_signature(game["game_id"], expires, game["admin_password_hash"])
+  return f"{game['game_id']}.{expires}.{signature}", expires
+
+
+def verify_admin_session(game: GameRecord, token: str) -> bool:
+  """Constant-time check of a session token issued by `issue_admin_session`."""
+  parts = token.split(".")
+  if len(parts) != 3 or not parts[1].isdigit():
+    return False
+  game_id, expires_raw, signature = parts
+  expires = int(expires_raw)
+  if game_id != game["game_id"] or expires < time.time():
+    return False
+  expected = _session_signature(game_id, expires, game["admin_password_hash"])
+  return hmac.compare_digest(expected.encode("ascii"), signature.encode("ascii", errors="replace"))
+
+
+def _split_auth(auth: AdminAuth) -> AdminCredentials:
+  if isinstance(auth, AdminCredentials):
+    return auth
+  return AdminCredentials(password=auth)
+
+
+def authenticate_admin(game: Optional[GameRecord], auth: AdminAuth) -> str:
+  """Verify admin credentials against a game read outside any write transaction.
+
+  A valid session token costs one HMAC; otherwise the password is checked with
+  bcrypt. Returns the hash that was checked so a later mutation can confirm it is
+  unchanged (see `require_verified_admin`) without re-verifying under a lock.
+  """
+  credentials = _split_auth(auth)
+  if not credentials.password and not credentials.session:
     raise app_error(401, ErrorCode.MISSING_ADMIN_PASSWORD, "Missing admin password")
+  if not game:
+    raise app_error(404, ErrorCode.GAME_NOT_FOUND, "Game not found")
+  if credentials.session:
+    if verify_admin_session(game, credentials.session):
+      return game["admin_password_hash"]
+    if not credentials.password:
+      raise app_error(401, ErrorCode.INVALID_ADMIN_SESSION, "Invalid or expired admin session")
+  if not verify_password(credentials.password or "", game["admin_password_hash"]):
+    raise app_error(401, ErrorCode.INVALID_ADMIN_PASSWORD, "Invalid admin password")
+  return game["admin_password_hash"]
+
+
+def require_admin(state: AppState, game_id: str, auth: AdminAuth) -> GameRecord:
+  """Ensure valid admin credentials are provided for the given game."""
+  credentials = _split_auth(auth)
+  if not credentials.password and not credentials.session:
+    raise app_error(401, ErrorCode.MISSING_ADMIN_PASSWORD, "Missing admin password")
+  game = state["games"].get(game_id)
+  authenticate_admin(game, credentials)
+  return game  # type: ignore[return-value]
+
+
+def require_verified_admin(state: AppState, game_id: str, verified_hash: str) -> GameRecord:
+  """Inside a transaction: check the credentials verified beforehand still match the game."""
   game = state["games"].get(game_id)
   if not game:
     raise app_error(404, ErrorCode.GAME_NOT_FOUND, "Game not found")
-  if not verify_password(admin_password, game["admin_password_hash"]):
+  if not hmac.compare_digest(game["admin_password_hash"].encode("utf-8"), verified_hash.encode("utf-8")):
     raise app_error(401, ErrorCode.INVALID_ADMIN_PASSWORD, "Invalid admin password")
   return game
 
@@ -28,3 +119,14 @@ def require_master(master_password: Optional[str]) -> None:
     raise app_error(401, ErrorCode.MISSING_MASTER_PASSWORD, "Missing master password")
   if master_password != expected:
     raise app_error(401, ErrorCode.INVALID_MASTER_PASSWORD, "Invalid master password")
+
+
+def require_configured_master(master_password: Optional[str]) -> None:
+  """Like `require_master`, but refuse outright when no master password is configured.
+
+  For operations too destructive or revealing to leave open on a default install
+  (imports, a person's draws).
+  """
+  if not os.getenv("MASTER_ADMIN_PASSWORD"):
+    raise app_error(403, ErrorCode.MASTER_PASSWORD_NOT_CONFIGURED, "Set MASTER_ADMIN_PASSWORD to enable this endpoint")
+  require_master(master_password)
@@ -0,0 +1,170 @@
+import asyncio
+import secrets
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from . import storage
+from .app_types import GameRecord
+
+RECENT_EVENTS = 256  # per game, for Last-Event-ID resume
+TRACKED_GAMES = 1024  # games whose recent events are kept
+
+
+class GameEvent(NamedTuple):
+    seq: int
+    id: str  # "<epoch>:<seq>", sent as the SSE id
+    type: str
+    data: Dict[str, Any]
+
+
+def game_events(before: Optional[GameRecord], after: Optional[GameRecord]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Dashboard-level changes between two committed versions of a game.
+
+    Assignments are never included: the organizer only learns who has looked.
+    """
+    if after is None:
+        return [("game.deleted", {})] if before is not None else []
+    if before is None:
+        return []
+    events: List[Tuple[str, Dict[str, Any]]] = []
+    if after.get("title") != before.get("title") or after.get("active") != before.get("active"):
+        events.append(("game.updated", {"title": after.get("title"), "active": after.get("active")}))
+    if after.get("assignment_version") != before.get("assignment_version"):
+        events.append(("draw.completed", {"assignment_version": after.get("assignment_version")}))
+    old = {p["id"]: p for p in before.get("participants", [])}
+    new = {p["id"]: p for p in after.get("participants", [])}
+    for pid, p in new.items():
+        prev = old.get(pid)
+        if prev is None:
+            events.append(("participant.added", {"participant_id": pid, "name": p["name"]}))
+            continue
+        if p.get("viewed") and not prev.get("viewed"):
+            events.append(
+                ("participant.viewed", {"participant_id": pid, "name": p["name"], "viewed_at": p.get("viewed_at")})
+            )
+        if p.get("active") != prev.get("active"):
+            kind = "participant.activated" if p.get("active") else "participant.deactivated"
+            events.append((kind, {"participant_id": pid, "name": p["name"]}))
+        if p.get("name") != prev.get("name"):
+            events.append(
+                ("participant.renamed", {"participant_id": pid, "name": p["name"], "previous_name": prev.get("name")})
+            )
+        if p.get("wish_list", []) != prev.get("wish_list", []):
+            events.append(
+                ("wishlist.changed", {"participant_id": pid, "item_count": len(p.get("wish_list") or [])})
+            )
+    for pid, prev in old.items():
+        if pid not in new:
+            events.append(("participant.removed", {"participant_id": pid, "name": prev["name"]}))
+    return events
+
+
+class _GameLog:
+    __slots__ = ("events", "floor")
+
+    def __init__(self, floor: int) -> None:
+        self.events: Deque[GameEvent] = deque(maxlen=RECENT_EVENTS)
+        # Every event with seq > floor is still in `events`.
+        self.floor = floor
+
+
+class Subscription:
+    """One stream's inbox; events are handed over to its event loop thread-safely."""
+
+    def __init__(self, game_id: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.game_id = game_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[GameEvent]" = asyncio.Queue()
+
+    def push(self, event: GameEvent) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+
+class EventHub:
+    """In-process pub/sub of game changes, fed by the storage commit hook.
+
+    Only games somebody has subscribed to are diffed and logged. Each process
+    has its own epoch, so a Last-Event-ID from before a restart (or from another
+    worker) is recognised as unresumable and the client is told to resync.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._logs: "OrderedDict[str, _GameLog]" = OrderedDict()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def start(self) -> None:
+        storage.add_commit_listener(self._on_commit)
+
+    def stop(self) -> None:
+        storage.remove_commit_listener(self._on_commit)
+
+    def _on_commit(self, info: storage.CommitInfo) -> None:
+        for gid, game in info.games.items():
+            with self._lock:
+                if gid not in self._logs:
+                    continue
+            changes = game_events(info.previous.get(gid), game)
+            if changes:
+                revision = game.get("revision") if game else None
+                self.publish(gid, [(kind, {"game_id": gid, "revision": revision, **data}) for kind, data in changes])
+
+    def publish(self, game_id: str, changes: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._lock:
+            log = self._logs.get(game_id)
+            if log is None:
+                return
+            self._logs.move_to_end(game_id)
+            fresh = []
+            for kind, data in changes:
+                self._seq += 1
+                if len(log.events) == log.events.maxlen:
+                    log.floor = log.events[0].seq
+                event = GameEvent(self._seq, f"{self._epoch}:{self._seq}", kind, data)
+                log.events.append(event)
+                fresh.append(event)
+            subscribers = list(self._subscribers.get(game_id, ()))
+        for sub in subscribers:
+            for event in fresh:
+                sub.push(event)
+
+    def subscribe(
+        self, game_id: str, loop: asyncio.AbstractEventLoop, last_event_id: Optional[str] = None
+    ) -> Tuple[Subscription, Optional[List[GameEvent]]]:
+        """Register a stream; returns it with the events it missed (None = cannot resume)."""
+        sub = Subscription(game_id, loop)
+        with self._lock:
+            log = self._logs.get(game_id)
+            if log is None:
+                log = self._logs[game_id] = _GameLog(self._seq)
+                self._evict()
+            self._logs.move_to_end(game_id)
+            self._subscribers.setdefault(game_id, set()).add(sub)
+            backlog: Optional[List[GameEvent]] = []
+            if last_event_id:
+                epoch, _, raw_seq = last_event_id.partition(":")
+                if epoch == self._epoch and raw_seq.isdigit() and int(raw_seq) >= log.floor:
+                    backlog = [e for e in log.events if e.seq > int(raw_seq)]
+                else:
+                    backlog = None
+        return sub, backlog
+
+    def _evict(self) -> None:
+        """Forget the least recently active logs nobody is watching (lock held)."""
+        idle = [gid for gid in self._logs if gid not in self._subscribers]
+        for gid in idle[: max(0, len(self._logs) - TRACKED_GAMES)]:
+            del self._logs[gid]
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.game_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.game_id]
+
+
+event_hub = EventHub()
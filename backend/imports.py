@@ -0,0 +1,318 @@
+"""Restore an export (`GET /api/admin/export`) into the database.
+
+    python -m backend.imports backup.ndjson.gz [--mode merge|replace]
+
+Accepts the JSON document or NDJSON export, optionally gzipped. The file is
+read twice as a stream: first to validate every record, then to write games in
+batched transactions, so neither pass holds more than one batch in memory.
+"""
+
+import argparse
+import gzip
+import io
+import json
+import re
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import storage
+
+IMPORT_MODES = ("merge", "replace")
+BATCH_SIZE = 200  # games per write transaction
+_READ_SIZE = 64 * 1024
+_NDJSON_START = re.compile(r'\s*\{\s*"type"\s*:')
+
+
+class ImportValidationError(ValueError):
+    """The file is not a valid export; nothing has been written."""
+
+
+class _Reader:
+    """Incremental JSON reader over a text stream (values are decoded one at a time)."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._stream = stream
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        # Read at least as much as is buffered so re-decoding a large value stays linear.
+        chunk = self._stream.read(max(_READ_SIZE, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def head(self) -> str:
+        if len(self._buf) - self._pos < _READ_SIZE:
+            self._fill()
+        return self._buf[self._pos:self._pos + _READ_SIZE]
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos:self._pos + 1]
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ImportValidationError(f"expected {char!r}, found {found or 'end of file'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as exc:
+                if self._fill():
+                    continue
+                raise ImportValidationError(f"invalid JSON: {exc.msg}") from exc
+            self._pos = end
+            return value
+
+    def line(self) -> Optional[str]:
+        while True:
+            end = self._buf.find("\n", self._pos)
+            if end >= 0:
+                line = self._buf[self._pos:end]
+                self._pos = end + 1
+                return line
+            if not self._fill():
+                if self._pos >= len(self._buf):
+                    return None
+                line = self._buf[self._pos:]
+                self._pos = len(self._buf)
+                return line
+
+
+def _document_records(reader: _Reader) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == "people":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield "person", reader.value()
+                    if reader.peek() == "]":
+                        reader.expect("]")
+                        break
+                    reader.expect(",")
+        elif key == "games":
+            reader.expect("{")
+            if reader.peek() == "}":
+                reader.expect("}")
+            else:
+                while True:
+                    gid = reader.value()
+                    reader.expect(":")
+                    game = reader.value()
+                    if isinstance(game, dict):
+                        game.setdefault("game_id", gid)
+                    yield "game", game
+                    if reader.peek() == "}":
+                        reader.expect("}")
+                        break
+                    reader.expect(",")
+        else:
+            reader.value()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
+
+
+def _ndjson_records(reader: _Reader) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    number = 0
+    while True:
+        line = reader.line()
+        if line is None:
+            return
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ImportValidationError(f"line {number}: invalid JSON: {exc.msg}") from exc
+        kind = entry.get("type") if isinstance(entry, dict) else None
+        if kind == "meta":
+            version = entry.get("schema_version")
+            if isinstance(version, int) and version > storage.SCHEMA_VERSION:
+                raise ImportValidationError(f"export is from a newer schema ({version})")
+            continue
+        if kind not in ("person", "game"):
+            raise ImportValidationError(f"line {number}: unknown record type {kind!r}")
+        yield kind, entry.get("data")
+
+
+@contextmanager
+def _open_records(path: str) -> Iterator[Iterator[Tuple[str, Dict[str, Any]]]]:
+    raw = open(path, "rb")
+    try:
+        compressed = raw.read(2) == b"\x1f\x8b"
+        raw.seek(0)
+        binary: IO[bytes] = gzip.GzipFile(fileobj=raw) if compressed else raw  # type: ignore[assignment]
+        reader = _Reader(io.TextIOWrapper(binary, encoding="utf-8"))
+        if _NDJSON_START.match(reader.head()):
+            yield _ndjson_records(reader)
+        else:
+            yield _document_records(reader)
+    except (OSError, UnicodeDecodeError, EOFError) as exc:
+        raise ImportValidationError(f"unreadable file: {exc}") from exc
+    finally:
+        raw.close()
+
+
+def _require(record: Dict[str, Any], field: str, where: str, kind: type = str) -> None:
+    value = record.get(field)
+    if not isinstance(value, kind) or (kind is str and not value.strip()):
+        raise ImportValidationError(f"{where}: `{field}` is missing or not a {kind.__name__}")
+
+
+def _check_person(person: Any, where: str) -> None:
+    if not isinstance(person, dict):
+        raise ImportValidationError(f"{where}: person must be an object")
+    _require(person, "id", where)
+    _require(person, "name", where)
+
+
+def _check_game(game: Any, where: str) -> None:
+    if not isinstance(game, dict):
+        raise ImportValidationError(f"{where}: game must be an object")
+    for field in ("game_id", "title", "admin_password_hash", "created_at"):
+        _require(game, field, where)
+    _require(game, "participants", where, list)
+    ids: Set[str] = set()
+    for participant in game["participants"]:
+        if not isinstance(participant, dict):
+            raise ImportValidationError(f"{where}: participant must be an object")
+        for field in ("id", "name", "token"):
+            _require(participant, field, where)
+        if participant["id"] in ids:
+            raise ImportValidationError(f"{where}: duplicate participant id {participant['id']!r}")
+        ids.add(participant["id"])
+        items = participant.get("wish_list") or []
+        if not isinstance(items, list) or not all(
+            isinstance(i, dict) and isinstance(i.get("id"), str) and i["id"] for i in items
+        ):
+            raise ImportValidationError(f"{where}: invalid wish list for {participant['id']!r}")
+        if len({i["id"] for i in items}) != len(items):
+            raise ImportValidationError(f"{where}: duplicate wish list item id for {participant['id']!r}")
+    for participant in game["participants"]:
+        target = participant.get("assigned_to_participant_id")
+        if target is not None and target not in ids:
+            raise ImportValidationError(f"{where}: {participant['id']!r} is assigned to unknown {target!r}")
+
+
+def validate_file(path: str) -> Tuple[int, Set[str]]:
+    """Check every record; returns (people count, imported game ids)."""
+    people: Set[str] = set()
+    games: Set[str] = set()
+    with _open_records(path) as records:
+        for number, (kind, record) in enumerate(records, start=1):
+            where = f"record {number}"
+            if kind == "person":
+                _check_person(record, where)
+                if record["id"] in people:
+                    raise ImportValidationError(f"{where}: duplicate person id {record['id']!r}")
+                people.add(record["id"])
+            else:
+                _check_game(record, where)
+                if record["game_id"] in games:
+                    raise ImportValidationError(f"{where}: duplicate game id {record['game_id']!r}")
+                games.add(record["game_id"])
+    return len(people), games
+
+
+def _write_games(batch: Dict[str, Dict[str, Any]]) -> int:
+    with storage.edit_state(list(batch), include_people=False) as state:
+        for gid, game in batch.items():
+            current = state["games"].get(gid)
+            game = dict(game)
+            # Revisions stay this database's own counter; identical games are left untouched.
+            game["revision"] = current.get("revision", 0) if current else 0
+            state["games"][gid] = game  # type: ignore[assignment]
+    return len(batch)
+
+
+def _write_people(people: List[Dict[str, Any]], mode: str) -> None:
+    with storage.edit_state([], include_people=True) as state:
+        if mode == "replace":
+            state["people"] = people  # type: ignore[assignment]
+            return
+        by_id = {p["id"]: p for p in state["people"]}
+        for person in people:
+            if person["id"] in by_id:
+                by_id[person["id"]].update(person)
+            else:
+                state["people"].append(person)  # type: ignore[arg-type]
+
+
+def import_file(path: str, mode: str = "merge", batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """Validate then write an export file.
+
+    `merge` upserts the file's people and games and keeps everything else;
+    `replace` also deletes games and people that are not in the file. Games are
+    written `batch_size` per transaction, so a failure while writing (not while
+    validating) can leave a partial import behind; re-running it is safe.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"mode must be one of {IMPORT_MODES}")
+    _, game_ids = validate_file(path)
+    people: List[Dict[str, Any]] = []
+    batch: Dict[str, Dict[str, Any]] = {}
+    written = 0
+    with _open_records(path) as records:
+        for kind, record in records:
+            if kind == "person":
+                people.append({"id": record["id"], "name": record["name"], "active": bool(record.get("active", True))})
+                continue
+            batch[record["game_id"]] = record
+            if len(batch) >= batch_size:
+                written += _write_games(batch)
+                batch = {}
+    if batch:
+        written += _write_games(batch)
+    if people or mode == "replace":
+        _write_people(people, mode)
+    deleted = 0
+    if mode == "replace":
+        stale = [gid for gid in storage.list_game_ids() if gid not in game_ids]
+        for start in range(0, len(stale), batch_size):
+            chunk = stale[start:start + batch_size]
+            with storage.edit_state(chunk, include_people=False) as state:
+                for gid in chunk:
+                    state["games"].pop(gid, None)
+            deleted += len(chunk)
+    return {"mode": mode, "people": len(people), "games": written, "deleted_games": deleted}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--mode", choices=IMPORT_MODES, default="merge")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    try:
+        summary = import_file(args.path, args.mode, max(1, args.batch_size))
+    except ImportValidationError as exc:
+        parser.exit(1, f"import rejected: {exc}\n")
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
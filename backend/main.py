@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from typing import Any
 
 from fastapi import FastAPI, Request
@@ -7,16 +8,32 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
-from .api import admin, games, people
-from .core.middleware import NoStoreCacheMiddleware
+from .api import admin, changes, games, links, metrics, people
+from .core.concurrency import shutdown_executor
+from .core.middleware import MetricsMiddleware, NoStoreCacheMiddleware, SlowRequestMiddleware
+from . import storage
+from .backups import backup_service
+from .events import event_hub
 
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+  backup_service.start()
+  event_hub.start()
+  yield
+  event_hub.stop()
+  backup_service.stop()
+  shutdown_executor()
+  storage.close_pool()
+
+
 # App wiring follows this order:
 #  1. load routers (backend/api) -> 2. services -> 3. repositories -> 4. storage/validators
 # This keeps FastAPI concerns separated from business logic (SOLID-friendly).
-app = FastAPI(title="Secret Friend API")
+app = FastAPI(title="Secret Friend API", lifespan=lifespan)
 
 origins = os.getenv("FRONTEND_ORIGINS", "http://localhost:5173").split(",")
 app.add_middleware(
@@ -25,12 +42,18 @@ app.add_middleware(
   allow_credentials=True,
   allow_methods=["*"],
   allow_headers=["*"],
+  expose_headers=["ETag", "X-Next-Cursor", "X-Profile-Id"],
 )
 app.add_middleware(NoStoreCacheMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(SlowRequestMiddleware)
 
 app.include_router(games.router)
 app.include_router(people.router)
 app.include_router(admin.router)
+app.include_router(links.router)
+app.include_router(changes.router)
+app.include_router(metrics.router)
 
 
 def _safe(obj: Any):
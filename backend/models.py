@@ -106,6 +106,16 @@ class AddParticipantsByIdsRequest(BaseModel):
 
 class DrawRequest(BaseModel):
     force: bool = False
+    # Pairs of participant ids that must not draw each other (either way).
+    exclusions: List[List[str]] = Field(default_factory=list)
+    # Forbid everyone from drawing the same person as in the current draw.
+    avoid_previous: bool = False
+
+    @validator("exclusions")
+    def check_exclusion_pairs(cls, v: List[List[str]]) -> List[List[str]]:
+        if any(len(pair) != 2 for pair in v):
+            raise ValueError("each exclusion must be a pair of participant ids")
+        return v
 
 
 class WishListItemRequest(BaseModel):
@@ -0,0 +1,151 @@
+import cProfile
+import functools
+import marshal
+import os
+import pstats
+import secrets
+import sys
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))  # profiles kept in memory
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+
+
+class _Sampler(threading.Thread):
+    """Records the stack of one thread every SAMPLE_INTERVAL_MS, as collapsed stacks."""
+
+    def __init__(self, target: int, stop_code: Any) -> None:
+        super().__init__(name="profile-sampler", daemon=True)
+        self.target = target
+        self.stop_code = stop_code
+        self.counts: "Counter[str]" = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        interval = max(0.0001, SAMPLE_INTERVAL_MS / 1000)
+        while not self._done.wait(interval):
+            frame = sys._current_frames().get(self.target)
+            stack: List[str] = []
+            while frame is not None and frame.f_code is not self.stop_code:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class Collector:
+    """Profiles gathered for one request, from every thread that did its work."""
+
+    _local = threading.local()
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.profiles: List[cProfile.Profile] = []
+        self.samples: "Counter[str]" = Counter()
+
+    def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call `func` under cProfile plus a stack sampler (plain call if this thread is already profiled)."""
+        if getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        sampler = _Sampler(threading.get_ident(), Collector.run.__code__)
+        try:
+            profile.enable()
+        except ValueError:  # another profiler (e.g. a debugger) owns this thread
+            return func(*args, **kwargs)
+        self._local.active = True
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            sampler.stop()
+            self._local.active = False
+            with self._lock:
+                self.profiles.append(profile)
+                self.samples.update(sampler.counts)
+
+
+_active: ContextVar[Optional[Collector]] = ContextVar("profile_collector", default=None)
+
+
+def wrap_call(func: Callable[..., T]) -> Callable[..., T]:
+    """`func`, profiled when called on behalf of a profiled request."""
+    collector = _active.get()
+    return func if collector is None else functools.partial(collector.run, func)
+
+
+def wrap_endpoint(endpoint: Callable[..., T]) -> Callable[..., T]:
+    """Sync route handler that profiles itself, in its worker thread, when asked to."""
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        collector = _active.get()
+        if collector is None:
+            return endpoint(*args, **kwargs)
+        return collector.run(endpoint, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfileStore:
+    """The last PROFILE_KEEP profiles, newest last."""
+
+    def __init__(self, keep: int = PROFILE_KEEP) -> None:
+        self._lock = threading.Lock()
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max(1, keep))
+
+    def save(self, collector: Collector, **fields: Any) -> str:
+        stats: Dict[Any, Any] = {}
+        if collector.profiles:
+            merged = pstats.Stats(collector.profiles[0])
+            for profile in collector.profiles[1:]:
+                merged.add(profile)
+            stats = merged.stats  # type: ignore[attr-defined]
+        entry = {
+            "id": secrets.token_hex(6),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **fields,
+            "threads": len(collector.profiles),
+            "samples": sum(collector.samples.values()),
+            "_pstats": marshal.dumps(stats),
+            "_collapsed": "".join(f"{stack} {count}\n" for stack, count in sorted(collector.samples.items())),
+        }
+        with self._lock:
+            self._entries.append(entry)
+        return entry["id"]
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        return [{k: v for k, v in entry.items() if not k.startswith("_")} for entry in reversed(entries)]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((entry for entry in self._entries if entry["id"] == profile_id), None)
+
+
+profile_store = ProfileStore()
+
+
+@contextmanager
+def collecting() -> Iterator[Collector]:
+    """Profile the work done on behalf of the enclosed block (see `backend.api.routing`)."""
+    collector = Collector()
+    token = _active.set(collector)
+    try:
+        yield collector
+    finally:
+        _active.reset(token)
@@ -0,0 +1,17 @@
+from typing import Optional, Sequence, Tuple
+
+from ..storage import ChangeBatch, ChangedRecords, read_changed_records, read_changes
+
+
+class ChangeRepository:
+  """Reads the append-only change log and the current records it points at."""
+  def since(self, cursor: Optional[int], limit: int) -> ChangeBatch:
+    return read_changes(cursor, limit)
+
+  def current(
+    self,
+    game_ids: Sequence[str],
+    participant_keys: Sequence[Tuple[str, str]],
+    person_ids: Sequence[str],
+  ) -> ChangedRecords:
+    return read_changed_records(game_ids, participant_keys, person_ids)
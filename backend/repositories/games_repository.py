@@ -1,6 +1,16 @@
-from typing import Callable, List, Optional, TypeVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
-from ..storage import load_state, edit_state
+from .. import slowlog
+from ..storage import (
+  ParticipantIndex,
+  game_exists,
+  list_game_summaries,
+  load_game,
+  load_state,
+  participant_index,
+  resolve_token,
+  submit_edit,
+)
 from ..app_types import AppState, GameRecord, ParticipantRecord
 
 T = TypeVar("T")
@@ -8,19 +18,48 @@ T = TypeVar("T")
 
 class GameRepository:
   """Read/write games via the shared AppState (keeps services storage-agnostic)."""
-  def get_state(self) -> AppState:
-    return load_state()
+  def get_state(self, game_id: Optional[str] = None) -> AppState:
+    """Whole state, or a read-only view holding just `game_id` (served from the cache)."""
+    if game_id is None:
+      return load_state()
+    return load_state([game_id], include_people=False)
 
   def get_game(self, game_id: str) -> Optional[GameRecord]:
-    return self.get_state()["games"].get(game_id)
+    return load_game(game_id)
+
+  def exists(self, game_id: str) -> bool:
+    return game_exists(game_id)
+
+  def resolve_token(self, token: str) -> Optional[Tuple[str, str]]:
+    """(game_id, participant_id) for a participant link token."""
+    return resolve_token(token)
+
+  def participant_index(self, game_id: str) -> Optional[ParticipantIndex]:
+    return participant_index(game_id)
 
   def list_games(self) -> List[GameRecord]:
-    return list(self.get_state()["games"].values())
+    return list(load_state(include_people=False)["games"].values())
+
+  def list_summaries(
+    self,
+    limit: int,
+    after: Optional[Tuple[str, str]] = None,
+    active: Optional[bool] = None,
+    any_revealed: Optional[bool] = None,
+    title_prefix: Optional[str] = None,
+  ) -> List[Dict[str, Any]]:
+    """One newest-first page of game summaries (no participants loaded)."""
+    return list_game_summaries(limit, after, active, any_revealed, title_prefix)
+
+  def transact(self, game_id: str, mutator: Callable[[AppState], T], with_people: bool = False) -> T:
+    """Run `mutator` on a state holding only `game_id` (and people when requested).
 
-  def transact(self, mutator: Callable[[AppState], T]) -> T:
-    with edit_state() as state:
-      result = mutator(state)
-      return result
+    Only that game is locked, so transactions on other games commit in parallel,
+    and concurrent calls are group-committed (see `storage.submit_edit`).
+    `game_id` may name a game that does not exist yet; the mutator can insert it.
+    """
+    with slowlog.span("transaction", slowlog.SLOW_TRANSACTION_MS, repository="games", game_id=game_id):
+      return submit_edit([game_id], mutator, include_people=with_people)
 
   def list_participants(self, game_id: str) -> List[ParticipantRecord]:
     game = self.get_game(game_id)
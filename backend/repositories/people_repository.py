@@ -1,6 +1,7 @@
-from typing import Callable, List, TypeVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
-from ..storage import load_state, edit_state
+from .. import slowlog
+from ..storage import list_people_page, load_state, load_people, name_key, person_games, submit_edit
 from ..app_types import AppState, PersonRecord
 
 T = TypeVar("T")
@@ -9,12 +10,24 @@ T = TypeVar("T")
 class PeopleRepository:
   """Thin wrapper around AppState to keep people operations centralized."""
   def get_state(self) -> AppState:
-    return load_state()
+    return load_state([], include_people=True)
 
   def list_people(self) -> List[PersonRecord]:
-    return list(self.get_state().get("people", []))
+    return load_people()
+
+  def search(
+    self, limit: int, after: Optional[Tuple[str, str]] = None, query: str = "", active: Optional[bool] = None
+  ) -> List[PersonRecord]:
+    """One page of people in search-key order, optionally matching a name prefix."""
+    return list_people_page(limit, after, name_key(query) or None, active)
+
+  def games_of(self, person_id: str) -> Optional[List[Dict[str, Any]]]:
+    """The person's participations across games (None if the person does not exist)."""
+    return person_games(person_id)
+
+  def sort_key(self, person: PersonRecord) -> Tuple[str, str]:
+    return name_key(person["name"]), person["id"]
 
   def transact(self, mutator: Callable[[AppState], T]) -> T:
-    with edit_state() as state:
-      result = mutator(state)
-      return result
+    with slowlog.span("transaction", slowlog.SLOW_TRANSACTION_MS, repository="people"):
+      return submit_edit([], mutator, include_people=True)
@@ -1,3 +1,3 @@
-from . import games_service, people_service, admin_service
+from . import games_service, people_service, admin_service, events_service, changes_service
 
-__all__ = ["games_service", "people_service", "admin_service"]
+__all__ = ["games_service", "people_service", "admin_service", "events_service", "changes_service"]
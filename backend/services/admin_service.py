@@ -1,14 +1,124 @@
-from fastapi.responses import JSONResponse
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
 
-from ..storage import load_state
+from fastapi.responses import Response, StreamingResponse
 
+from ..backups import backup_service
+from ..core.errors import app_error
+from ..core.error_codes import ErrorCode
+from ..imports import ImportValidationError, import_file
+from ..profiling import profile_store
+from ..storage import SCHEMA_VERSION, iter_export
 
-def export_state() -> JSONResponse:
-  state = load_state()
-  return JSONResponse(
-    content=state,
+_FLUSH_BYTES = 64 * 1024
+
+
+def _json_chunks() -> Iterator[str]:
+  # Same document as the old in-memory export: {"people": [...], "games": {id: game}}.
+  yield '{"people":['
+  first_game = True
+  people_open = True
+  first_person = True
+  for kind, record in iter_export():
+    if kind == "person":
+      yield ("" if first_person else ",") + json.dumps(record, ensure_ascii=False)
+      first_person = False
+      continue
+    if people_open:
+      yield '],"games":{'
+      people_open = False
+    yield ("" if first_game else ",") + f"{json.dumps(record['game_id'])}:{json.dumps(record, ensure_ascii=False)}"
+    first_game = False
+  if people_open:
+    yield '],"games":{'
+  yield "}}"
+
+
+def _ndjson_chunks() -> Iterator[str]:
+  header = {"type": "meta", "schema_version": SCHEMA_VERSION, "exported_at": datetime.now(timezone.utc).isoformat()}
+  yield json.dumps(header) + "\n"
+  for kind, record in iter_export():
+    yield json.dumps({"type": kind, "data": record}, ensure_ascii=False) + "\n"
+
+
+def _encoded(chunks: Iterator[str], compress: bool) -> Iterator[bytes]:
+  """Batch small pieces into ~64 KiB writes, gzip-compressing on the fly if asked."""
+  gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+  buffer = []
+  size = 0
+  for chunk in chunks:
+    data = chunk.encode()
+    buffer.append(data)
+    size += len(data)
+    if size >= _FLUSH_BYTES:
+      block = b"".join(buffer)
+      buffer, size = [], 0
+      block = gzip.compress(block) if gzip else block
+      if block:
+        yield block
+  block = b"".join(buffer)
+  if gzip:
+    block = gzip.compress(block) + gzip.flush()
+  if block:
+    yield block
+
+
+def export_state(fmt: str = "json", compress: bool = False) -> StreamingResponse:
+  """Stream the whole database without building it in memory.
+
+  `ndjson` writes a meta line, then one person or game per line; `compress`
+  gzips the stream as it is produced.
+  """
+  chunks = _ndjson_chunks() if fmt == "ndjson" else _json_chunks()
+  filename = f"backup.{fmt}" + (".gz" if compress else "")
+  if compress:
+    media_type = "application/gzip"
+  else:
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+  return StreamingResponse(
+    _encoded(chunks, compress),
+    media_type=media_type,
     headers={
-      "Content-Disposition": "attachment; filename=backup.json",
+      "Content-Disposition": f"attachment; filename={filename}",
       "Cache-Control": "no-store",
     },
   )
+
+
+def import_state(path: str, mode: str) -> Dict[str, Any]:
+  """Validate and load an uploaded export file (see `backend.imports`)."""
+  try:
+    return import_file(path, mode)
+  except ImportValidationError as exc:
+    raise app_error(400, ErrorCode.INVALID_IMPORT, f"Import rejected: {exc}")
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+  return profile_store.list()
+
+
+def download_profile(profile_id: str, fmt: str) -> Response:
+  """A stored profile as a pstats dump (`pstats.Stats(path)`) or collapsed stacks (flamegraph.pl, speedscope)."""
+  entry = profile_store.get(profile_id)
+  if entry is None:
+    raise app_error(404, ErrorCode.PROFILE_NOT_FOUND, "Profile not found (only the most recent ones are kept)")
+  if fmt == "collapsed":
+    body, media_type, filename = entry["_collapsed"], "text/plain", f"profile-{profile_id}.collapsed"
+  else:
+    body, media_type, filename = entry["_pstats"], "application/octet-stream", f"profile-{profile_id}.pstats"
+  return Response(
+    content=body,
+    media_type=media_type,
+    headers={"Content-Disposition": f"attachment; filename={filename}", "Cache-Control": "no-store"},
+  )
+
+
+def backup_status() -> Dict[str, Any]:
+  return backup_service.status()
+
+
+def run_backup() -> Dict[str, Any]:
+  path = backup_service.run_once()
+  return {"path": path, **backup_service.status()}
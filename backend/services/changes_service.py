@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.errors import app_error
+from ..core.error_codes import ErrorCode
+from ..repositories.changes_repository import ChangeRepository
+
+change_repo = ChangeRepository()
+
+MAX_CHANGES = 1000  # change-log rows read per request
+
+
+def list_changes(since: Optional[int], limit: int = MAX_CHANGES) -> Dict[str, Any]:
+  """Current games, participants and people changed after `since`, plus deletions.
+
+  Several changes to one record collapse into its latest state. Without `since`
+  only the current cursor is returned, as the starting point for later calls.
+  """
+  if since is not None and since < 0:
+    raise app_error(400, ErrorCode.INVALID_REQUEST_BODY, "since must be a non-negative cursor")
+  batch = change_repo.since(since, max(1, min(limit, MAX_CHANGES)))
+  if batch.expired:
+    raise app_error(410, ErrorCode.CURSOR_EXPIRED, "Cursor is older than the change log; resync from scratch")
+
+  latest: Dict[Tuple[str, Optional[str], str], str] = {}
+  for _, kind, game_id, entity_id, op, _ in batch.rows:
+    key = (kind, game_id, entity_id)
+    latest.pop(key, None)  # keep first-seen order of the latest change
+    latest[key] = op
+  # Only the named rows are read back (tokens and assignments stay out of the
+  # feed: it is for syncing dashboards).
+  current = change_repo.current(
+    sorted({game_id for kind, game_id, _ in latest if kind != "person"}),
+    [(game_id, entity_id) for kind, game_id, entity_id in latest if kind == "participant"],
+    [entity_id for kind, _, entity_id in latest if kind == "person"],
+  )
+
+  games: List[Dict[str, Any]] = []
+  participants: List[Dict[str, Any]] = []
+  changed_people: List[Dict[str, Any]] = []
+  deleted: Dict[str, List[Any]] = {"games": [], "participants": [], "people": []}
+  for (kind, game_id, entity_id), op in latest.items():
+    if kind == "person":
+      person = current.people.get(entity_id)
+      if op == "delete" or person is None:
+        deleted["people"].append(entity_id)
+      else:
+        changed_people.append(dict(person))
+      continue
+    game = current.games.get(game_id)
+    if kind == "game":
+      if op == "delete" or game is None:
+        deleted["games"].append(game_id)
+      else:
+        games.append(game)
+      continue
+    participant = current.participants.get((game_id, entity_id))
+    if op == "delete" or participant is None:
+      if game is not None:  # a deleted game implies its participants are gone
+        deleted["participants"].append({"game_id": game_id, "id": entity_id})
+    else:
+      participants.append(participant)
+  return {
+    "cursor": batch.cursor,
+    "has_more": batch.has_more,
+    "games": games,
+    "participants": participants,
+    "people": changed_people,
+    "deleted": deleted,
+  }
@@ -0,0 +1,78 @@
+import asyncio
+import hmac
+import json
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from ..core.concurrency import run_blocking
+from ..core.security import AdminCredentials, authenticate_admin, verify_admin_session
+from ..events import GameEvent, event_hub
+from ..repositories.games_repository import GameRepository
+
+game_repo = GameRepository()
+
+HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+RETRY_MS = 3000
+
+
+def authorize_stream(game_id: str, credentials: AdminCredentials) -> str:
+  """Check admin credentials once, before the stream starts; returns the verified hash."""
+  return authenticate_admin(game_repo.get_game(game_id), credentials)
+
+
+def _still_authorized(game_id: str, credentials: AdminCredentials, admin_hash: str) -> bool:
+  # Re-checked on every heartbeat: a password change, game deletion or session
+  # expiry ends the stream without another bcrypt round.
+  game = game_repo.get_game(game_id)
+  if not game or not hmac.compare_digest(game["admin_password_hash"].encode(), admin_hash.encode()):
+    return False
+  if credentials.session and not credentials.password:
+    return verify_admin_session(game, credentials.session)
+  return True
+
+
+def _frame(event_type: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+  lines = [f"id: {event_id}"] if event_id else []
+  lines += [f"event: {event_type}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+  return "\n".join(lines) + "\n\n"
+
+
+def _event_frame(event: GameEvent) -> str:
+  return _frame(event.type, event.data, event.id)
+
+
+async def stream_events(
+  game_id: str,
+  credentials: AdminCredentials,
+  admin_hash: str,
+  last_event_id: Optional[str],
+  is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[str]:
+  """SSE frames for one game: missed events first, then live ones, with heartbeats.
+
+  If `last_event_id` cannot be resumed (too old, or issued by another process)
+  a `resync` event tells the dashboard to re-fetch the game status once.
+  Storage reads go through `run_blocking`: this generator runs on the event loop.
+  """
+  sub, backlog = event_hub.subscribe(game_id, asyncio.get_running_loop(), last_event_id)
+  try:
+    yield f"retry: {RETRY_MS}\n\n"
+    if backlog is None:
+      game = await run_blocking(game_repo.get_game, game_id)
+      yield _frame("resync", {"game_id": game_id, "revision": game.get("revision") if game else None})
+    else:
+      for event in backlog:
+        yield _event_frame(event)
+    while True:
+      try:
+        event = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+      except asyncio.TimeoutError:
+        if await is_disconnected() or not await run_blocking(_still_authorized, game_id, credentials, admin_hash):
+          return
+        yield ": heartbeat\n\n"
+        continue
+      yield _event_frame(event)
+      if event.type == "game.deleted":
+        return
+  finally:
+    event_hub.unsubscribe(sub)
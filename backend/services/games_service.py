@@ -1,4 +1,5 @@
-from typing import Any, Dict, List, Optional, Set
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from ..models import (
   CreateGameRequest,
@@ -19,18 +20,29 @@ from ..utils import (
   generate_game_id,
   generate_token,
   derangement_assignment,
+  DrawImpossibleError,
   hash_password,
   get_share_base_url,
 )
 from ..core.errors import app_error
 from ..core.error_codes import ErrorCode
-from ..core.security import require_admin
+from ..core.security import (
+  AdminAuth,
+  authenticate_admin,
+  issue_admin_session,
+  require_admin,
+  require_verified_admin,
+)
+from ..core.cursors import decode_cursor, encode_cursor
 from ..core.time import now_iso
 from ..app_types import AppState, ParticipantRecord, GameParticipantPair, WishListItemRecord
 from .validators import ensure_min_participants, normalize_and_check_name, ensure_game_exists
 
 game_repo = GameRepository()  # shared repo instance for all handlers
 
+GAMES_PAGE_SIZE = 100
+MAX_GAMES_PAGE_SIZE = 500
+
 
 def _build_participant_record(idx: int, name: str, person_id: Optional[str] = None) -> ParticipantRecord:
   return {
@@ -46,6 +58,47 @@ def _build_participant_record(idx: int, name: str, person_id: Optional[str] = No
   }
 
 
+def _authenticate(game_id: str, admin_auth: AdminAuth) -> str:
+  # bcrypt runs here, against a cached read, never inside a write transaction
+  return authenticate_admin(game_repo.get_game(game_id), admin_auth)
+
+
+def _check_revision(game: Dict[str, Any], expected_revision: Optional[int]) -> None:
+  # Runs inside the write transaction. Within a group-commit batch the revision
+  # already counts the edits applied before this one, so two writes sending the
+  # same If-Match cannot both pass.
+  if expected_revision is not None and int(game.get("revision", 0)) != expected_revision:
+    raise app_error(412, ErrorCode.REVISION_MISMATCH, "Game changed since it was loaded; reload and retry")
+
+
+def game_revision(game_id: str) -> Optional[int]:
+  """Current revision of a game (its ETag), or None if it does not exist."""
+  game = game_repo.get_game(game_id)
+  return int(game.get("revision", 0)) if game else None
+
+
+def authorize_admin_read(game_id: str, admin_auth: AdminAuth) -> None:
+  """Same checks as an admin read, for answering 304 without building the body."""
+  require_admin(game_repo.get_state(game_id), game_id, admin_auth)
+
+
+def authorize_link_read(game_id: str, token: str) -> None:
+  """Same checks as a participant-link read, for answering 304 without building the body."""
+  pair = _find_game_and_participant(game_repo.get_state(game_id), game_id, token)
+  if not pair or not bool(pair["game"].get("active", True)) or not pair["participant"]["active"]:
+    raise app_error(404, ErrorCode.LINK_NOT_FOUND, "Link not found")
+
+
+def _next_participant_index(participants: List[ParticipantRecord]) -> int:
+  # ids are `p<n>` and key rows in storage, so never reuse one freed by a removal
+  highest = len(participants)
+  for p in participants:
+    suffix = str(p.get("id", ""))[1:]
+    if suffix.isdigit():
+      highest = max(highest, int(suffix))
+  return highest + 1
+
+
 def _ensure_wish_list(participant: ParticipantRecord) -> List[WishListItemRecord]:
   if "wish_list" not in participant or participant["wish_list"] is None:
     participant["wish_list"] = []
@@ -66,11 +119,16 @@ def _wish_list_response(participant: ParticipantRecord) -> List[WishListItemResp
   return [WishListItemResponse(**item) for item in items]  # type: ignore[arg-type]
 
 
+class _GameIdTaken(Exception):
+  """Another create committed the picked game id between the check and the write."""
+
+
 def create_game(payload: CreateGameRequest, origin: Optional[str] = None) -> Dict[str, str]:
+  password_hash = hash_password(payload.admin_password)
+
   def _mutate(state: AppState) -> Dict[str, str]:
-    gid = generate_game_id()
-    while gid in state["games"]:
-      gid = generate_game_id()
+    if gid in state["games"]:
+      raise _GameIdTaken(gid)
     created_at = now_iso()
     people = {p["id"]: p for p in state.get("people", []) if p.get("active", True)}
     selected = []
@@ -97,7 +155,7 @@ def create_game(payload: CreateGameRequest, origin: Optional[str] = None) -> Dic
     state["games"][gid] = {
       "game_id": gid,
       "title": payload.title,
-      "admin_password_hash": hash_password(payload.admin_password),
+      "admin_password_hash": password_hash,
       "created_at": created_at,
       "updated_at": created_at,
       "active": True,
@@ -106,13 +164,28 @@ def create_game(payload: CreateGameRequest, origin: Optional[str] = None) -> Dic
       "participants": participants,
     }
     return {"game_id": gid, "share_base_url": get_share_base_url(origin)}
-  return game_repo.transact(_mutate)
+
+  while True:
+    gid = generate_game_id()
+    if game_repo.exists(gid):
+      continue
+    try:
+      return game_repo.transact(gid, _mutate, with_people=True)
+    except _GameIdTaken:
+      continue  # nothing was written; pick another id
 
 
-def get_game_status(game_id: str, admin_password: Optional[str]) -> GameStatusResponse:
-  state = game_repo.get_state()
+def create_admin_session(game_id: str, admin_password: Optional[str]) -> Dict[str, Any]:
+  game = game_repo.get_game(game_id)
+  authenticate_admin(game, admin_password)
+  token, expires = issue_admin_session(game)  # type: ignore[arg-type]
+  return {"session": token, "expires_at": datetime.fromtimestamp(expires, timezone.utc).isoformat()}
+
+
+def get_game_status(game_id: str, admin_auth: AdminAuth) -> GameStatusResponse:
+  state = game_repo.get_state(game_id)
   game = ensure_game_exists(state["games"].get(game_id))
-  require_admin(state, game_id, admin_password)
+  require_admin(state, game_id, admin_auth)
   return GameStatusResponse(
     game_id=game_id,
     title=game["title"],
@@ -134,54 +207,81 @@ def get_game_status(game_id: str, admin_password: Optional[str]) -> GameStatusRe
   )
 
 
-def list_games() -> List[GameSummary]:
-  games = game_repo.list_games()
-  results = [
+def list_games(
+  limit: int = GAMES_PAGE_SIZE,
+  cursor: Optional[str] = None,
+  active: Optional[bool] = None,
+  any_revealed: Optional[bool] = None,
+  title_prefix: Optional[str] = None,
+) -> Tuple[List[GameSummary], Optional[str]]:
+  """One page of games, newest first, and the cursor of the next page (None at the end)."""
+  try:
+    after = decode_cursor(cursor, 2)
+  except ValueError:
+    raise app_error(400, ErrorCode.INVALID_CURSOR, "Invalid cursor")
+  limit = max(1, min(limit, MAX_GAMES_PAGE_SIZE))
+  rows = game_repo.list_summaries(
+    limit + 1,
+    after=(after[0], after[1]) if after else None,
+    active=active,
+    any_revealed=any_revealed,
+    title_prefix=(title_prefix or "").strip() or None,
+  )
+  page = [
     GameSummary(
-      game_id=game.get("game_id", ""),
-      title=game.get("title", ""),
-      created_at=game.get("created_at", ""),
-      any_revealed=bool(game.get("any_revealed", False)),
-      active=bool(game.get("active", True)),
-      participant_count=len(game.get("participants", [])),
+      game_id=row["game_id"],
+      title=row["title"],
+      created_at=row["created_at"],
+      any_revealed=row["any_revealed"],
+      active=row["active"],
+      participant_count=row["participant_count"],
     )
-    for game in games
+    for row in rows[:limit]
   ]
-  results.sort(key=lambda g: g.created_at, reverse=True)
-  return results
+  next_cursor = encode_cursor([rows[limit - 1]["created_at"], rows[limit - 1]["game_id"]]) if len(rows) > limit else None
+  return page, next_cursor
 
 
-def update_game(game_id: str, payload: UpdateGameRequest, admin_password: Optional[str]) -> Dict[str, bool]:
+def update_game(
+  game_id: str, payload: UpdateGameRequest, admin_auth: AdminAuth, expected_revision: Optional[int] = None
+) -> Dict[str, bool]:
+  admin_hash = _authenticate(game_id, admin_auth)
+
   def _mutate(state: AppState) -> Dict[str, bool]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
+    _check_revision(game, expected_revision)
     game["title"] = payload.title
     game["updated_at"] = now_iso()
     return {"ok": True}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
+
 
+def delete_game(game_id: str, admin_auth: AdminAuth) -> None:
+  admin_hash = _authenticate(game_id, admin_auth)
 
-def delete_game(game_id: str, admin_password: Optional[str]) -> None:
   def _mutate(state: AppState) -> None:
-    _ = require_admin(state, game_id, admin_password)
+    require_verified_admin(state, game_id, admin_hash)
     if game_id in state.get("games", {}):
       del state["games"][game_id]
       return
     raise app_error(404, ErrorCode.GAME_NOT_FOUND, "Game not found")
-  game_repo.transact(_mutate)
+  game_repo.transact(game_id, _mutate)
+
 
+def set_game_active(game_id: str, admin_auth: AdminAuth, active: bool) -> Dict[str, bool]:
+  admin_hash = _authenticate(game_id, admin_auth)
 
-def set_game_active(game_id: str, admin_password: Optional[str], active: bool) -> Dict[str, bool]:
   def _mutate(state: AppState) -> Dict[str, bool]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
     game["active"] = active
     game["updated_at"] = now_iso()
     return {"ok": True}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
 
 
-def get_links(game_id: str, admin_password: Optional[str], origin: Optional[str] = None) -> List[Dict[str, str]]:
-  state = game_repo.get_state()
-  game = require_admin(state, game_id, admin_password)
+def get_links(game_id: str, admin_auth: AdminAuth, origin: Optional[str] = None) -> List[Dict[str, str]]:
+  state = game_repo.get_state(game_id)
+  game = require_admin(state, game_id, admin_auth)
   base = get_share_base_url(origin).rstrip("/")
   return [
     {
@@ -194,9 +294,21 @@ def get_links(game_id: str, admin_password: Optional[str], origin: Optional[str]
   ]
 
 
-def add_participants_by_ids(game_id: str, payload: AddParticipantsByIdsRequest, admin_password: Optional[str]) -> Dict[str, List[Dict[str, str]]]:
+def resolve_short_link(token: str, origin: Optional[str] = None) -> Dict[str, str]:
+  """Resolve a bare participant token (short link) to its full share link."""
+  found = game_repo.resolve_token(token)
+  if not found:
+    raise app_error(404, ErrorCode.LINK_NOT_FOUND, "Link not found")
+  game_id, _ = found
+  base = get_share_base_url(origin).rstrip("/")
+  return {"game_id": game_id, "token": token, "link": f"{base}/game/{game_id}/token/{token}"}
+
+
+def add_participants_by_ids(game_id: str, payload: AddParticipantsByIdsRequest, admin_auth: AdminAuth) -> Dict[str, List[Dict[str, str]]]:
+  admin_hash = _authenticate(game_id, admin_auth)
+
   def _mutate(state: AppState) -> Dict[str, List[Dict[str, str]]]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
     if int(game.get("assignment_version", 0)) > 0:
       raise app_error(409, ErrorCode.GAME_REVEAL_CONFLICT, "Cannot add participants after draw has been performed")
     if game["any_revealed"]:
@@ -215,7 +327,7 @@ def add_participants_by_ids(game_id: str, payload: AddParticipantsByIdsRequest,
       to_add.append({**person, "name": normalized_name})
     if not to_add:
       raise app_error(400, ErrorCode.NO_PARTICIPANTS_TO_ADD, "No valid participants to add")
-    next_idx = len(game["participants"]) + 1
+    next_idx = _next_participant_index(game["participants"])
     added = []
     for person in to_add:
       rec = _build_participant_record(next_idx, person["name"], person["id"])
@@ -224,12 +336,14 @@ def add_participants_by_ids(game_id: str, payload: AddParticipantsByIdsRequest,
       added.append({"id": rec["id"], "name": rec["name"], "person_id": rec["person_id"]})
     game["updated_at"] = now_iso()
     return {"added": added}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate, with_people=True)
+
 
+def remove_participant(game_id: str, participant_id: str, admin_auth: AdminAuth) -> None:
+  admin_hash = _authenticate(game_id, admin_auth)
 
-def remove_participant(game_id: str, participant_id: str, admin_password: Optional[str]) -> None:
   def _mutate(state: AppState) -> None:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
     if int(game.get("assignment_version", 0)) > 0:
       raise app_error(409, ErrorCode.GAME_REVEAL_CONFLICT, "Cannot remove participants after draw has been performed")
     if game["any_revealed"]:
@@ -239,12 +353,33 @@ def remove_participant(game_id: str, participant_id: str, admin_password: Option
     if len(game["participants"]) == before:
       raise app_error(404, ErrorCode.PARTICIPANT_NOT_FOUND, "Participant not found")
     game["updated_at"] = now_iso()
-  game_repo.transact(_mutate)
+  game_repo.transact(game_id, _mutate)
+
+
+def _draw_exclusions(game: Dict[str, Any], payload: DrawRequest) -> List[Tuple[str, str]]:
+  known = {p["id"] for p in game["participants"]}
+  exclusions: List[Tuple[str, str]] = []
+  for a, b in payload.exclusions or []:
+    if a not in known or b not in known:
+      raise app_error(404, ErrorCode.PARTICIPANT_NOT_FOUND, "Participant not found")
+    exclusions += [(a, b), (b, a)]
+  if payload.avoid_previous:
+    exclusions += [
+      (p["id"], p["assigned_to_participant_id"])
+      for p in game["participants"]
+      if p.get("assigned_to_participant_id")
+    ]
+  return exclusions
+
 
+def draw_assignments(
+  game_id: str, payload: DrawRequest, admin_auth: AdminAuth, expected_revision: Optional[int] = None
+) -> Dict[str, int]:
+  admin_hash = _authenticate(game_id, admin_auth)
 
-def draw_assignments(game_id: str, payload: DrawRequest, admin_password: Optional[str]) -> Dict[str, int]:
   def _mutate(state: AppState) -> Dict[str, int]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
+    _check_revision(game, expected_revision)
     if not bool(game.get("active", True)):
       raise app_error(409, ErrorCode.GAME_INACTIVE, "Game is inactive")
     force_flag = bool(payload.force)
@@ -252,7 +387,11 @@ def draw_assignments(game_id: str, payload: DrawRequest, admin_password: Optiona
       raise app_error(409, ErrorCode.GAME_REVEAL_CONFLICT, "Cannot redraw after reveal started (use force=true)")
     participants = [p for p in game["participants"] if p["active"]]
     ensure_min_participants(len(participants))
-    mapping = derangement_assignment([p["id"] for p in participants])
+    exclusions = _draw_exclusions(game, payload)
+    try:
+      mapping = derangement_assignment([p["id"] for p in participants], exclusions)
+    except DrawImpossibleError as exc:
+      raise app_error(409, ErrorCode.DRAW_IMPOSSIBLE, str(exc))
     for p in game["participants"]:
       p["assigned_to_participant_id"] = mapping.get(p["id"]) if p["id"] in mapping else None
       p["viewed"] = False
@@ -261,44 +400,58 @@ def draw_assignments(game_id: str, payload: DrawRequest, admin_password: Optiona
     game["any_revealed"] = False
     game["updated_at"] = now_iso()
     return {"assignment_version": game["assignment_version"]}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
+
 
+def set_token_active(game_id: str, token: str, admin_auth: AdminAuth, active: bool) -> Dict[str, bool]:
+  admin_hash = _authenticate(game_id, admin_auth)
 
-def set_token_active(game_id: str, token: str, admin_password: Optional[str], active: bool) -> Dict[str, bool]:
   def _mutate(state: AppState) -> Dict[str, bool]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
     if not bool(game.get("active", True)):
       raise app_error(409, ErrorCode.GAME_INACTIVE, "Game is inactive")
-    for p in game["participants"]:
-      if p["token"] == token:
-        p["active"] = active
-        game["updated_at"] = now_iso()
-        return {"ok": True}
-    raise app_error(404, ErrorCode.TOKEN_NOT_FOUND, "Token not found")
-  return game_repo.transact(_mutate)
+    participant = _locate_participant(game, "token", token)
+    if not participant:
+      raise app_error(404, ErrorCode.TOKEN_NOT_FOUND, "Token not found")
+    participant["active"] = active
+    game["updated_at"] = now_iso()
+    return {"ok": True}
+  return game_repo.transact(game_id, _mutate)
+
+
+def _locate_participant(game: Dict[str, Any], field: str, value: str) -> Optional[ParticipantRecord]:
+  # O(1) via the storage index; the scan only runs if this copy of the game was
+  # already reshaped inside the current transaction.
+  participants = game.get("participants", [])
+  index = game_repo.participant_index(game["game_id"])
+  if index is not None:
+    position = (index.by_token if field == "token" else index.by_id).get(value)
+    if position is not None and position < len(participants) and participants[position].get(field) == value:
+      return participants[position]
+  return next((p for p in participants if p.get(field) == value), None)
 
 
 def _find_game_and_participant(state: AppState, game_id: str, token: str) -> Optional[GameParticipantPair]:
   game = state["games"].get(game_id)
   if not game:
     return None
-  for p in game["participants"]:
-    if p["token"] == token:
-      _ensure_wish_list(p)
-      return {"game": game, "participant": p}
-  return None
+  participant = _locate_participant(game, "token", token)
+  if not participant:
+    return None
+  _ensure_wish_list(participant)
+  return {"game": game, "participant": participant}
 
 
 def _get_participant_by_id(game: Dict[str, Any], participant_id: str) -> ParticipantRecord:
-  for participant in game.get("participants", []):
-    if participant["id"] == participant_id:
-      _ensure_wish_list(participant)
-      return participant  # type: ignore
-  raise app_error(404, ErrorCode.PARTICIPANT_NOT_FOUND, "Participant not found")
+  participant = _locate_participant(game, "id", participant_id)
+  if not participant:
+    raise app_error(404, ErrorCode.PARTICIPANT_NOT_FOUND, "Participant not found")
+  _ensure_wish_list(participant)
+  return participant
 
 
 def participant_preview(game_id: str, token: str) -> ParticipantPreviewResponse:
-  state = game_repo.get_state()
+  state = game_repo.get_state(game_id)
   pair = _find_game_and_participant(state, game_id, token)
   if not pair:
     raise app_error(404, ErrorCode.LINK_NOT_FOUND, "Link not found")
@@ -324,7 +477,7 @@ def reveal_assignment(game_id: str, token: str) -> RevealResponse:
       raise app_error(409, ErrorCode.ASSIGNMENT_NOT_READY, "Draw not performed yet")
     if participant["viewed"]:
       raise app_error(409, ErrorCode.ASSIGNMENT_ALREADY_VIEWED, "Already revealed")
-    assigned_participant = next((p for p in game["participants"] if p["id"] == assigned_id), None)
+    assigned_participant = _locate_participant(game, "id", assigned_id)
     if not assigned_participant:
       raise app_error(500, ErrorCode.INVALID_ASSIGNMENT_STATE, "Invalid assignment state")
     _ensure_wish_list(assigned_participant)
@@ -334,49 +487,72 @@ def reveal_assignment(game_id: str, token: str) -> RevealResponse:
     game["any_revealed"] = True
     game["updated_at"] = now_iso()
     return RevealResponse(assigned_to=assigned_name, wish_list=_wish_list_response(assigned_participant))
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
 
 
-def rename_participant(game_id: str, participant_id: str, payload: UpdateParticipantRequest, admin_password: Optional[str]) -> Dict[str, bool]:
+def rename_participant(
+  game_id: str,
+  participant_id: str,
+  payload: UpdateParticipantRequest,
+  admin_auth: AdminAuth,
+  expected_revision: Optional[int] = None,
+) -> Dict[str, bool]:
+  admin_hash = _authenticate(game_id, admin_auth)
+
   def _mutate(state: AppState) -> Dict[str, bool]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
+    _check_revision(game, expected_revision)
     new_name = payload.name.strip()
     if not new_name:
       raise app_error(400, ErrorCode.NAME_REQUIRED, "Name cannot be empty")
     for p in game["participants"]:
       if p["id"] != participant_id and p["name"].strip().lower() == new_name.lower():
         raise app_error(400, ErrorCode.DUPLICATE_PARTICIPANT_NAMES, "Duplicate name")
-    target = next((p for p in game["participants"] if p["id"] == participant_id), None)
+    target = _locate_participant(game, "id", participant_id)
     if not target:
       raise app_error(404, ErrorCode.PARTICIPANT_NOT_FOUND, "Participant not found")
     target["name"] = new_name
     game["updated_at"] = now_iso()
     return {"ok": True}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
 
 
-def get_wish_list_admin(game_id: str, participant_id: str, admin_password: Optional[str]) -> Dict[str, List[WishListItemResponse]]:
-  state = game_repo.get_state()
-  game = require_admin(state, game_id, admin_password)
+def get_wish_list_admin(game_id: str, participant_id: str, admin_auth: AdminAuth) -> Dict[str, List[WishListItemResponse]]:
+  state = game_repo.get_state(game_id)
+  game = require_admin(state, game_id, admin_auth)
   participant = _get_participant_by_id(game, participant_id)
   return {"items": _wish_list_response(participant)}
 
 
-def add_wish_list_item_admin(game_id: str, participant_id: str, payload: WishListItemRequest, admin_password: Optional[str]) -> Dict[str, WishListItemResponse]:
+def add_wish_list_item_admin(
+  game_id: str,
+  participant_id: str,
+  payload: WishListItemRequest,
+  admin_auth: AdminAuth,
+  expected_revision: Optional[int] = None,
+) -> Dict[str, WishListItemResponse]:
+  admin_hash = _authenticate(game_id, admin_auth)
+
   def _mutate(state: AppState) -> Dict[str, WishListItemResponse]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
+    _check_revision(game, expected_revision)
     participant = _get_participant_by_id(game, participant_id)
     items = _ensure_wish_list(participant)
     item = _create_wish_item(payload)
     items.append(item)
     game["updated_at"] = now_iso()
     return {"item": WishListItemResponse(**item)}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
+
 
+def remove_wish_list_item_admin(
+  game_id: str, participant_id: str, item_id: str, admin_auth: AdminAuth, expected_revision: Optional[int] = None
+) -> Dict[str, bool]:
+  admin_hash = _authenticate(game_id, admin_auth)
 
-def remove_wish_list_item_admin(game_id: str, participant_id: str, item_id: str, admin_password: Optional[str]) -> Dict[str, bool]:
   def _mutate(state: AppState) -> Dict[str, bool]:
-    game = require_admin(state, game_id, admin_password)
+    game = require_verified_admin(state, game_id, admin_hash)
+    _check_revision(game, expected_revision)
     participant = _get_participant_by_id(game, participant_id)
     items = _ensure_wish_list(participant)
     before = len(items)
@@ -385,11 +561,11 @@ def remove_wish_list_item_admin(game_id: str, participant_id: str, item_id: str,
       raise app_error(404, ErrorCode.WISHLIST_ITEM_NOT_FOUND, "Wishlist item not found")
     game["updated_at"] = now_iso()
     return {"ok": True}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
 
 
 def get_wish_list_by_token(game_id: str, token: str) -> Dict[str, List[WishListItemResponse]]:
-  state = game_repo.get_state()
+  state = game_repo.get_state(game_id)
   pair = _find_game_and_participant(state, game_id, token)
   if not pair:
     raise app_error(404, ErrorCode.LINK_NOT_FOUND, "Link not found")
@@ -400,7 +576,9 @@ def get_wish_list_by_token(game_id: str, token: str) -> Dict[str, List[WishListI
   return {"items": _wish_list_response(participant)}
 
 
-def add_wish_list_item_by_token(game_id: str, token: str, payload: WishListItemRequest) -> Dict[str, WishListItemResponse]:
+def add_wish_list_item_by_token(
+  game_id: str, token: str, payload: WishListItemRequest, expected_revision: Optional[int] = None
+) -> Dict[str, WishListItemResponse]:
   def _mutate(state: AppState) -> Dict[str, WishListItemResponse]:
     pair = _find_game_and_participant(state, game_id, token)
     if not pair:
@@ -409,15 +587,18 @@ def add_wish_list_item_by_token(game_id: str, token: str, payload: WishListItemR
     participant = pair["participant"]
     if not bool(game.get("active", True)) or not participant["active"]:
       raise app_error(404, ErrorCode.LINK_NOT_FOUND, "Link not found")
+    _check_revision(game, expected_revision)
     items = _ensure_wish_list(participant)
     item = _create_wish_item(payload)
     items.append(item)
     pair["game"]["updated_at"] = now_iso()
     return {"item": WishListItemResponse(**item)}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
 
 
-def remove_wish_list_item_by_token(game_id: str, token: str, item_id: str) -> Dict[str, bool]:
+def remove_wish_list_item_by_token(
+  game_id: str, token: str, item_id: str, expected_revision: Optional[int] = None
+) -> Dict[str, bool]:
   def _mutate(state: AppState) -> Dict[str, bool]:
     pair = _find_game_and_participant(state, game_id, token)
     if not pair:
@@ -426,6 +607,7 @@ def remove_wish_list_item_by_token(game_id: str, token: str, item_id: str) -> Di
     participant = pair["participant"]
     if not bool(game.get("active", True)) or not participant["active"]:
       raise app_error(404, ErrorCode.LINK_NOT_FOUND, "Link not found")
+    _check_revision(game, expected_revision)
     items = _ensure_wish_list(participant)
     before = len(items)
     participant["wish_list"] = [item for item in items if item.get("id") != item_id]
@@ -433,4 +615,4 @@ def remove_wish_list_item_by_token(game_id: str, token: str, item_id: str) -> Di
       raise app_error(404, ErrorCode.WISHLIST_ITEM_NOT_FOUND, "Wishlist item not found")
     pair["game"]["updated_at"] = now_iso()
     return {"ok": True}
-  return game_repo.transact(_mutate)
+  return game_repo.transact(game_id, _mutate)
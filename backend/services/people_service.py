@@ -1,21 +1,49 @@
 import json
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from ..models import Person, CreatePeopleRequest, UpdateParticipantRequest
-from ..core.security import require_master
+from ..core.security import require_configured_master, require_master
 from ..core.errors import app_error
 from ..core.error_codes import ErrorCode
+from ..core.cursors import decode_cursor, encode_cursor
 from ..repositories.people_repository import PeopleRepository
 from .validators import normalize_person_name
 
 people_repo = PeopleRepository()
 
+PEOPLE_PAGE_SIZE = 100
+MAX_PEOPLE_PAGE_SIZE = 1000
 
-def list_people() -> List[Person]:
-  state = people_repo.get_state()
-  people = [Person(**p) for p in state.get("people", [])]
-  people.sort(key=lambda p: p.name.lower())
-  return people
+
+def list_people(
+  limit: int = PEOPLE_PAGE_SIZE, cursor: Optional[str] = None, q: Optional[str] = None, active: Optional[bool] = None
+) -> Tuple[List[Person], Optional[str]]:
+  """One page of the directory sorted by name, and the next page's cursor.
+
+  `q` matches the start of the name ignoring case and accents ("jose" finds "José").
+  """
+  try:
+    after = decode_cursor(cursor, 2)
+  except ValueError:
+    raise app_error(400, ErrorCode.INVALID_CURSOR, "Invalid cursor")
+  limit = max(1, min(limit, MAX_PEOPLE_PAGE_SIZE))
+  rows = people_repo.search(limit + 1, (after[0], after[1]) if after else None, q or "", active)
+  page = [Person(**p) for p in rows[:limit]]
+  next_cursor = encode_cursor(list(people_repo.sort_key(rows[limit - 1]))) if len(rows) > limit else None
+  return page, next_cursor
+
+
+def list_person_games(person_id: str, master_password: Optional[str]) -> List[Dict[str, Any]]:
+  """Games a directory person takes part in, with the participant they drew.
+
+  It reveals draws across every game, so it stays closed until a master
+  password is configured.
+  """
+  require_configured_master(master_password)
+  games = people_repo.games_of(person_id)
+  if games is None:
+    raise app_error(404, ErrorCode.PERSON_NOT_FOUND, "Person not found")
+  return games
 
 
 def _coerce_people_request(payload: Any) -> CreatePeopleRequest:
@@ -36,6 +64,16 @@ def _coerce_people_request(payload: Any) -> CreatePeopleRequest:
   raise app_error(400, ErrorCode.INVALID_REQUEST_BODY, "Invalid JSON body. Expected an object with a 'names' array")
 
 
+def _next_person_index(people: List[Dict[str, Any]]) -> int:
+  # ids are `u<n>`, but imported people keep theirs: count past the highest, not the length
+  highest = len(people)
+  for p in people:
+    suffix = str(p.get("id", ""))[1:]
+    if suffix.isdigit():
+      highest = max(highest, int(suffix))
+  return highest + 1
+
+
 def add_people(payload: Any, master_password: Optional[str]) -> Dict[str, Any]:
   require_master(master_password)
   model = _coerce_people_request(payload)
@@ -44,7 +82,7 @@ def add_people(payload: Any, master_password: Optional[str]) -> Dict[str, Any]:
     existing = {p["name"].strip().lower(): p for p in state.get("people", [])}
     new_seen: Set[str] = set()
     added = []
-    next_idx = len(state.get("people", [])) + 1
+    next_idx = _next_person_index(state.get("people", []))
     for name in model.names:
       normalized = normalize_person_name(name)
       key = normalized.lower()
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Thresholds in milliseconds (0 disables that kind of span).
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_TRANSACTION_MS = float(os.getenv("SLOW_TRANSACTION_MS", "500"))
+# Fraction of slow spans that are logged, and a hard cap on lines per minute.
+SAMPLE_RATE = float(os.getenv("SLOW_LOG_SAMPLE_RATE", "1"))
+MAX_PER_MINUTE = int(os.getenv("SLOW_LOG_MAX_PER_MINUTE", "60"))
+
+
+class Span:
+    """Timings of one request or transaction, filled in by `record` as phases run."""
+
+    __slots__ = ("kind", "started", "phases", "fields")
+
+    def __init__(self, kind: str, fields: Dict[str, Any]) -> None:
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.fields = fields
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("slowlog_span", default=None)
+
+
+class _Limiter:
+    """Token bucket refilled at MAX_PER_MINUTE per minute; counts what it drops."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tokens = float(MAX_PER_MINUTE)
+        self._updated = time.monotonic()
+        self.suppressed = 0
+
+    def allow(self) -> Optional[int]:
+        """Suppressed count since the last allowed line, or None if this one is dropped."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(MAX_PER_MINUTE), self._tokens + (now - self._updated) * MAX_PER_MINUTE / 60)
+            self._updated = now
+            if self._tokens < 1:
+                self.suppressed += 1
+                return None
+            self._tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+            return suppressed
+
+
+_limiter = _Limiter()
+
+
+def record(phase: str, seconds: float) -> None:
+    """Add time to a phase of the current span (no-op outside one)."""
+    span = _current.get()
+    if span is not None:
+        span.phases[phase] = span.phases.get(phase, 0.0) + seconds
+
+
+def annotate(**fields: Any) -> None:
+    """Attach fields (game_id, sizes, status...) to the current span."""
+    span = _current.get()
+    if span is not None:
+        span.fields.update(fields)
+
+
+def _emit(span: Span, elapsed_ms: float) -> None:
+    if SAMPLE_RATE < 1 and random.random() >= SAMPLE_RATE:
+        return
+    suppressed = _limiter.allow()
+    if suppressed is None:
+        return
+    entry: Dict[str, Any] = {
+        "event": f"slow_{span.kind}",
+        "duration_ms": round(elapsed_ms, 3),
+        **span.fields,
+        "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in span.phases.items()},
+    }
+    if suppressed:
+        entry["suppressed"] = suppressed
+    logger.warning(json.dumps(entry, default=str))
+
+
+@contextmanager
+def span(kind: str, threshold_ms: float, **fields: Any) -> Iterator[Optional[Span]]:
+    """Time a block; log one JSON line if it took at least `threshold_ms`.
+
+    Phases recorded inside also add up into the enclosing span, so a slow
+    request shows where its transactions spent their time.
+    """
+    if threshold_ms <= 0:
+        yield None
+        return
+    parent = _current.get()
+    current = Span(kind, fields)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        elapsed_ms = (time.perf_counter() - current.started) * 1000
+        if parent is not None:
+            for name, seconds in current.phases.items():
+                parent.phases[name] = parent.phases.get(name, 0.0) + seconds
+        if elapsed_ms >= threshold_ms:
+            _emit(current, elapsed_ms)
@@ -1,117 +1,1562 @@
+import contextvars
 import json
+import logging
 import os
+import random
 import sqlite3
 import threading
-from contextlib import contextmanager
-from typing import Iterator
+import time
+import unicodedata
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar
 
-from .app_types import AppState
+from . import metrics, slowlog
+from .app_types import AppState, GameRecord, ParticipantRecord, PersonRecord
 
 DATA_DIR = os.path.join(os.path.dirname(__file__))
 JSON_FALLBACK = os.path.join(DATA_DIR, "data.json")
 DB_PATH = os.path.join(DATA_DIR, "data.sqlite")
 
-_lock = threading.Lock()
+SCHEMA_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Connection tunables (see .env.example); cache_size < 0 is in KiB.
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-16000"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# NORMAL survives app crashes; FULL also survives power loss (one fsync per
+# commit, which group commit amortizes across a batch).
+SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+# Group commit (see submit_edit): how long a batch leader waits for company and
+# the most edits folded into one transaction. MAX_BATCH <= 1 disables batching.
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+# Retries (with exponential backoff) for writes that lost a race with another process.
+WRITE_RETRIES = int(os.getenv("SQLITE_WRITE_RETRIES", "8"))
+# Change log rows kept for GET /api/changes; older cursors must resync.
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", "100000"))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    admin_password_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    assignment_version INTEGER NOT NULL DEFAULT 0,
+    any_revealed INTEGER NOT NULL DEFAULT 0,
+    revision INTEGER NOT NULL DEFAULT 0,
+    title_key TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS participants (
+    game_id TEXT NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    person_id TEXT,
+    name TEXT NOT NULL,
+    token TEXT NOT NULL,
+    assigned_to_participant_id TEXT,
+    viewed INTEGER NOT NULL DEFAULT 0,
+    viewed_at TEXT,
+    active INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (game_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_games_created ON games(created_at, game_id);
+CREATE INDEX IF NOT EXISTS idx_games_active_created ON games(active, created_at, game_id);
+CREATE INDEX IF NOT EXISTS idx_games_title_key ON games(title_key, created_at, game_id);
+CREATE INDEX IF NOT EXISTS idx_participants_token ON participants(token);
+CREATE INDEX IF NOT EXISTS idx_participants_person ON participants(person_id);
+CREATE TABLE IF NOT EXISTS wishlist_items (
+    game_id TEXT NOT NULL,
+    participant_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    price REAL,
+    url TEXT,
+    PRIMARY KEY (game_id, participant_id, id),
+    FOREIGN KEY (game_id, participant_id) REFERENCES participants(game_id, id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS people (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    position INTEGER NOT NULL,
+    name_key TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_people_name_key ON people(name_key, id);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    generation INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    game_id TEXT,
+    entity_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+);
+"""
+
+_GAME_COLUMNS = (
+    "game_id, title, admin_password_hash, created_at, updated_at, active, assignment_version, any_revealed, revision,"
+    " title_key"
+)
+_PARTICIPANT_COLUMNS = (
+    "game_id, id, position, person_id, name, token, assigned_to_participant_id, viewed, viewed_at, active"
+)
+_WISH_COLUMNS = "game_id, participant_id, id, position, title, price, url"
+_PERSON_COLUMNS = "id, name, active, position, name_key"
+
+# Row tuples keyed by primary key; comparing them is how edit_state() finds
+# the rows a mutation actually touched.
+GameRows = Tuple[tuple, Dict[str, tuple], Dict[Tuple[str, str], tuple]]
 
 
 def _ensure_data_dir() -> None:
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def _connect() -> sqlite3.Connection:
-    _ensure_data_dir()
-    conn = sqlite3.connect(DB_PATH)
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
     conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
+    synchronous = SYNCHRONOUS if SYNCHRONOUS in ("OFF", "NORMAL", "FULL", "EXTRA") else "NORMAL"
+    conn.execute(f"PRAGMA synchronous={synchronous};")
+    conn.execute("PRAGMA foreign_keys=ON;")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_MS)};")
+    conn.execute(f"PRAGMA cache_size={int(CACHE_SIZE)};")
+    conn.execute(f"PRAGMA mmap_size={int(MMAP_SIZE)};")
     return conn
 
 
+class ConnectionPool:
+    """Bounded set of long-lived connections to one database file.
+
+    PRAGMAs run once per connection and the schema is initialized once per pool.
+    A thread that already holds a connection gets the same one back on nested use.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = max(1, size)
+        self._idle: List[sqlite3.Connection] = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._initialized = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                self._cond.wait()
+        try:
+            conn = _connect(self.path)
+            with self._cond:
+                if not self._initialized:
+                    _init_db(conn)
+                    self._initialized = True
+            return conn
+        except BaseException:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._cond:
+            if self._closed:
+                self._created -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._release(conn)
+
+    @contextmanager
+    def dedicated(self) -> Iterator[sqlite3.Connection]:
+        """A connection of its own, outside the pool, closed on exit.
+
+        For readers paced by a client (streaming downloads): they may run for
+        minutes and resume on any thread, so they must not sit on one of the
+        `size` connections every other request waits for.
+        """
+        if not self._initialized:
+            with self.connection():
+                pass  # the first pooled connection initializes the schema
+        conn = _connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        """Close idle connections now; busy ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    """Shared pool for the current DB_PATH (re-created if the path changes, e.g. in tests)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH or _pool._closed:
+            if _pool is not None:
+                _pool.close()
+            _ensure_data_dir()
+            _pool = ConnectionPool(DB_PATH, POOL_SIZE)
+        return _pool
+
+
+def close_pool() -> None:
+    """Close pooled connections (called on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    _cache.clear()
+
+
+def _database_bytes() -> int:
+    """On-disk size of the database, WAL included (read at scrape time)."""
+    total = 0
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+metrics.registry.gauge("storage_database_bytes", "Size of the SQLite database and its WAL.", _database_bytes)
+
+
 def _init_db(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
-    )
-    conn.commit()
+    conn.executescript(_SCHEMA)
+    if _read_meta(conn, "schema_version") is None:
+        _migrate_legacy(conn)
 
 
-def _read_kv(conn: sqlite3.Connection, key: str) -> str | None:
-    cur = conn.execute("SELECT value FROM kv WHERE key = ?", (key,))
-    row = cur.fetchone()
+def _read_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
     return row[0] if row else None
 
 
-def _write_kv(conn: sqlite3.Connection, key: str, value: str) -> None:
+def _write_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
     conn.execute(
-        "INSERT INTO kv(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
         (key, value),
     )
-    conn.commit()
 
 
 def _default_state() -> AppState:
     return {"games": {}, "people": []}
 
 
-def _migrate_from_json(conn: sqlite3.Connection) -> AppState:
-    if not os.path.exists(JSON_FALLBACK):
-        return _default_state()
-    try:
-        with open(JSON_FALLBACK, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        data = _default_state()
-    # write and keep json as backup (no delete)
+def _read_legacy_state(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+    """Return the pre-normalization state (kv blob, then data.json) if any."""
+    has_kv = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'kv'"
+    ).fetchone()
+    if has_kv:
+        row = conn.execute("SELECT value FROM kv WHERE key = 'state'").fetchone()
+        if row is not None:
+            try:
+                return json.loads(row[0])
+            except Exception:
+                return _default_state()
+    if os.path.exists(JSON_FALLBACK):
+        try:
+            with open(JSON_FALLBACK, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return _default_state()
+    return None
+
+
+def _dedupe_ids(records: List[Dict[str, Any]], prefix: str) -> None:
+    """Older blobs could hold repeated ids (e.g. re-added participants); give them fresh ones."""
+    seen = set()
+    for record in records:
+        rid = record.get("id")
+        if rid and rid not in seen:
+            seen.add(rid)
+            continue
+        idx = len(seen) + 1
+        while f"{prefix}{idx}" in seen:
+            idx += 1
+        record["id"] = f"{prefix}{idx}"
+        seen.add(record["id"])
+
+
+def _migrate_legacy(conn: sqlite3.Connection) -> None:
+    """One-time move from the single `kv.state` JSON blob (or data.json) to real tables.
+
+    The legacy data.json file is kept on disk as a backup; the kv table is dropped
+    once its rows live in the normalized schema.
+    """
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        _write_kv(conn, "state", json.dumps(data, ensure_ascii=False, separators=(",", ":")))
-    except Exception:
-        pass
-    return data
+        if _read_meta(conn, "schema_version") is None:
+            legacy = _read_legacy_state(conn)
+            if legacy:
+                games = legacy.get("games") or {}
+                for gid, game in games.items():
+                    game = dict(game)
+                    game["game_id"] = gid
+                    participants = [dict(p) for p in game.get("participants") or []]
+                    _dedupe_ids(participants, "p")
+                    for participant in participants:
+                        items = [dict(item) for item in participant.get("wish_list") or []]
+                        _dedupe_ids(items, "w")
+                        participant["wish_list"] = items
+                    game["participants"] = participants
+                    game["revision"] = 1
+                    _insert_game_rows(conn, _game_rows(gid, game))  # type: ignore[arg-type]
+                people = [dict(p) for p in legacy.get("people") or []]
+                _dedupe_ids(people, "u")
+                _insert_people_rows(conn, _people_rows(people).values())  # type: ignore[arg-type]
+            conn.execute("DROP TABLE IF EXISTS kv")
+            _write_meta(conn, "schema_version", str(SCHEMA_VERSION))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
 
 
-def _load_from_conn(conn: sqlite3.Connection) -> AppState:
-    raw = _read_kv(conn, "state")
-    if raw is None:
-        data = _migrate_from_json(conn)
-    else:
+def _game_row(gid: str, game: GameRecord) -> tuple:
+    return (
+        gid,
+        game.get("title", ""),
+        game.get("admin_password_hash", ""),
+        game.get("created_at", ""),
+        game.get("updated_at", game.get("created_at", "")),
+        int(bool(game.get("active", True))),
+        int(game.get("assignment_version", 0) or 0),
+        int(bool(game.get("any_revealed", False))),
+        int(game.get("revision", 0) or 0),
+        name_key(game.get("title", "")),
+    )
+
+
+def _game_rows(gid: str, game: GameRecord) -> GameRows:
+    participants: Dict[str, tuple] = {}
+    wishes: Dict[Tuple[str, str], tuple] = {}
+    for position, p in enumerate(game.get("participants", [])):
+        pid = p["id"]
+        participants[pid] = (
+            gid,
+            pid,
+            position,
+            p.get("person_id"),
+            p.get("name", ""),
+            p.get("token", ""),
+            p.get("assigned_to_participant_id"),
+            int(bool(p.get("viewed", False))),
+            p.get("viewed_at"),
+            int(bool(p.get("active", True))),
+        )
+        for item_position, item in enumerate(p.get("wish_list") or []):
+            wishes[(pid, item["id"])] = (
+                gid,
+                pid,
+                item["id"],
+                item_position,
+                item.get("title", ""),
+                item.get("price"),
+                item.get("url"),
+            )
+    return _game_row(gid, game), participants, wishes
+
+
+@lru_cache(maxsize=65536)
+def name_key(name: str) -> str:
+    """Search key for a name: accents stripped, case folded, spaces collapsed."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def _people_rows(people: Iterable[PersonRecord]) -> Dict[str, tuple]:
+    rows = {}
+    for position, p in enumerate(people):
+        name = p.get("name", "")
+        rows[p["id"]] = (p["id"], name, int(bool(p.get("active", True))), position, name_key(name))
+    return rows
+
+
+def _insert_game_rows(conn: sqlite3.Connection, rows: GameRows) -> None:
+    game_row, participants, wishes = rows
+    conn.execute(f"INSERT INTO games({_GAME_COLUMNS}) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", game_row)
+    conn.executemany(
+        f"INSERT INTO participants({_PARTICIPANT_COLUMNS}) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        participants.values(),
+    )
+    conn.executemany(
+        f"INSERT INTO wishlist_items({_WISH_COLUMNS}) VALUES(?, ?, ?, ?, ?, ?, ?)",
+        wishes.values(),
+    )
+
+
+def _insert_people_rows(conn: sqlite3.Connection, rows: Iterable[tuple]) -> None:
+    conn.executemany(f"INSERT INTO people({_PERSON_COLUMNS}) VALUES(?, ?, ?, ?, ?)", rows)
+
+
+def _write_game_diff(conn: sqlite3.Connection, gid: str, before: Optional[GameRows], after: Optional[GameRows]) -> None:
+    if after is None:
+        if before is not None:
+            conn.execute("DELETE FROM games WHERE game_id = ?", (gid,))
+        return
+    if before is None:
+        _insert_game_rows(conn, after)
+        return
+    old_game, old_participants, old_wishes = before
+    new_game, new_participants, new_wishes = after
+    if old_game != new_game:
+        conn.execute(
+            "UPDATE games SET title = ?, admin_password_hash = ?, created_at = ?, updated_at = ?, "
+            "active = ?, assignment_version = ?, any_revealed = ?, revision = ?, title_key = ? WHERE game_id = ?",
+            (*new_game[1:], gid),
+        )
+    removed = [(gid, pid) for pid in old_participants if pid not in new_participants]
+    conn.executemany("DELETE FROM participants WHERE game_id = ? AND id = ?", removed)
+    changed = [row for pid, row in new_participants.items() if old_participants.get(pid) != row]
+    conn.executemany(
+        f"INSERT INTO participants({_PARTICIPANT_COLUMNS}) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(game_id, id) DO UPDATE SET position=excluded.position, person_id=excluded.person_id, "
+        "name=excluded.name, token=excluded.token, assigned_to_participant_id=excluded.assigned_to_participant_id, "
+        "viewed=excluded.viewed, viewed_at=excluded.viewed_at, active=excluded.active",
+        changed,
+    )
+    removed_items = [
+        (gid, pid, item_id)
+        for (pid, item_id) in old_wishes
+        if (pid, item_id) not in new_wishes and pid in new_participants
+    ]
+    conn.executemany(
+        "DELETE FROM wishlist_items WHERE game_id = ? AND participant_id = ? AND id = ?", removed_items
+    )
+    changed_items = [row for key, row in new_wishes.items() if old_wishes.get(key) != row]
+    conn.executemany(
+        f"INSERT INTO wishlist_items({_WISH_COLUMNS}) VALUES(?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(game_id, participant_id, id) DO UPDATE SET position=excluded.position, "
+        "title=excluded.title, price=excluded.price, url=excluded.url",
+        changed_items,
+    )
+
+
+def _write_people_diff(conn: sqlite3.Connection, before: Dict[str, tuple], after: Dict[str, tuple]) -> None:
+    removed = [(pid,) for pid in before if pid not in after]
+    conn.executemany("DELETE FROM people WHERE id = ?", removed)
+    changed = [row for pid, row in after.items() if before.get(pid) != row]
+    conn.executemany(
+        f"INSERT INTO people({_PERSON_COLUMNS}) VALUES(?, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET name=excluded.name, active=excluded.active, position=excluded.position, "
+        "name_key=excluded.name_key",
+        changed,
+    )
+
+
+def _game_changes(gid: str, before: Optional[GameRows], after: Optional[GameRows]) -> List[Tuple[str, Optional[str], str, str]]:
+    """(kind, game_id, entity_id, op) change-log entries for one game's diff.
+
+    Wish list items are reported as a change of the participant that owns them.
+    """
+    if after is None:
+        return [("game", gid, gid, "delete")] if before is not None else []
+    old_game, old_participants, old_wishes = before if before is not None else ((), {}, {})
+    new_game, new_participants, new_wishes = after
+    changes: List[Tuple[str, Optional[str], str, str]] = []
+    if old_game != new_game:
+        changes.append(("game", gid, gid, "upsert"))
+    touched = {pid for pid, row in new_participants.items() if old_participants.get(pid) != row}
+    touched |= {key[0] for key in set(old_wishes) ^ set(new_wishes)}
+    touched |= {key[0] for key, row in new_wishes.items() if key in old_wishes and old_wishes[key] != row}
+    for pid in sorted(touched):
+        if pid in new_participants:
+            changes.append(("participant", gid, pid, "upsert"))
+    for pid in old_participants:
+        if pid not in new_participants:
+            changes.append(("participant", gid, pid, "delete"))
+    return changes
+
+
+def _people_changes(before: Dict[str, tuple], after: Dict[str, tuple]) -> List[Tuple[str, Optional[str], str, str]]:
+    changes: List[Tuple[str, Optional[str], str, str]] = [
+        ("person", None, pid, "upsert") for pid, row in after.items() if before.get(pid) != row
+    ]
+    changes += [("person", None, pid, "delete") for pid in before if pid not in after]
+    return changes
+
+
+def _append_changes(conn: sqlite3.Connection, generation: int, changes: List[Tuple[str, Optional[str], str, str]]) -> None:
+    if not changes:
+        return
+    changed_at = datetime.now(timezone.utc).isoformat()
+    conn.executemany(
+        "INSERT INTO changes(generation, kind, game_id, entity_id, op, changed_at) VALUES(?, ?, ?, ?, ?, ?)",
+        [(generation, *change, changed_at) for change in changes],
+    )
+    if CHANGE_LOG_RETENTION > 0 and generation % 500 == 0:
+        conn.execute(
+            "DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (CHANGE_LOG_RETENTION,)
+        )
+
+
+class ChangeBatch(NamedTuple):
+    cursor: int  # pass back as `since` to continue after these rows
+    rows: List[Tuple[int, str, Optional[str], str, str, str]]  # seq, kind, game_id, entity_id, op, changed_at
+    has_more: bool
+    expired: bool  # `since` is older than the retained log: the caller must resync
+
+
+def read_changes(since: Optional[int], limit: int = 1000) -> ChangeBatch:
+    """Change-log rows after `since` (`None`: no rows, just the current cursor)."""
+    with _get_pool().connection() as conn:
+        conn.execute("BEGIN")
         try:
-            data = json.loads(raw)
-        except Exception:
-            data = _default_state()
-    if "games" not in data:
-        data["games"] = {}
-    if "people" not in data:
-        data["people"] = []
-    for game in data["games"].values():
-        for participant in game.get("participants", []):
-            if "wish_list" not in participant or participant["wish_list"] is None:
-                participant["wish_list"] = []
-    return data
-
-
-def load_state() -> AppState:
-    _ensure_data_dir()
-    conn = _connect()
+            latest, oldest = conn.execute("SELECT MAX(seq), MIN(seq) FROM changes").fetchone()
+            if since is None:
+                return ChangeBatch(int(latest or 0), [], False, False)
+            if oldest is not None and since < oldest - 1:
+                return ChangeBatch(since, [], False, True)
+            if latest is None:
+                # Log is empty (fresh, or pruned past every row); only the start is valid.
+                seq_row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+                floor = int(seq_row[0]) if seq_row else 0
+                return ChangeBatch(max(since, floor), [], False, since < floor)
+            rows = conn.execute(
+                "SELECT seq, kind, game_id, entity_id, op, changed_at FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (since, limit + 1),
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return ChangeBatch(rows[-1][0] if rows else max(since, int(latest)), rows, has_more, False)
+
+
+def _placeholders(values: Sequence[Any]) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def _chunks(values: Sequence[T], size: int = 400) -> Iterator[Sequence[T]]:
+    """Slices short enough to bind as one IN list on any SQLite build."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class ChangedRecords(NamedTuple):
+    games: Dict[str, Dict[str, Any]]  # game summaries with participant_count
+    participants: Dict[Tuple[str, str], Dict[str, Any]]  # (game_id, id) -> summary with wish_list_count
+    people: Dict[str, PersonRecord]
+
+
+def read_changed_records(
+    game_ids: Sequence[str],
+    participant_keys: Sequence[Tuple[str, str]],
+    person_ids: Sequence[str],
+) -> ChangedRecords:
+    """Current rows for the records a change batch names, looked up by primary key.
+
+    Reads one snapshot and only the rows asked for, so the cost follows the
+    number of changes rather than game or directory size. Tokens and
+    assignments are left out: missing keys mean the record is gone.
+    """
+    games: Dict[str, Dict[str, Any]] = {}
+    participants: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    people: Dict[str, PersonRecord] = {}
+    with _get_pool().connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            for chunk in _chunks(list(game_ids)):
+                for row in conn.execute(
+                    "SELECT g.game_id, g.title, g.created_at, g.updated_at, g.active, g.any_revealed,"
+                    " g.assignment_version, g.revision,"
+                    " (SELECT COUNT(*) FROM participants p WHERE p.game_id = g.game_id)"
+                    f" FROM games g WHERE g.game_id IN ({_placeholders(chunk)})",
+                    chunk,
+                ):
+                    games[row[0]] = {
+                        "game_id": row[0],
+                        "title": row[1],
+                        "created_at": row[2],
+                        "updated_at": row[3],
+                        "active": bool(row[4]),
+                        "any_revealed": bool(row[5]),
+                        "assignment_version": row[6],
+                        "participant_count": row[8],
+                        "revision": row[7],
+                    }
+            for chunk in _chunks(list(participant_keys)):
+                keys = ", ".join("(?, ?)" for _ in chunk)
+                for row in conn.execute(
+                    "SELECT p.game_id, p.id, p.name, p.person_id, p.active, p.viewed, p.viewed_at,"
+                    " (SELECT COUNT(*) FROM wishlist_items w WHERE w.game_id = p.game_id AND w.participant_id = p.id)"
+                    f" FROM participants p WHERE (p.game_id, p.id) IN (VALUES {keys})",
+                    [value for key in chunk for value in key],
+                ):
+                    participants[(row[0], row[1])] = {
+                        "game_id": row[0],
+                        "id": row[1],
+                        "name": row[2],
+                        "person_id": row[3],
+                        "active": bool(row[4]),
+                        "viewed": bool(row[5]),
+                        "viewed_at": row[6],
+                        "wish_list_count": row[7],
+                    }
+            for chunk in _chunks(list(person_ids)):
+                for row in conn.execute(
+                    f"SELECT id, name, active FROM people WHERE id IN ({_placeholders(chunk)})", chunk
+                ):
+                    people[row[0]] = {"id": row[0], "name": row[1], "active": bool(row[2])}
+        finally:
+            conn.execute("COMMIT")
+    return ChangedRecords(games, participants, people)
+
+
+def _fetch_games(conn: sqlite3.Connection, game_ids: Optional[Sequence[str]]) -> Dict[str, GameRecord]:
+    """Assemble GameRecords from rows; `None` loads every game."""
+    if game_ids is None:
+        where, params = "", ()
+    else:
+        if not game_ids:
+            return {}
+        where, params = f" WHERE game_id IN ({_placeholders(game_ids)})", tuple(game_ids)
+    games: Dict[str, GameRecord] = {}
+    for row in conn.execute(f"SELECT {_GAME_COLUMNS} FROM games{where} ORDER BY rowid", params):
+        games[row[0]] = {
+            "game_id": row[0],
+            "title": row[1],
+            "admin_password_hash": row[2],
+            "created_at": row[3],
+            "updated_at": row[4],
+            "active": bool(row[5]),
+            "assignment_version": int(row[6]),
+            "any_revealed": bool(row[7]),
+            "revision": int(row[8]),
+            "participants": [],
+        }
+    if not games:
+        return games
+    by_key: Dict[Tuple[str, str], ParticipantRecord] = {}
+    for row in conn.execute(
+        f"SELECT {_PARTICIPANT_COLUMNS} FROM participants{where} ORDER BY game_id, position", params
+    ):
+        participant: ParticipantRecord = {
+            "id": row[1],
+            "person_id": row[3],
+            "name": row[4],
+            "token": row[5],
+            "assigned_to_participant_id": row[6],
+            "viewed": bool(row[7]),
+            "viewed_at": row[8],
+            "active": bool(row[9]),
+            "wish_list": [],
+        }
+        games[row[0]]["participants"].append(participant)
+        by_key[(row[0], row[1])] = participant
+    for row in conn.execute(
+        f"SELECT {_WISH_COLUMNS} FROM wishlist_items{where} ORDER BY game_id, participant_id, position", params
+    ):
+        owner = by_key.get((row[0], row[1]))
+        if owner is not None:
+            owner["wish_list"].append({"id": row[2], "title": row[4], "price": row[5], "url": row[6]})
+    return games
+
+
+def _fetch_people(conn: sqlite3.Connection) -> List[PersonRecord]:
+    return [
+        {"id": row[0], "name": row[1], "active": bool(row[2])}
+        for row in conn.execute(f"SELECT {_PERSON_COLUMNS} FROM people ORDER BY position, rowid")
+    ]
+
+
+def _read_generation(conn: sqlite3.Connection) -> int:
+    value = _read_meta(conn, "generation")
+    return int(value) if value is not None else 0
+
+
+def _read_people_revision(conn: sqlite3.Connection) -> int:
+    """Counter bumped by every commit that changes people rows (the directory's `revision`)."""
+    value = _read_meta(conn, "people_revision")
+    return int(value) if value is not None else 0
+
+
+def _clone_game(game: GameRecord) -> GameRecord:
+    clone = dict(game)
+    clone["participants"] = [
+        {**p, "wish_list": [dict(item) for item in p.get("wish_list") or []]}
+        for p in game.get("participants", [])
+    ]
+    return clone  # type: ignore[return-value]
+
+
+class ParticipantIndex(NamedTuple):
+    """Positions of a game's participants in its `participants` list."""
+
+    by_id: Dict[str, int]
+    by_token: Dict[str, int]
+
+
+def _build_index(game: GameRecord) -> ParticipantIndex:
+    by_id: Dict[str, int] = {}
+    by_token: Dict[str, int] = {}
+    for position, p in enumerate(game.get("participants", [])):
+        by_id[p["id"]] = position
+        by_token[p["token"]] = position
+    return ParticipantIndex(by_id, by_token)
+
+
+class _StateCache:
+    """Committed records shared by every reader in the process.
+
+    Entries are valid for one value of the `meta.generation` counter, which every
+    write transaction bumps (from any process). Readers compare it inside their
+    read transaction; edit_state() patches the entries it changed after commit.
+    Cached records are shared and must be treated as read-only.
+
+    Alongside the records it keeps a token -> (game_id, participant_id) map and
+    per-game participant position indexes, maintained on the same commits.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._reset(None, None)
+
+    def _reset(self, path: Optional[str], generation: Optional[int]) -> None:
+        self.path = path
+        self.generation = generation
+        self.games: Dict[str, Optional[GameRecord]] = {}
+        self.all_games = False
+        self.people: Optional[List[PersonRecord]] = None
+        self.tokens: Dict[str, Tuple[str, str]] = {}
+        self.game_tokens: Dict[str, Set[str]] = {}
+        self.indexes: Dict[str, ParticipantIndex] = {}
+
+    def sync(self, generation: int) -> None:
+        """Drop everything when the database moved past the cached generation (lock held)."""
+        if self.path != DB_PATH or self.generation != generation:
+            self._reset(DB_PATH, generation)
+
+    def clear(self) -> None:
+        with self.lock:
+            self._reset(None, None)
+
+    def put_game(self, gid: str, game: Optional[GameRecord]) -> None:
+        """Store a committed record and refresh the token map for it (lock held)."""
+        self.games[gid] = game
+        self.indexes.pop(gid, None)
+        for token in self.game_tokens.pop(gid, ()):
+            self.tokens.pop(token, None)
+        if game is not None:
+            tokens = self.game_tokens[gid] = set()
+            for p in game.get("participants", []):
+                self.tokens[p["token"]] = (gid, p["id"])
+                tokens.add(p["token"])
+
+    def commit(
+        self,
+        generation: int,
+        games: Dict[str, Optional[GameRecord]],
+        people: Optional[List[PersonRecord]],
+    ) -> None:
+        """Apply a transaction that moved the database from `generation` to `generation + 1`."""
+        with self.lock:
+            if self.path != DB_PATH or self.generation != generation:
+                return
+            self.generation = generation + 1
+            for gid, game in games.items():
+                self.put_game(gid, _clone_game(game) if game is not None else None)
+            if people is not None:
+                self.people = [dict(p) for p in people]  # type: ignore[misc]
+
+
+_cache = _StateCache()
+
+
+def _read_through(
+    conn: sqlite3.Connection,
+    game_ids: Optional[Sequence[str]] = None,
+    include_people: bool = True,
+) -> Tuple[AppState, int, int]:
+    """Serve records from the cache, loading only misses from one read snapshot.
+
+    Returns the state, the generation it was read at and the people revision
+    (0 when people were not asked for).
+    """
+    conn.execute("BEGIN")
     try:
-        _init_db(conn)
-        return _load_from_conn(conn)
+        generation = _read_generation(conn)
+        people_revision = _read_people_revision(conn) if include_people else 0
+        with _cache.lock:
+            _cache.sync(generation)
+            if game_ids is None:
+                games = (
+                    {gid: g for gid, g in _cache.games.items() if g is not None}
+                    if _cache.all_games
+                    else None
+                )
+                missing: Optional[List[str]] = None
+            else:
+                games = {gid: _cache.games[gid] for gid in game_ids if _cache.games.get(gid) is not None}
+                missing = [gid for gid in game_ids if gid not in _cache.games]
+            people = _cache.people if include_people else []
+        if games is None:
+            games = _fetch_games(conn, None)
+        elif missing:
+            fetched = _fetch_games(conn, missing)
+            games.update(fetched)
+        if people is None:
+            people = _fetch_people(conn)
+        with _cache.lock:
+            if _cache.path == DB_PATH and _cache.generation == generation:
+                if game_ids is None:
+                    for gid, game in games.items():
+                        if _cache.games.get(gid) is not game:
+                            _cache.put_game(gid, game)
+                    _cache.all_games = True
+                elif missing:
+                    for gid in missing:
+                        _cache.put_game(gid, games.get(gid))
+                if include_people:
+                    _cache.people = people
+        return {"games": games, "people": people}, generation, people_revision
     finally:
-        conn.close()
+        conn.execute("COMMIT")
 
 
-@contextmanager
-def edit_state() -> Iterator[AppState]:
-    _ensure_data_dir()
-    with _lock:
-        conn = _connect()
+def load_state(game_ids: Optional[Sequence[str]] = None, include_people: bool = True) -> AppState:
+    """Read the state, optionally limited to some games (`None` = every game).
+
+    Records may come from the shared in-process cache: callers must not mutate them.
+    """
+    with _get_pool().connection() as conn:
+        return _read_through(conn, game_ids, include_people)[0]
+
+
+def load_game(game_id: str) -> Optional[GameRecord]:
+    return load_state([game_id], include_people=False)["games"].get(game_id)
+
+
+def load_people() -> List[PersonRecord]:
+    return load_state([], include_people=True)["people"]
+
+
+def game_exists(game_id: str) -> bool:
+    return load_game(game_id) is not None
+
+
+def list_game_summaries(
+    limit: int,
+    after: Optional[Tuple[str, str]] = None,
+    active: Optional[bool] = None,
+    any_revealed: Optional[bool] = None,
+    title_prefix: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Newest-first page of game summaries, read straight from the tables.
+
+    Keyset pagination: `after` is the (created_at, game_id) of the previous
+    page's last row, so a page walks an index from there instead of sorting
+    every game. `active` walks idx_games_active_created, so it still costs
+    O(page). `title_prefix` is folded with `name_key` (case- and
+    accent-insensitive) and read as a range on idx_games_title_key: the cost is
+    the matching games, which are sorted, never the whole table.
+    `any_revealed` is only checked along the walk; it is rarely selective.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    if after is not None:
+        clauses.append("(g.created_at, g.game_id) < (?, ?)")
+        params += list(after)
+    if active is not None:
+        clauses.append("g.active = ?")
+        params.append(int(active))
+    if any_revealed is not None:
+        clauses.append("g.any_revealed = ?")
+        params.append(int(any_revealed))
+    key = name_key(title_prefix) if title_prefix else ""
+    if key:
+        clauses.append("g.title_key >= ? AND g.title_key < ?")
+        params += [key, key + "\U0010ffff"]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT g.game_id, g.title, g.created_at, g.any_revealed, g.active, g.revision,"
+            " (SELECT COUNT(*) FROM participants p WHERE p.game_id = g.game_id)"
+            f" FROM games g {where} ORDER BY g.created_at DESC, g.game_id DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+    return [
+        {
+            "game_id": row[0],
+            "title": row[1],
+            "created_at": row[2],
+            "any_revealed": bool(row[3]),
+            "active": bool(row[4]),
+            "revision": row[5],
+            "participant_count": row[6],
+        }
+        for row in rows
+    ]
+
+
+def list_people_page(
+    limit: int,
+    after: Optional[Tuple[str, str]] = None,
+    prefix: Optional[str] = None,
+    active: Optional[bool] = None,
+) -> List[PersonRecord]:
+    """People ordered by (name_key, id), read from idx_people_name_key.
+
+    `prefix` must already be folded with `name_key`; it becomes a range on the
+    index, so a typeahead page costs O(page) however large the directory is.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    if prefix:
+        clauses.append("name_key >= ? AND name_key < ?")
+        params += [prefix, prefix + "\U0010ffff"]
+    if after is not None:
+        clauses.append("(name_key, id) > (?, ?)")
+        params += list(after)
+    if active is not None:
+        clauses.append("active = ?")
+        params.append(int(active))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _get_pool().connection() as conn:
+        rows = conn.execute(
+            f"SELECT id, name, active FROM people {where} ORDER BY name_key, id LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+    return [{"id": row[0], "name": row[1], "active": bool(row[2])} for row in rows]
+
+
+def list_game_ids() -> List[str]:
+    with _get_pool().connection() as conn:
+        return [row[0] for row in conn.execute("SELECT game_id FROM games ORDER BY game_id")]
+
+
+def iter_export(batch_size: int = 200) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ("person", record) then ("game", record) for the whole database.
+
+    Everything is read inside one transaction, so the export is a consistent
+    snapshot, but only `batch_size` games are held in memory at a time. Writers
+    are not blocked (WAL); the snapshot just keeps the WAL from being checkpointed
+    until the export finishes. The connection is not a pooled one, so a slow
+    download never starves other requests.
+    """
+    with _get_pool().dedicated() as conn:
+        conn.execute("BEGIN")
+        last_position = -1
+        while True:
+            rows = conn.execute(
+                "SELECT id, name, active, position FROM people WHERE position > ? ORDER BY position LIMIT ?",
+                (last_position, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                yield "person", {"id": row[0], "name": row[1], "active": bool(row[2])}
+            last_position = rows[-1][3]
+        last_game = ""
+        while True:
+            ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT game_id FROM games WHERE game_id > ? ORDER BY game_id LIMIT ?", (last_game, batch_size)
+                )
+            ]
+            if not ids:
+                break
+            games = _fetch_games(conn, ids)
+            for gid in ids:
+                yield "game", games[gid]  # type: ignore[misc]
+            last_game = ids[-1]
+        conn.execute("COMMIT")
+
+
+def person_games(person_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Every participation of a directory person, newest game first (None: no such person).
+
+    Served by idx_participants_person, which SQLite keeps in step with each write,
+    so the cost depends on the person's games rather than on the whole table.
+    """
+    with _get_pool().connection() as conn:
+        conn.execute("BEGIN")
         try:
-            _init_db(conn)
-            state = _load_from_conn(conn)
-            yield state
-            payload = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
-            _write_kv(conn, "state", payload)
+            if conn.execute("SELECT 1 FROM people WHERE id = ?", (person_id,)).fetchone() is None:
+                return None
+            rows = conn.execute(
+                "SELECT p.game_id, g.title, g.active, g.created_at, g.assignment_version, p.id, p.name, p.active,"
+                " p.viewed, a.id, a.name"
+                " FROM participants p JOIN games g ON g.game_id = p.game_id"
+                " LEFT JOIN participants a ON a.game_id = p.game_id AND a.id = p.assigned_to_participant_id"
+                " WHERE p.person_id = ? ORDER BY g.created_at DESC, g.game_id DESC",
+                (person_id,),
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+    return [
+        {
+            "game_id": row[0],
+            "title": row[1],
+            "game_active": bool(row[2]),
+            "created_at": row[3],
+            "assignment_version": row[4],
+            "participant_id": row[5],
+            "name": row[6],
+            "active": bool(row[7]),
+            "viewed": bool(row[8]),
+            "assigned_to": {"participant_id": row[9], "name": row[10]} if row[9] is not None else None,
+        }
+        for row in rows
+    ]
+
+
+def resolve_token(token: str) -> Optional[Tuple[str, str]]:
+    """Map a participant token to (game_id, participant_id) without knowing the game."""
+    with _get_pool().connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            generation = _read_generation(conn)
+            with _cache.lock:
+                _cache.sync(generation)
+                hit = _cache.tokens.get(token)
+            if hit is not None:
+                return hit
+            row = conn.execute(
+                "SELECT game_id, id FROM participants WHERE token = ? LIMIT 1", (token,)
+            ).fetchone()
+            if row is None:
+                return None
+            with _cache.lock:
+                if _cache.path == DB_PATH and _cache.generation == generation:
+                    _cache.tokens[token] = (row[0], row[1])
+                    _cache.game_tokens.setdefault(row[0], set()).add(token)
+            return row[0], row[1]
+        finally:
+            conn.execute("COMMIT")
+
+
+def participant_index(game_id: str) -> Optional[ParticipantIndex]:
+    """Position hints for a cached game's participants (by id and by token).
+
+    Built lazily and rebuilt whenever the cached record changes. Callers working
+    on a copy of the game must verify the participant at the hinted position.
+    """
+    with _cache.lock:
+        index = _cache.indexes.get(game_id)
+        if index is None:
+            game = _cache.games.get(game_id)
+            if game is None:
+                return None
+            index = _cache.indexes[game_id] = _build_index(game)
+        return index
+
+
+class _SharedExclusiveLock:
+    """Many shared holders or one exclusive holder; waiting exclusive holders go first."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0
+
+    def acquire_shared(self) -> None:
+        with self._cond:
+            while self._exclusive or self._waiting:
+                self._cond.wait()
+            self._shared += 1
+
+    def release_shared(self) -> None:
+        with self._cond:
+            self._shared -= 1
+            if not self._shared:
+                self._cond.notify_all()
+
+    def acquire_exclusive(self) -> None:
+        with self._cond:
+            self._waiting += 1
+            while self._exclusive or self._shared:
+                self._cond.wait()
+            self._waiting -= 1
+            self._exclusive = True
+
+    def release_exclusive(self) -> None:
+        with self._cond:
+            self._exclusive = False
+            self._cond.notify_all()
+
+
+class _WriteLocks:
+    """In-process write locks: one per game plus one for the people directory.
+
+    Lock-ordering rule: the people lock is taken first, then game locks in sorted
+    game_id order, so operations spanning both (create_game,
+    add_participants_by_ids) cannot deadlock with each other. Full-state edits
+    (`game_ids=None`) exclude every scoped edit instead.
+    """
+
+    PEOPLE = "people"
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._locks: Dict[str, List[Any]] = {}
+        self._world = _SharedExclusiveLock()
+
+    def _checkout(self, key: str) -> threading.Lock:
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _checkin(self, key: str) -> None:
+        with self._guard:
+            entry = self._locks[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    @staticmethod
+    def ordered_keys(game_ids: Sequence[str], people: bool) -> List[str]:
+        keys = [_WriteLocks.PEOPLE] if people else []
+        return keys + [f"game:{gid}" for gid in sorted(set(game_ids))]
+
+    @contextmanager
+    def hold(self, game_ids: Optional[Sequence[str]], people: bool) -> Iterator[None]:
+        started = time.perf_counter()
+        with self._acquire(game_ids, people):
+            acquired = time.perf_counter()
+            metrics.lock_wait.observe(acquired - started)
+            slowlog.record("lock_wait", acquired - started)
             try:
-                with open(JSON_FALLBACK + ".bak", "w", encoding="utf-8") as f:
-                    f.write(payload)
-            except Exception:
-                pass
+                yield
+            finally:
+                metrics.lock_hold.observe(time.perf_counter() - acquired)
+
+    @contextmanager
+    def _acquire(self, game_ids: Optional[Sequence[str]], people: bool) -> Iterator[None]:
+        if game_ids is None:
+            self._world.acquire_exclusive()
+            try:
+                yield
+            finally:
+                self._world.release_exclusive()
+            return
+        self._world.acquire_shared()
+        acquired: List[str] = []
+        try:
+            for key in self.ordered_keys(game_ids, people):
+                lock = self._checkout(key)
+                acquired.append(key)
+                lock.acquire()
+            yield
         finally:
-            conn.close()
+            for key in reversed(acquired):
+                self._locks[key][0].release()
+                self._checkin(key)
+            self._world.release_shared()
+
+
+class CommitInfo(NamedTuple):
+    """What a committed edit_state() changed, as passed to commit listeners."""
+
+    generation: int
+    games: Dict[str, Optional[GameRecord]]  # committed records; None means deleted
+    people_changed: bool
+    previous: Dict[str, Optional[GameRecord]]  # the same games as they were read; None = new
+
+
+_commit_listeners: List[Callable[[CommitInfo], None]] = []
+
+
+def add_commit_listener(listener: Callable[[CommitInfo], None]) -> None:
+    """Call `listener` after every commit (in the committing thread, locks released)."""
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
+
+
+def remove_commit_listener(listener: Callable[[CommitInfo], None]) -> None:
+    if listener in _commit_listeners:
+        _commit_listeners.remove(listener)
+
+
+def _notify_commit(info: CommitInfo) -> None:
+    for listener in list(_commit_listeners):
+        try:
+            listener(info)
+        except Exception:
+            logger.exception("commit listener failed")
+
+
+class WriteConflict(RuntimeError):
+    """The rows an edit read were changed by another writer before it committed."""
+
+
+def _check_unchanged(
+    conn: sqlite3.Connection,
+    game_ids: Optional[Sequence[str]],
+    before_revisions: Dict[str, int],
+    before_people_revision: Optional[int],
+) -> None:
+    if game_ids is None:
+        rows = conn.execute("SELECT game_id, revision FROM games")
+    else:
+        scope = sorted(set(game_ids) | set(before_revisions))
+        rows = conn.execute(
+            f"SELECT game_id, revision FROM games WHERE game_id IN ({_placeholders(scope)})", scope
+        ) if scope else []
+    if {row[0]: int(row[1]) for row in rows} != before_revisions:
+        raise WriteConflict("game changed by a concurrent writer")
+    # Revision counters, not rows, are compared: this runs under the commit lock.
+    if before_people_revision is not None and _read_people_revision(conn) != before_people_revision:
+        raise WriteConflict("people changed by a concurrent writer")
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, WriteConflict):
+        return True
+    message = str(exc).lower()
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def _with_retries(attempt: Callable[[], T]) -> T:
+    """Run `attempt`, retrying conflicts and SQLITE_BUSY with jittered exponential backoff."""
+    for n in range(WRITE_RETRIES + 1):
+        try:
+            return attempt()
+        except Exception as exc:
+            if n >= WRITE_RETRIES or not _is_retryable(exc):
+                raise
+            delay = min(0.5, 0.005 * 2 ** n) * random.uniform(0.5, 1.5)
+            logger.info("write retry %d after %s; sleeping %.3fs", n + 1, exc, delay)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+_write_locks = _WriteLocks()
+# SQLite allows one writer at a time; this keeps in-process commits from
+# spinning on the busy handler. It is only held around the short write phase.
+_commit_lock = threading.Lock()
+
+
+@contextmanager
+def edit_state(
+    game_ids: Optional[Sequence[str]] = None,
+    include_people: bool = True,
+    optimistic: bool = False,
+) -> Iterator[AppState]:
+    """Yield a (possibly partial) state and persist only the rows that changed.
+
+    `game_ids=None` loads every game; otherwise only the listed games are loaded,
+    and a listed game that the mutation adds is inserted. People are only written
+    back when `include_people` is set. Edits of unrelated games run concurrently;
+    see `_WriteLocks` for the locking rules. Every game whose rows change gets
+    its `revision` bumped in the same transaction.
+
+    The write runs in a `BEGIN IMMEDIATE` transaction and is a compare-and-swap:
+    if another writer (here or in another process) changed a loaded game's
+    revision, or the people revision, it is rolled back with `WriteConflict`.
+    With `optimistic=True` the write locks are only taken for that commit step,
+    not while the caller mutates; `submit_edit` uses this and retries conflicts.
+    """
+    hold = _write_locks.hold(game_ids, include_people)
+    with (nullcontext() if optimistic else hold), _get_pool().connection() as conn:
+        load_started = time.perf_counter()
+        shared, read_generation, people_revision = _read_through(conn, game_ids, include_people)
+        state: AppState = {
+            "games": {gid: _clone_game(game) for gid, game in shared["games"].items()},
+            "people": [dict(p) for p in shared["people"]],  # type: ignore[misc]
+        }
+        encode_started = time.perf_counter()
+        slowlog.record("load", encode_started - load_started)
+        before_games = {gid: _game_rows(gid, game) for gid, game in state["games"].items()}
+        before_revisions = {gid: int(game.get("revision", 0) or 0) for gid, game in state["games"].items()}
+        before_people = _people_rows(state["people"]) if include_people else {}
+        encode_seconds = time.perf_counter() - encode_started
+        mutate_started = time.perf_counter()
+        yield state
+        if not optimistic:  # submit_edit times its mutators itself
+            slowlog.record("mutate", time.perf_counter() - mutate_started)
+        if game_ids is not None:
+            unlocked = set(state["games"]) - set(game_ids)
+            if unlocked:
+                raise RuntimeError(f"edit_state() was not scoped to game(s): {sorted(unlocked)}")
+        # Diff outside the commit lock; revisions only depend on what we read.
+        encode_started = time.perf_counter()
+        diffs: List[Tuple[str, Optional[GameRecord], Optional[GameRows], Optional[GameRows]]] = []
+        for gid in set(before_games) | set(state["games"]):
+            game = state["games"].get(gid)
+            before = before_games.get(gid)
+            after = _game_rows(gid, game) if game is not None else None
+            if after != before:
+                if game is not None:
+                    game["revision"] = before_revisions.get(gid, 0) + 1
+                    after = _game_rows(gid, game)
+                diffs.append((gid, game, before, after))
+        after_people = _people_rows(state.get("people", [])) if include_people else {}
+        encode_seconds += time.perf_counter() - encode_started
+        metrics.encode_time.observe(encode_seconds)
+        slowlog.record("encode", encode_seconds)
+        touched: Dict[str, Optional[GameRecord]] = {}
+        changes: List[Tuple[str, Optional[str], str, str]] = []
+        with (hold if optimistic else nullcontext()), _commit_lock:
+            commit_started = time.perf_counter()
+            rows_before = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation = _read_generation(conn)
+                if generation != read_generation:
+                    # Someone committed since our read (another edit here or another
+                    # process): make sure it did not touch what we are about to write.
+                    _check_unchanged(conn, game_ids, before_revisions, people_revision if include_people else None)
+                for gid, game, before, after in diffs:
+                    _write_game_diff(conn, gid, before, after)
+                    changes += _game_changes(gid, before, after)
+                    touched[gid] = game
+                people_changed = False
+                if include_people:
+                    people_changed = after_people != before_people
+                    if people_changed:
+                        _write_people_diff(conn, before_people, after_people)
+                        changes += _people_changes(before_people, after_people)
+                        _write_meta(conn, "people_revision", str(people_revision + 1))
+                _append_changes(conn, generation + 1, changes)
+                _write_meta(conn, "generation", str(generation + 1))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            commit_seconds = time.perf_counter() - commit_started
+            metrics.commit_time.observe(commit_seconds)
+            metrics.rows_written.inc(conn.total_changes - rows_before)
+            slowlog.record("commit", commit_seconds)
+            slowlog.annotate(games_loaded=len(before_games), rows_written=conn.total_changes - rows_before)
+            _cache.commit(generation, touched, state.get("people", []) if include_people else None)
+    previous = {gid: shared["games"].get(gid) for gid in touched}
+    _notify_commit(CommitInfo(generation + 1, touched, people_changed, previous))
+
+
+class _PendingEdit:
+    __slots__ = (
+        "game_ids", "include_people", "mutator", "context", "result", "error", "leading", "mutate_seconds", "wake"
+    )
+
+    def __init__(self, game_ids: Sequence[str], include_people: bool, mutator: Callable[[AppState], Any]) -> None:
+        self.game_ids = list(game_ids)
+        self.include_people = include_people
+        self.mutator = mutator
+        # The mutator runs in the submitting caller's context, whichever thread leads,
+        # so the phases it records land in that caller's slow-log span.
+        self.context = contextvars.copy_context()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.leading = False
+        self.mutate_seconds = 0.0
+        self.wake = threading.Event()
+
+
+class _GroupCommitter:
+    """Folds concurrent edits of one lock scope into one edit_state() transaction.
+
+    There is one committer per scope (see `submit_edit`), so a batch only holds
+    edits of the same games: a slow mutator, a failed commit or a replayed
+    conflict never holds back writes to other games.
+
+    The first caller to arrive leads: it waits up to `window` seconds (or until
+    `max_batch` edits queue up), then runs every queued mutator against one
+    loaded state and commits once. Each mutator sees its own clone of the games
+    it asked for, so a failing mutator is simply dropped (an in-memory savepoint)
+    while the rest of the batch commits. Callers are woken only after COMMIT
+    returned; leadership then passes to the oldest queued caller.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._queue: List[_PendingEdit] = []
+        self._leader: Optional[_PendingEdit] = None
+        self.users = 0  # callers inside submit(), guarded by _committers_guard
+
+    def submit(self, edit: _PendingEdit) -> Any:
+        with self._cond:
+            self._queue.append(edit)
+            if self._leader is None:
+                self._leader = edit
+                edit.leading = True
+                edit.wake.set()
+            elif len(self._queue) >= GROUP_COMMIT_MAX_BATCH:
+                self._cond.notify_all()
+        queued = time.perf_counter()
+        edit.wake.wait()
+        if edit.leading:
+            self._lead(edit, queued)
+        else:
+            # Another caller's transaction ran this edit; only its mutator was our own work.
+            slowlog.record("group_commit_wait", time.perf_counter() - queued - edit.mutate_seconds)
+        if edit.error is not None:
+            raise edit.error
+        return edit.result
+
+    def _lead(self, leader: _PendingEdit, queued: float) -> None:
+        with self._cond:
+            deadline = time.monotonic() + max(0.0, GROUP_COMMIT_WINDOW_MS) / 1000
+            while len(self._queue) < GROUP_COMMIT_MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._queue[:GROUP_COMMIT_MAX_BATCH]
+            del self._queue[: len(batch)]
+        slowlog.record("group_commit_wait", time.perf_counter() - queued)
+        try:
+            _apply_batch(batch, leader)
+        finally:
+            with self._cond:
+                if self._queue:
+                    self._leader = self._queue[0]
+                    self._leader.leading = True
+                else:
+                    self._leader = None
+                for edit in batch:
+                    edit.wake.set()
+                if self._leader is not None:
+                    self._leader.wake.set()
+
+
+def _apply_batch(batch: List[_PendingEdit], leader: _PendingEdit) -> None:
+    try:
+        _with_retries(lambda: _run_batch(batch, leader))
+    except BaseException as exc:
+        # Nothing in this batch committed: every edit that had not failed on its
+        # own (including ones never run) reports the transaction's failure.
+        for edit in batch:
+            if edit.error is None:
+                edit.result, edit.error = None, exc
+        if not isinstance(exc, Exception):
+            raise
+
+
+def _run_batch(batch: List[_PendingEdit], leader: _PendingEdit) -> None:
+    game_ids = sorted({gid for edit in batch for gid in edit.game_ids})
+    include_people = any(edit.include_people for edit in batch)
+    for edit in batch:
+        edit.result, edit.error = None, None
+    with edit_state(game_ids, include_people, optimistic=True) as state:
+        for edit in batch:
+            view: AppState = {
+                "games": {
+                    gid: _clone_game(state["games"][gid]) for gid in edit.game_ids if gid in state["games"]
+                },
+                "people": [dict(p) for p in state["people"]] if edit.include_people else [],  # type: ignore[misc]
+            }
+            started = time.perf_counter()
+            try:
+                edit.result = edit.context.run(edit.mutator, view)
+                unlocked = set(view["games"]) - set(edit.game_ids)
+                if unlocked:
+                    raise RuntimeError(f"edit_state() was not scoped to game(s): {sorted(unlocked)}")
+            except Exception as exc:
+                edit.error = exc
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                edit.mutate_seconds += elapsed
+                edit.context.run(slowlog.record, "mutate", elapsed)
+                if edit is not leader:
+                    slowlog.record("group_commit_wait", elapsed)
+            for gid in edit.game_ids:
+                game = view["games"].get(gid)
+                if game is None:
+                    state["games"].pop(gid, None)
+                    continue
+                previous = state["games"].get(gid)
+                if len(batch) > 1 and previous is not None and _game_rows(gid, game) != _game_rows(gid, previous):
+                    # The batch commits once, but later edits in it must see this one
+                    # as a new revision, or their If-Match checks would pass against it.
+                    game["revision"] = int(previous.get("revision", 0) or 0) + 1
+                state["games"][gid] = game
+            if edit.include_people:
+                state["people"] = view["people"]
+
+
+_committers: Dict[Tuple[str, ...], _GroupCommitter] = {}
+_committers_guard = threading.Lock()
+
+
+def submit_edit(game_ids: Sequence[str], mutator: Callable[[AppState], T], include_people: bool = False) -> T:
+    """Run `mutator` on a state scoped to `game_ids` and commit it, group-commit style.
+
+    Same contract as `with edit_state(game_ids, include_people) as state:
+    return mutator(state)`, but edits of the same scope arriving together share
+    one transaction. The mutator's exception (or a failed commit) is raised in
+    the caller; the result is returned only once the batch holding it has
+    committed. Mutators must be safe to re-run: a batch that loses a race with
+    another process (`WriteConflict`, SQLITE_BUSY) is reloaded and replayed with
+    backoff.
+    """
+    if GROUP_COMMIT_MAX_BATCH <= 1:
+        def attempt() -> T:
+            with edit_state(game_ids, include_people, optimistic=True) as state:
+                started = time.perf_counter()
+                try:
+                    return mutator(state)
+                finally:
+                    slowlog.record("mutate", time.perf_counter() - started)
+
+        return _with_retries(attempt)
+    key = tuple(_WriteLocks.ordered_keys(game_ids, include_people))
+    with _committers_guard:
+        committer = _committers.get(key)
+        if committer is None:
+            committer = _committers[key] = _GroupCommitter()
+        committer.users += 1
+    try:
+        return committer.submit(_PendingEdit(game_ids, include_people, mutator))
+    finally:
+        with _committers_guard:
+            committer.users -= 1
+            if not committer.users:
+                del _committers[key]
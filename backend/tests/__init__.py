@@ -1,9 +1,15 @@
 """Test suite package for backend services."""
 
+import importlib.util
 import sys
 import types
 
-if "pydantic" not in sys.modules:
+
+def _missing(name: str) -> bool:
+  return name not in sys.modules and importlib.util.find_spec(name) is None
+
+
+if _missing("pydantic"):
   pydantic = types.ModuleType("pydantic")  # type: ignore
 
   class BaseModel:  # type: ignore
@@ -30,7 +36,7 @@ if "pydantic" not in sys.modules:
   pydantic.root_validator = root_validator
   sys.modules["pydantic"] = pydantic
 
-if "fastapi" not in sys.modules:
+if _missing("fastapi"):
   fastapi = types.ModuleType("fastapi")  # type: ignore
 
   class HTTPException(Exception):  # type: ignore
@@ -0,0 +1,414 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import fastapi  # type: ignore
+
+from backend import storage
+
+try:
+  import httpx  # type: ignore
+except ImportError:  # pragma: no cover
+  httpx = None
+
+HAS_APP = httpx is not None and hasattr(fastapi, "FastAPI")
+
+
+@unittest.skipUnless(HAS_APP, "fastapi and httpx are required for API tests")
+class ApiTestCase(unittest.TestCase):
+  def setUp(self):
+    self.temp_dir = tempfile.TemporaryDirectory()
+    storage.DATA_DIR = self.temp_dir.name
+    storage.JSON_FALLBACK = os.path.join(self.temp_dir.name, "data.json")
+    storage.DB_PATH = os.path.join(self.temp_dir.name, "data.sqlite")
+    os.environ.pop("MASTER_ADMIN_PASSWORD", None)
+    from backend.main import app
+    self.app = app
+
+  def tearDown(self):
+    storage.close_pool()
+    self.temp_dir.cleanup()
+
+  def client(self):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test")
+
+
+class AsyncDrawTests(ApiTestCase):
+  def test_other_requests_served_while_draw_runs(self):
+    from backend.services import games_service
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_draw(*args, **kwargs):
+      started.set()
+      release.wait(5)
+      return {"assignment_version": 1}
+
+    async def scenario():
+      async with self.client() as client:
+        with mock.patch.object(games_service, "draw_assignments", slow_draw):
+          draw = asyncio.create_task(client.post("/api/games/ABC123/draw", json={}))
+          while not started.is_set():
+            await asyncio.sleep(0.01)
+          listing = await asyncio.wait_for(client.get("/api/games"), timeout=2)
+          self.assertFalse(draw.done())
+          release.set()
+          response = await asyncio.wait_for(draw, timeout=5)
+      return listing, response
+
+    listing, response = asyncio.run(scenario())
+    self.assertEqual(listing.status_code, 200)
+    self.assertEqual(response.json(), {"assignment_version": 1})
+
+
+if __name__ == "__main__":
+  unittest.main()
+
+
+class RevisionTests(ApiTestCase):
+  def test_etag_and_if_match(self):
+    async def scenario():
+      async with self.client() as client:
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        gid = created.json()["game_id"]
+        auth = {"X-Admin-Password": "admin123"}
+        status = await client.get(f"/api/games/{gid}", headers=auth)
+        etag = status.headers["etag"]
+        self.assertEqual(etag, '"1"')
+        ok = await client.patch(f"/api/games/{gid}", json={"title": "Otra"}, headers={**auth, "If-Match": etag})
+        self.assertEqual(ok.status_code, 200)
+        stale = await client.patch(f"/api/games/{gid}", json={"title": "Tarde"}, headers={**auth, "If-Match": etag})
+        self.assertEqual(stale.status_code, 412)
+        draw = await client.post(f"/api/games/{gid}/draw", json={}, headers={**auth, "If-Match": etag})
+        self.assertEqual(draw.status_code, 412)
+        status = await client.get(f"/api/games/{gid}", headers=auth)
+        self.assertEqual(status.json()["title"], "Otra")
+        self.assertEqual(status.headers["etag"], '"2"')
+        unconditional = await client.post(f"/api/games/{gid}/draw", json={}, headers=auth)
+        self.assertEqual(unconditional.status_code, 200)
+
+    asyncio.run(scenario())
+
+
+class ConditionalGetTests(ApiTestCase):
+  def test_if_none_match_skips_building_the_body(self):
+    from backend.services import games_service
+
+    async def scenario():
+      async with self.client() as client:
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        gid = created.json()["game_id"]
+        auth = {"X-Admin-Password": "admin123"}
+        first = await client.get(f"/api/games/{gid}", headers=auth)
+        self.assertEqual(first.headers["cache-control"], "private, no-cache")
+        etag = first.headers["etag"]
+        with mock.patch.object(games_service, "get_game_status", side_effect=AssertionError("built")):
+          cached = await client.get(f"/api/games/{gid}", headers={**auth, "If-None-Match": etag})
+          self.assertEqual(cached.status_code, 304)
+          self.assertEqual(cached.headers["etag"], etag)
+          denied = await client.get(
+            f"/api/games/{gid}", headers={"X-Admin-Password": "wrong-pass", "If-None-Match": etag}
+          )
+          self.assertEqual(denied.status_code, 401)
+        await client.post(f"/api/games/{gid}/draw", json={}, headers=auth)
+        fresh = await client.get(f"/api/games/{gid}", headers={**auth, "If-None-Match": etag})
+        self.assertEqual(fresh.status_code, 200)
+        token = fresh.json()["participants"][0]["token"]
+        preview = await client.get(f"/api/games/{gid}/{token}")
+        again = await client.get(f"/api/games/{gid}/{token}", headers={"If-None-Match": preview.headers["etag"]})
+        self.assertEqual(again.status_code, 304)
+        bogus = await client.get(f"/api/games/{gid}/not-a-token", headers={"If-None-Match": preview.headers["etag"]})
+        self.assertEqual(bogus.status_code, 404)
+        reveal = await client.post(f"/api/games/{gid}/{token}/reveal")
+        self.assertEqual(reveal.headers["cache-control"], "no-store")
+        self.assertNotIn("etag", reveal.headers)
+
+    asyncio.run(scenario())
+
+
+class ExportTests(ApiTestCase):
+  def test_streams_json_ndjson_and_gzip(self):
+    async def scenario():
+      async with self.client() as client:
+        await client.post("/api/people", json={"names": ["Ana", "José"]})
+        for title in ("Fiesta", "Navidad"):
+          await client.post(
+            "/api/games", json={"title": title, "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+          )
+        expected = storage.load_state()
+
+        plain = await client.get("/api/admin/export")
+        self.assertEqual(plain.headers["cache-control"], "no-store")
+        self.assertEqual(json.loads(plain.content), {"people": expected["people"], "games": expected["games"]})
+
+        lines = (await client.get("/api/admin/export", params={"format": "ndjson"})).text.splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(records[0]["type"], "meta")
+        self.assertEqual([r["data"]["name"] for r in records if r["type"] == "person"], ["Ana", "José"])
+        self.assertEqual({r["data"]["game_id"] for r in records if r["type"] == "game"}, set(expected["games"]))
+
+        packed = await client.get("/api/admin/export", params={"format": "ndjson", "gzip": "true"})
+        self.assertEqual(packed.headers["content-type"], "application/gzip")
+        self.assertEqual(gzip.decompress(packed.content).decode().splitlines()[1:], lines[1:])
+
+    asyncio.run(scenario())
+
+
+class DrawRequestTests(ApiTestCase):
+  def test_malformed_exclusions_are_rejected_with_400(self):
+    async def scenario():
+      async with self.client() as client:
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        gid = created.json()["game_id"]
+        auth = {"X-Admin-Password": "admin123"}
+        for exclusions in ([["p1"]], "x", [[1, None]]):
+          response = await client.post(f"/api/games/{gid}/draw", json={"exclusions": exclusions}, headers=auth)
+          self.assertEqual(response.status_code, 400, exclusions)
+        self.assertEqual(storage.load_game(gid)["assignment_version"], 0)
+        bare = await client.post(f"/api/games/{gid}/draw", headers=auth)
+        self.assertEqual(bare.status_code, 200)
+
+    asyncio.run(scenario())
+
+
+class PersonGamesTests(ApiTestCase):
+  def test_refused_unless_master_password_configured(self):
+    async def scenario():
+      async with self.client() as client:
+        await client.post("/api/people", json={"names": ["Ana", "Luis", "Eva"]})
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "person_ids": ["u1", "u2", "u3"]}
+        )
+        await client.post(f"/api/games/{created.json()['game_id']}/draw", headers={"X-Admin-Password": "admin123"})
+        anonymous = await client.get("/api/people/u1/games")
+        self.assertEqual(anonymous.status_code, 403)
+        with mock.patch.dict(os.environ, {"MASTER_ADMIN_PASSWORD": "m4ster"}):
+          missing = await client.get("/api/people/u1/games")
+          allowed = await client.get("/api/people/u1/games", headers={"X-Master-Password": "m4ster"})
+        self.assertEqual(missing.status_code, 401)
+        self.assertEqual(allowed.status_code, 200)
+        self.assertIsNotNone(allowed.json()[0]["assigned_to"])
+
+    asyncio.run(scenario())
+
+
+class ImportTests(ApiTestCase):
+  def _strip(self, state):
+    games = {gid: {k: v for k, v in game.items() if k != "revision"} for gid, game in state["games"].items()}
+    return {"games": games, "people": state["people"]}
+
+  def test_round_trips_export_in_both_modes(self):
+    async def scenario():
+      async with self.client() as client:
+        await client.post("/api/people", json={"names": ["Ana", "José"]})
+        ids = []
+        for title in ("Fiesta", "Navidad"):
+          created = await client.post(
+            "/api/games", json={"title": title, "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+          )
+          ids.append(created.json()["game_id"])
+        await client.post(f"/api/games/{ids[0]}/draw", headers={"X-Admin-Password": "admin123"})
+        original = self._strip(storage.load_state())
+        master = {"X-Master-Password": "m4ster"}
+        packed = (await client.get("/api/admin/export", params={"format": "ndjson", "gzip": "true"}, headers=master)).content
+        document = (await client.get("/api/admin/export", headers=master)).content
+
+        await client.delete(f"/api/games/{ids[0]}", headers={"X-Admin-Password": "admin123"})
+        await client.post(
+          "/api/games", json={"title": "Extra", "admin_password": "admin123", "participants": ["Uno", "Dos", "Tres"]}
+        )
+        merged = await client.post("/api/admin/import", content=document, headers=master)
+        self.assertEqual(merged.json()["games"], 2)
+        self.assertEqual(len(storage.load_state()["games"]), 3)
+
+        replaced = await client.post("/api/admin/import", params={"mode": "replace"}, content=packed, headers=master)
+        self.assertEqual(replaced.json()["deleted_games"], 1)
+        self.assertEqual(self._strip(storage.load_state()), original)
+
+        before = storage.load_state()
+        broken = document.replace(b'"token":', b'"tok":', 1)
+        rejected = await client.post("/api/admin/import", params={"mode": "replace"}, content=broken, headers=master)
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(storage.load_state(), before)
+
+    with mock.patch.dict(os.environ, {"MASTER_ADMIN_PASSWORD": "m4ster"}):
+      asyncio.run(scenario())
+
+  def test_refused_unless_master_password_configured(self):
+    async def scenario():
+      async with self.client() as client:
+        await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        before = storage.load_state()
+        empty = json.dumps({"people": [], "games": {}}).encode()
+        anonymous = await client.post("/api/admin/import", params={"mode": "replace"}, content=empty)
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(storage.load_state(), before)
+        with mock.patch.dict(os.environ, {"MASTER_ADMIN_PASSWORD": "m4ster"}):
+          missing = await client.post("/api/admin/import", params={"mode": "replace"}, content=empty)
+        self.assertEqual(missing.status_code, 401)
+        self.assertEqual(storage.load_state(), before)
+
+    asyncio.run(scenario())
+
+  def test_rejects_duplicate_wish_item_ids_before_writing(self):
+    from backend import imports
+
+    participants = [
+      {"id": f"p{n}", "name": name, "token": f"{name}-token-0000", "wish_list": []}
+      for n, name in enumerate(["Ana", "Luis"], start=1)
+    ]
+    participants[1]["wish_list"] = [{"id": "w1", "title": "Libro"}, {"id": "w1", "title": "Bufanda"}]
+    document = {
+      "people": [],
+      "games": {
+        gid: {"title": gid, "admin_password_hash": "x", "created_at": "2024-12-01T00:00:00Z", "participants": participants}
+        for gid in ("AAA111", "BBB222")
+      },
+    }
+    path = os.path.join(self.temp_dir.name, "dupes.json")
+    with open(path, "w", encoding="utf-8") as handle:
+      json.dump(document, handle)
+    with self.assertRaises(imports.ImportValidationError):
+      imports.import_file(path, batch_size=1)
+    self.assertEqual(storage.list_game_ids(), [])
+
+  def test_reads_pretty_printed_legacy_document(self):
+    from backend import imports
+
+    legacy = {
+      "games": {
+        "OLD001": {
+          "title": "Antiguo",
+          "admin_password_hash": "x",
+          "created_at": "2024-12-01T00:00:00Z",
+          "participants": [{"id": "p1", "name": "Ana", "token": "t" * 16, "wish_list": [{"id": "w1", "title": "Libro"}]}],
+        }
+      },
+      "people": [{"id": "u1", "name": "Ana", "active": True}],
+    }
+    path = os.path.join(self.temp_dir.name, "legacy.json")
+    with open(path, "w", encoding="utf-8") as handle:
+      json.dump(legacy, handle, indent=2)
+    self.assertEqual(imports.import_file(path, batch_size=1)["games"], 1)
+    game = storage.load_game("OLD001")
+    self.assertEqual(game["participants"][0]["wish_list"][0]["title"], "Libro")
+    self.assertEqual(game["revision"], 1)
+
+
+class MetricsTests(ApiTestCase):
+  def test_exposes_request_storage_and_draw_metrics(self):
+    from backend import metrics
+
+    async def scenario():
+      async with self.client() as client:
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        gid = created.json()["game_id"]
+        bcrypt_before = metrics.bcrypt_verifications.value()
+        await client.post(f"/api/games/{gid}/draw", headers={"X-Admin-Password": "admin123"})
+        await client.get(f"/api/games/{gid}/nope-token")
+        self.assertEqual(metrics.bcrypt_verifications.value(), bcrypt_before + 1)
+        scrape = await client.get("/metrics")
+        self.assertTrue(scrape.headers["content-type"].startswith("text/plain"))
+        return scrape.text
+
+    text = asyncio.run(scenario())
+    self.assertIn('http_requests_total{method="POST",route="/api/games/{game_id}/draw",status="200"}', text)
+    self.assertIn('http_requests_total{method="GET",route="/api/games/{game_id}/{token}",status="404"}', text)
+    self.assertIn('http_request_duration_seconds_bucket{method="POST",route="/api/games",le="+Inf"}', text)
+    self.assertRegex(text, r"storage_lock_wait_seconds_count [1-9]")
+    self.assertRegex(text, r"storage_database_bytes [1-9]")
+    self.assertRegex(text, r"draw_shuffles_total [1-9]")
+
+    with mock.patch.dict(os.environ, {"METRICS_TOKEN": "s3cret"}):
+      async def guarded():
+        async with self.client() as client:
+          denied = await client.get("/metrics")
+          allowed = await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+          return denied.status_code, allowed.status_code
+      self.assertEqual(asyncio.run(guarded()), (401, 200))
+
+
+class SlowLogTests(ApiTestCase):
+  def test_logs_phase_breakdown_for_slow_requests_and_transactions(self):
+    from backend import slowlog
+
+    async def scenario():
+      async with self.client() as client:
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        gid = created.json()["game_id"]
+        with self.assertLogs("backend.slowlog", "WARNING") as logs:
+          await client.post(f"/api/games/{gid}/draw", headers={"X-Admin-Password": "admin123"})
+        with mock.patch.object(slowlog, "SAMPLE_RATE", 0.0), self.assertNoLogs("backend.slowlog"):
+          await client.post(f"/api/games/{gid}/draw", headers={"X-Admin-Password": "admin123"})
+        return gid, [json.loads(line.split(":", 2)[2]) for line in logs.output]
+
+    with mock.patch.object(slowlog, "SLOW_REQUEST_MS", 0.001), mock.patch.object(slowlog, "SLOW_TRANSACTION_MS", 0.001):
+      gid, entries = asyncio.run(scenario())
+    by_event = {entry["event"]: entry for entry in entries}
+    transaction = by_event["slow_transaction"]
+    self.assertEqual((transaction["repository"], transaction["game_id"]), ("games", gid))
+    self.assertTrue({"load", "mutate", "encode", "commit"} <= set(transaction["phases_ms"]))
+    self.assertGreater(transaction["rows_written"], 0)
+    request = by_event["slow_request"]
+    self.assertEqual((request["route"], request["game_id"], request["status"]), ("/api/games/{game_id}/draw", gid, 200))
+    self.assertIn("bcrypt", request["phases_ms"])
+    self.assertIn("commit", request["phases_ms"])
+
+
+class ProfilingTests(ApiTestCase):
+  def test_profiles_requests_that_ask_with_the_master_password(self):
+    import pstats
+
+    async def scenario():
+      async with self.client() as client:
+        created = await client.post(
+          "/api/games", json={"title": "Fiesta", "admin_password": "admin123", "participants": ["Ana", "Luis", "Eva"]}
+        )
+        gid = created.json()["game_id"]
+        auth = {"X-Admin-Password": "admin123"}
+        master = {"X-Master-Password": "m4ster"}
+        plain = await client.get(f"/api/games/{gid}", headers={**auth, "X-Profile": "1"})
+        self.assertNotIn("x-profile-id", plain.headers)
+        status = await client.get(f"/api/games/{gid}", headers={**auth, **master, "X-Profile": "1"})
+        draw = await client.post(f"/api/games/{gid}/draw", headers={**auth, **master, "X-Profile": "1"})
+        listed = (await client.get("/api/admin/profiles", headers=master)).json()
+        self.assertEqual([p["id"] for p in listed], [draw.headers["x-profile-id"], status.headers["x-profile-id"]])
+        self.assertEqual(listed[1]["route"], "/api/games/{game_id}")
+        dumps = {}
+        for name, response in (("status", status), ("draw", draw)):
+          download = await client.get(f"/api/admin/profiles/{response.headers['x-profile-id']}", headers=master)
+          dumps[name] = download.content
+        collapsed = await client.get(
+          f"/api/admin/profiles/{draw.headers['x-profile-id']}", params={"format": "collapsed"}, headers=master
+        )
+        self.assertIn("verify_password", collapsed.text)  # bcrypt dominates the draw
+        missing = await client.get("/api/admin/profiles/nope", headers=master)
+        self.assertEqual(missing.status_code, 404)
+        return dumps
+
+    with mock.patch.dict(os.environ, {"MASTER_ADMIN_PASSWORD": "m4ster"}):
+      dumps = asyncio.run(scenario())
+    for name, function in (("status", "get_game_status"), ("draw", "draw_assignments")):
+      path = os.path.join(self.temp_dir.name, f"{name}.pstats")
+      with open(path, "wb") as handle:
+        handle.write(dumps[name])
+      functions = {func[2] for func in pstats.Stats(path).stats}
+      self.assertIn(function, functions)
@@ -0,0 +1,73 @@
+import random
+import time
+import unittest
+from collections import Counter
+from itertools import permutations
+
+from backend.utils import DrawImpossibleError, derangement_assignment
+
+
+def _is_valid(ids, mapping, exclusions=()):
+  forbidden = set(exclusions)
+  return (
+    sorted(mapping) == sorted(ids)
+    and sorted(mapping.values()) == sorted(ids)
+    and all(g != r and (g, r) not in forbidden for g, r in mapping.items())
+  )
+
+
+def _as_tuple(ids, mapping):
+  return tuple(mapping[i] for i in ids)
+
+
+class DerangementTests(unittest.TestCase):
+  def test_uniform_over_all_derangements(self):
+    ids = ["a", "b", "c", "d", "e"]
+    valid = [p for p in permutations(ids) if all(x != y for x, y in zip(ids, p))]
+    self.assertEqual(len(valid), 44)
+    rng = random.Random(20241224)
+    samples = 44 * 400
+    counts = Counter(_as_tuple(ids, derangement_assignment(ids, rng=rng)) for _ in range(samples))
+    self.assertEqual(set(counts), set(valid))
+    expected = samples / len(valid)
+    chi2 = sum((counts[p] - expected) ** 2 / expected for p in valid)
+    # 43 degrees of freedom; 77.4 is the p = 0.001 critical value.
+    self.assertLess(chi2, 77.4)
+
+  def test_solver_respects_couples_and_previous_pairing(self):
+    ids = [f"p{i}" for i in range(2000)]
+    rng = random.Random(7)
+    exclusions = []
+    for i in range(0, len(ids), 2):
+      exclusions += [(ids[i], ids[i + 1]), (ids[i + 1], ids[i])]
+    exclusions += list(derangement_assignment(ids, rng=rng).items())
+    started = time.perf_counter()
+    mapping = derangement_assignment(ids, exclusions, rng=rng, attempts=0)
+    self.assertLess(time.perf_counter() - started, 5)
+    self.assertTrue(_is_valid(ids, mapping, exclusions))
+
+  def test_solver_spreads_results_under_tight_constraints(self):
+    ids = ["a", "b", "c", "d"]
+    exclusions = [("a", "b"), ("b", "a")]
+    valid = [
+      p for p in permutations(ids)
+      if _is_valid(ids, dict(zip(ids, p)), exclusions)
+    ]
+    rng = random.Random(3)
+    seen = Counter(
+      _as_tuple(ids, derangement_assignment(ids, exclusions, rng=rng, attempts=0)) for _ in range(2000)
+    )
+    self.assertEqual(set(seen), set(valid))
+
+  def test_reports_impossible_constraints(self):
+    ids = ["a", "b", "c"]
+    exclusions = [("a", "b"), ("a", "c")]
+    with self.assertRaises(DrawImpossibleError) as ctx:
+      derangement_assignment(ids, exclusions, rng=random.Random(1))
+    self.assertEqual(ctx.exception.giver, "a")
+    with self.assertRaises(ValueError):
+      derangement_assignment(["solo"])
+
+
+if __name__ == "__main__":
+  unittest.main()
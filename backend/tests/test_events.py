@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from backend import storage
+from backend.core.security import AdminCredentials
+from backend.events import event_hub, game_events
+from backend.models import CreateGameRequest, DrawRequest, UpdateParticipantRequest
+from backend.services import events_service, games_service
+
+
+def _parse(frame):
+  fields = {}
+  for line in frame.strip().splitlines():
+    key, _, value = line.partition(": ")
+    fields[key] = value
+  if "data" in fields:
+    fields["data"] = json.loads(fields["data"])
+  return fields
+
+
+class GameEventDiffTests(unittest.TestCase):
+  def test_reports_dashboard_changes_only(self):
+    before = {
+      "title": "Fiesta",
+      "active": True,
+      "assignment_version": 1,
+      "participants": [
+        {"id": "p1", "name": "Ana", "viewed": False, "active": True, "assigned_to_participant_id": "p2", "wish_list": []},
+        {"id": "p2", "name": "Luis", "viewed": False, "active": True, "assigned_to_participant_id": "p1", "wish_list": []},
+      ],
+    }
+    after = {
+      **before,
+      "participants": [
+        {**before["participants"][0], "viewed": True, "viewed_at": "now"},
+        {**before["participants"][1], "name": "Luisa", "wish_list": [{"id": "w1", "title": "Libro"}]},
+      ],
+    }
+    kinds = [kind for kind, _ in game_events(before, after)]
+    self.assertEqual(kinds, ["participant.viewed", "participant.renamed", "wishlist.changed"])
+    self.assertNotIn("assigned", json.dumps(game_events(before, after)))
+    self.assertEqual(game_events(before, None), [("game.deleted", {})])
+
+
+class EventStreamTests(unittest.TestCase):
+  def setUp(self):
+    self.temp_dir = tempfile.TemporaryDirectory()
+    storage.DATA_DIR = self.temp_dir.name
+    storage.JSON_FALLBACK = os.path.join(self.temp_dir.name, "data.json")
+    storage.DB_PATH = os.path.join(self.temp_dir.name, "data.sqlite")
+    event_hub.start()
+    self.gid = games_service.create_game(
+      CreateGameRequest(title="Fiesta", admin_password="admin123", participants=["Ana", "Luis", "Eva"])
+    )["game_id"]
+    self.credentials = AdminCredentials(password="admin123", session=None)
+    self.admin_hash = events_service.authorize_stream(self.gid, self.credentials)
+
+  def tearDown(self):
+    event_hub.stop()
+    storage.close_pool()
+    self.temp_dir.cleanup()
+
+  def _stream(self, last_event_id=None):
+    async def connected():
+      return False
+    return events_service.stream_events(self.gid, self.credentials, self.admin_hash, last_event_id, connected)
+
+  def test_pushes_commits_and_resumes_from_last_event_id(self):
+    async def scenario():
+      loop = asyncio.get_running_loop()
+      stream = self._stream()
+      self.assertTrue((await stream.__anext__()).startswith("retry:"))
+      await loop.run_in_executor(None, games_service.draw_assignments, self.gid, DrawRequest(), "admin123")
+      drawn = _parse(await asyncio.wait_for(stream.__anext__(), 5))
+      self.assertEqual(drawn["event"], "draw.completed")
+      token = storage.load_game(self.gid)["participants"][0]["token"]
+      await loop.run_in_executor(None, games_service.reveal_assignment, self.gid, token)
+      viewed = _parse(await asyncio.wait_for(stream.__anext__(), 5))
+      self.assertEqual(viewed["event"], "participant.viewed")
+      self.assertEqual(viewed["data"]["participant_id"], "p1")
+      await stream.aclose()
+
+      await loop.run_in_executor(
+        None, games_service.rename_participant, self.gid, "p2", UpdateParticipantRequest(name="Luisa"), "admin123"
+      )
+      resumed = self._stream(drawn["id"])
+      await resumed.__anext__()
+      missed = [_parse(await asyncio.wait_for(resumed.__anext__(), 5)) for _ in range(2)]
+      self.assertEqual([m["event"] for m in missed], ["participant.viewed", "participant.renamed"])
+      await resumed.aclose()
+
+      stale = self._stream("other-process:12")
+      await stale.__anext__()
+      self.assertEqual(_parse(await stale.__anext__())["event"], "resync")
+      await stale.aclose()
+
+    asyncio.run(scenario())
+
+  def test_heartbeats_until_credentials_change(self):
+    async def scenario():
+      stream = self._stream()
+      await stream.__anext__()
+      self.assertEqual(await asyncio.wait_for(stream.__anext__(), 5), ": heartbeat\n\n")
+      with storage.edit_state([self.gid], include_people=False) as state:
+        state["games"][self.gid]["admin_password_hash"] = "sha256:changed"
+      with self.assertRaises(StopAsyncIteration):
+        while True:
+          frame = await asyncio.wait_for(stream.__anext__(), 5)
+          self.assertNotIn("event:", frame)
+
+    with mock.patch.object(events_service, "HEARTBEAT_SECONDS", 0.05):
+      asyncio.run(scenario())
+
+  def test_storage_reads_run_off_the_event_loop(self):
+    threads = []
+    real_get_game = events_service.game_repo.get_game
+
+    def spy(game_id):
+      threads.append(threading.get_ident())
+      return real_get_game(game_id)
+
+    async def scenario():
+      stream = self._stream("other-process:12")
+      await stream.__anext__()
+      self.assertEqual(_parse(await stream.__anext__())["event"], "resync")
+      self.assertEqual(await asyncio.wait_for(stream.__anext__(), 5), ": heartbeat\n\n")
+      await stream.aclose()
+      return threading.get_ident()
+
+    with mock.patch.object(events_service, "HEARTBEAT_SECONDS", 0.05), \
+        mock.patch.object(events_service.game_repo, "get_game", spy):
+      loop_thread = asyncio.run(scenario())
+    self.assertGreaterEqual(len(threads), 2)
+    self.assertNotIn(loop_thread, threads)
+
+
+if __name__ == "__main__":
+  unittest.main()
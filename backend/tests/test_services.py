@@ -1,10 +1,12 @@
 import os
 import tempfile
+import threading
 import unittest
+from unittest import mock
 
 from fastapi import HTTPException  # type: ignore
 from backend import storage
-from backend.services import games_service, people_service
+from backend.services import changes_service, games_service, people_service
 from backend.models import (
   CreateGameRequest,
   AddParticipantsByIdsRequest,
@@ -12,8 +14,10 @@ from backend.models import (
   DrawRequest,
   WishListItemRequest,
   CreatePeopleRequest,
+  UpdateGameRequest,
 )
 from backend.core import errors as core_errors
+from backend.core import security
 
 core_errors.HTTPException = HTTPException
 
@@ -31,6 +35,7 @@ class ServiceTestCase(unittest.TestCase):
     os.environ.pop("MASTER_ADMIN_PASSWORD", None)
 
   def tearDown(self):
+    storage.close_pool()
     self.temp_dir.cleanup()
 
 
@@ -82,6 +87,23 @@ class GamesServiceTests(ServiceTestCase):
     first = next(p for p in updated.participants if p.token == token)
     self.assertTrue(first.viewed)
 
+  def test_draw_with_exclusions(self):
+    gid = self.create_base_game()
+    games_service.draw_assignments(gid, DrawRequest(force=False), "admin123")
+    before = {p["id"]: p["assigned_to_participant_id"] for p in storage.load_game(gid)["participants"]}
+    games_service.draw_assignments(
+      gid, DrawRequest(exclusions=[["p1", "p2"]], avoid_previous=True), "admin123"
+    )
+    after = {p["id"]: p["assigned_to_participant_id"] for p in storage.load_game(gid)["participants"]}
+    self.assertNotIn(after["p1"], ("p1", "p2"))
+    self.assertNotIn(after["p2"], ("p1", "p2"))
+    self.assertTrue(all(after[pid] != before[pid] for pid in after))
+    with self.assertRaises(HTTPException) as ctx:
+      games_service.draw_assignments(
+        gid, DrawRequest(exclusions=[["p1", "p2"], ["p1", "p3"], ["p1", "p4"]]), "admin123"
+      )
+    self.assertEqual(ctx.exception.status_code, 409)
+
   def test_deactivate_and_remove_participant(self):
     gid = self.create_base_game()
     status = games_service.get_game_status(gid, "admin123")
@@ -94,6 +116,25 @@ class GamesServiceTests(ServiceTestCase):
     games_service.remove_participant(gid, pid, "admin123")
     updated = games_service.get_game_status(gid, "admin123")
     self.assertEqual(len(updated.participants), len(status.participants) - 1)
+    link = games_service.resolve_short_link(token)
+    self.assertEqual(link["game_id"], gid)
+    self.assertTrue(link["link"].endswith(f"/game/{gid}/token/{token}"))
+    with self.assertRaises(HTTPException) as ctx:
+      games_service.resolve_short_link(status.participants[-1].token)
+    self.assertEqual(ctx.exception.status_code, 404)
+
+  def test_create_game_never_overwrites_a_taken_id(self):
+    taken = self.create_base_game()
+    before = storage.load_game(taken)
+    # The id was free when checked, but another create committed it before our write.
+    with mock.patch.object(games_service, "generate_game_id", side_effect=[taken, "FRESH1"]), \
+        mock.patch.object(games_service.game_repo, "exists", return_value=False):
+      result = games_service.create_game(
+        CreateGameRequest(title="Otra", admin_password="admin123", participants=["Uno", "Dos", "Tres"])
+      )
+    self.assertEqual(result["game_id"], "FRESH1")
+    self.assertEqual(storage.load_game(taken), before)
+    self.assertEqual(storage.load_game("FRESH1")["title"], "Otra")
 
   def test_wishlist_flow(self):
     gid = self.create_base_game()
@@ -118,6 +159,119 @@ class GamesServiceTests(ServiceTestCase):
     token_wishlist_after = games_service.get_wish_list_by_token(gid, target.token)
     self.assertEqual(len(token_wishlist_after["items"]), 1)
 
+  def test_list_games_pages_with_keyset_cursor(self):
+    with storage.edit_state() as state:
+      for i in range(7):
+        gid = f"G{i}"
+        state["games"][gid] = {
+          "game_id": gid,
+          "title": "Navidad" if i % 2 else "Fiesta",
+          "admin_password_hash": "x",
+          "created_at": f"2025-01-0{1 + i // 2}T00:00:00Z",  # pairs share a timestamp
+          "updated_at": "2025-01-01T00:00:00Z",
+          "active": i != 3,
+          "assignment_version": 0,
+          "any_revealed": False,
+          "participants": [],
+        }
+    seen, cursor = [], None
+    while True:
+      page, cursor = games_service.list_games(limit=3, cursor=cursor)
+      seen += [g.game_id for g in page]
+      if cursor is None:
+        break
+    self.assertEqual(seen, ["G6", "G5", "G4", "G3", "G2", "G1", "G0"])
+    page, cursor = games_service.list_games(active=True, title_prefix="nav")
+    self.assertEqual([g.game_id for g in page], ["G5", "G1"])
+    self.assertIsNone(cursor)
+    with self.assertRaises(HTTPException) as ctx:
+      games_service.list_games(cursor="not-a-cursor")
+    self.assertEqual(ctx.exception.status_code, 400)
+
+  def test_admin_password_verified_outside_write_locks(self):
+    gid = self.create_base_game()
+    held = []
+    real_verify = security.verify_password
+
+    def spy(password, stored_hash):
+      held.append(dict(storage._write_locks._locks))
+      return real_verify(password, stored_hash)
+
+    with mock.patch.object(security, "verify_password", spy):
+      games_service.update_game(gid, UpdateGameRequest(title="Nueva"), "admin123")
+    self.assertEqual(held, [{}])
+
+  def test_mutation_rejected_when_password_hash_changes(self):
+    gid = self.create_base_game()
+    stale_hash = storage.load_game(gid)["admin_password_hash"]
+    with storage.edit_state([gid], include_people=False) as state:
+      state["games"][gid]["admin_password_hash"] = "sha256:other"
+    with mock.patch.object(games_service, "_authenticate", return_value=stale_hash):
+      with self.assertRaises(HTTPException) as ctx:
+        games_service.update_game(gid, UpdateGameRequest(title="Nueva"), "admin123")
+    self.assertEqual(ctx.exception.status_code, 401)
+
+  def test_concurrent_if_match_writes_in_one_batch(self):
+    gid = self.create_base_game()
+    revision = games_service.game_revision(gid)
+    admin_hash = storage.load_game(gid)["admin_password_hash"]
+    commits = []
+    storage.add_commit_listener(commits.append)
+    self.addCleanup(storage.remove_commit_listener, commits.append)
+    barrier = threading.Barrier(2)
+    outcomes = {}
+
+    def patch(title):
+      barrier.wait(5)
+      try:
+        games_service.update_game(gid, UpdateGameRequest(title=title), "admin123", expected_revision=revision)
+        outcomes[title] = 200
+      except HTTPException as exc:
+        outcomes[title] = exc.status_code
+
+    with mock.patch.object(games_service, "_authenticate", return_value=admin_hash), \
+        mock.patch.object(storage, "GROUP_COMMIT_WINDOW_MS", 300):
+      threads = [threading.Thread(target=patch, args=(title,)) for title in ("Uno", "Dos")]
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join(10)
+    self.assertEqual(len(commits), 1)  # both edits went through the same transaction
+    self.assertEqual(sorted(outcomes.values()), [200, 412])
+    winner = next(title for title, status in outcomes.items() if status == 200)
+    game = storage.load_game(gid)
+    self.assertEqual(game["title"], winner)
+    self.assertEqual(game["revision"], revision + 1)
+
+  def test_admin_session_replaces_password(self):
+    gid = self.create_base_game()
+    session = games_service.create_admin_session(gid, "admin123")["session"]
+    creds = security.AdminCredentials(session=session)
+    with mock.patch.object(security, "verify_password", side_effect=AssertionError("bcrypt used")):
+      status = games_service.get_game_status(gid, creds)
+      games_service.update_game(gid, UpdateGameRequest(title="Nueva"), creds)
+    self.assertEqual(len(status.participants), 4)
+    other = self.create_base_game()
+    with self.assertRaises(HTTPException) as ctx:
+      games_service.get_game_status(other, creds)
+    self.assertEqual(ctx.exception.status_code, 401)
+
+  def test_admin_session_invalidated_by_password_change_and_delete(self):
+    gid = self.create_base_game()
+    session = games_service.create_admin_session(gid, "admin123")["session"]
+    creds = security.AdminCredentials(session=session)
+    with storage.edit_state([gid], include_people=False) as state:
+      state["games"][gid]["admin_password_hash"] = "sha256:other"
+    with self.assertRaises(HTTPException) as ctx:
+      games_service.get_game_status(gid, creds)
+    self.assertEqual(ctx.exception.status_code, 401)
+    gid = self.create_base_game()
+    session = games_service.create_admin_session(gid, "admin123")["session"]
+    games_service.delete_game(gid, security.AdminCredentials(session=session))
+    with self.assertRaises(HTTPException) as ctx:
+      games_service.get_game_status(gid, security.AdminCredentials(session=session))
+    self.assertEqual(ctx.exception.status_code, 404)
+
 
 class PeopleServiceTests(ServiceTestCase):
   def test_add_and_rename_people(self):
@@ -131,6 +285,110 @@ class PeopleServiceTests(ServiceTestCase):
     rename_resp = people_service.rename_person(added_id, rename_payload, None)
     self.assertTrue(rename_resp["ok"])
 
+  def test_add_people_skips_ids_kept_by_an_import(self):
+    with storage.edit_state() as state:
+      state["people"] = [{"id": "u1", "name": "Ana", "active": True}, {"id": "u7", "name": "Luis", "active": True}]
+    resp = people_service.add_people(CreatePeopleRequest(names=["Eva"]), None)
+    self.assertEqual(resp["added"][0]["id"], "u8")
+    self.assertEqual([p["name"] for p in storage.load_people()], ["Ana", "Luis", "Eva"])
+
+  def test_list_person_games_includes_draw(self):
+    people_service.add_people(CreatePeopleRequest(names=["Ana", "Luis", "Eva"]), None)
+    master = mock.patch.dict(os.environ, {"MASTER_ADMIN_PASSWORD": "m4ster"})
+    master.start()
+    self.addCleanup(master.stop)
+    gid = games_service.create_game(
+      CreateGameRequest(title="Fiesta", admin_password="admin123", person_ids=["u1", "u2", "u3"])
+    )["game_id"]
+    [entry] = people_service.list_person_games("u1", "m4ster")
+    self.assertEqual((entry["game_id"], entry["name"], entry["assigned_to"]), (gid, "Ana", None))
+    games_service.draw_assignments(gid, DrawRequest(), "admin123")
+    [entry] = people_service.list_person_games("u1", "m4ster")
+    drawn = next(p for p in storage.load_game(gid)["participants"] if p["id"] == entry["participant_id"])
+    self.assertEqual(entry["assigned_to"]["participant_id"], drawn["assigned_to_participant_id"])
+    self.assertEqual(people_service.list_person_games("u2", "m4ster")[0]["game_id"], gid)
+    with self.assertRaises(HTTPException) as ctx:
+      people_service.list_person_games("u404", "m4ster")
+    self.assertEqual(ctx.exception.status_code, 404)
+
+  def test_list_people_pages_and_prefix_search(self):
+    people_service.add_people(CreatePeopleRequest(names=["Álvaro", "alicia", "Beto", "Óscar", "Alba"]), None)
+    beto = next(p for p in people_service.list_people()[0] if p.name == "Beto")
+    people_service.set_person_active(beto.id, None, False)
+    names, cursor = [], None
+    while True:
+      page, cursor = people_service.list_people(limit=2, cursor=cursor)
+      names += [p.name for p in page]
+      if cursor is None:
+        break
+    self.assertEqual(names, ["Alba", "alicia", "Álvaro", "Beto", "Óscar"])
+    self.assertEqual([p.name for p in people_service.list_people(q="AL")[0]], ["Alba", "alicia", "Álvaro"])
+    self.assertEqual([p.name for p in people_service.list_people(q="osc")[0]], ["Óscar"])
+    self.assertEqual([p.name for p in people_service.list_people(q="alv", active=True)[0]], ["Álvaro"])
+    self.assertEqual(len(people_service.list_people(active=False)[0]), 1)
+
+
+class ChangeFeedTests(ServiceTestCase):
+  def test_returns_latest_state_changed_since_cursor(self):
+    start = changes_service.list_changes(None)
+    self.assertEqual(start["games"], [])
+    people_service.add_people(CreatePeopleRequest(names=["Ana"]), None)
+    gid = games_service.create_game(
+      CreateGameRequest(title="Fiesta", admin_password="admin123", participants=["Luis", "Eva", "Sol"])
+    )["game_id"]
+    games_service.rename_participant(gid, "p2", UpdateParticipantRequest(name="Eva Maria"), "admin123")
+    feed = changes_service.list_changes(start["cursor"])
+    self.assertEqual([g["game_id"] for g in feed["games"]], [gid])
+    self.assertEqual([p["name"] for p in feed["people"]], ["Ana"])
+    renamed = next(p for p in feed["participants"] if p["id"] == "p2")
+    self.assertEqual(renamed["name"], "Eva Maria")
+    self.assertNotIn("token", renamed)
+    self.assertEqual(len(feed["participants"]), 3)
+
+    cursor = feed["cursor"]
+    games_service.remove_participant(gid, "p3", "admin123")
+    feed = changes_service.list_changes(cursor)
+    self.assertEqual(feed["deleted"]["participants"], [{"game_id": gid, "id": "p3"}])
+    self.assertEqual(feed["participants"], [])
+    self.assertEqual(feed["games"][0]["participant_count"], 2)
+
+    games_service.delete_game(gid, "admin123")
+    feed = changes_service.list_changes(feed["cursor"])
+    self.assertEqual(feed["deleted"]["games"], [gid])
+    self.assertEqual(changes_service.list_changes(feed["cursor"])["games"], [])
+
+  def test_reads_only_the_changed_rows(self):
+    people_service.add_people(CreatePeopleRequest(names=["Ana", "Luis"]), None)
+    gid = games_service.create_game(
+      CreateGameRequest(title="Fiesta", admin_password="admin123", participants=["Luis", "Eva", "Sol"])
+    )["game_id"]
+    cursor = changes_service.list_changes(None)["cursor"]
+    games_service.add_wish_list_item_admin(gid, "p2", WishListItemRequest(title="Libro"), "admin123")
+    storage._cache.clear()
+    with mock.patch.object(storage, "_fetch_games", side_effect=AssertionError("loaded whole games")), \
+        mock.patch.object(storage, "_fetch_people", side_effect=AssertionError("loaded the directory")):
+      feed = changes_service.list_changes(cursor)
+    self.assertEqual([(p["id"], p["wish_list_count"]) for p in feed["participants"]], [("p2", 1)])
+    self.assertEqual(feed["games"][0]["participant_count"], 3)
+    self.assertEqual(feed["people"], [])
+
+  def test_paging_and_expired_cursor(self):
+    for i in range(3):
+      people_service.add_people(CreatePeopleRequest(names=[f"Persona {i}"]), None)
+    page = changes_service.list_changes(0, limit=2)
+    self.assertTrue(page["has_more"])
+    self.assertEqual(len(page["people"]), 2)
+    rest = changes_service.list_changes(page["cursor"], limit=2)
+    self.assertFalse(rest["has_more"])
+    self.assertEqual([p["name"] for p in rest["people"]], ["Persona 2"])
+    conn = storage._connect(storage.DB_PATH)
+    conn.execute("DELETE FROM changes WHERE seq <= 2")
+    conn.commit()
+    conn.close()
+    with self.assertRaises(HTTPException) as ctx:
+      changes_service.list_changes(0)
+    self.assertEqual(ctx.exception.status_code, 410)
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -0,0 +1,475 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from backend import storage
+from backend.backups import BackupService
+
+
+def _stress_worker(data_dir: str, worker: int, rounds: int) -> None:
+  """Reveal-like and wishlist-like edits on one game from a separate process."""
+  storage.DATA_DIR = data_dir
+  storage.JSON_FALLBACK = os.path.join(data_dir, "data.json")
+  storage.DB_PATH = os.path.join(data_dir, "data.sqlite")
+
+  def mutate(n):
+    def apply(state):
+      game = state["games"]["AAA111"]
+      game["assignment_version"] += 1
+      game["participants"][worker]["wish_list"].append({"id": f"w{worker}-{n}", "title": f"gift {n}"})
+    return apply
+
+  def run(offset):
+    for n in range(offset, rounds, 2):
+      storage.submit_edit(["AAA111"], mutate(n))
+
+  threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  storage.close_pool()
+
+
+class StorageTestCase(unittest.TestCase):
+  def setUp(self):
+    self.temp_dir = tempfile.TemporaryDirectory()
+    storage.DATA_DIR = self.temp_dir.name
+    storage.JSON_FALLBACK = os.path.join(self.temp_dir.name, "data.json")
+    storage.DB_PATH = os.path.join(self.temp_dir.name, "data.sqlite")
+
+  def tearDown(self):
+    storage.close_pool()
+    self.temp_dir.cleanup()
+
+  def _game(self, gid: str, names):
+    return {
+      "game_id": gid,
+      "title": f"Game {gid}",
+      "admin_password_hash": "sha256:x",
+      "created_at": "2025-01-01T00:00:00+00:00",
+      "updated_at": "2025-01-01T00:00:00+00:00",
+      "active": True,
+      "assignment_version": 0,
+      "any_revealed": False,
+      "participants": [
+        {
+          "id": f"p{i + 1}",
+          "person_id": None,
+          "name": name,
+          "token": f"{gid}-tok-{i}",
+          "assigned_to_participant_id": None,
+          "viewed": False,
+          "viewed_at": None,
+          "active": True,
+          "wish_list": [],
+        }
+        for i, name in enumerate(names)
+      ],
+    }
+
+
+class NormalizedStorageTests(StorageTestCase):
+  def test_migrates_legacy_kv_blob(self):
+    legacy = {
+      "games": {"AAA111": self._game("AAA111", ["Ana", "Luis", "Eva"])},
+      "people": [{"id": "u1", "name": "Ana", "active": True}],
+    }
+    legacy["games"]["AAA111"]["participants"][0]["wish_list"] = [{"id": "w1", "title": "Libro", "price": 10.0, "url": None}]
+    conn = sqlite3.connect(storage.DB_PATH)
+    conn.execute("CREATE TABLE kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("INSERT INTO kv(key, value) VALUES('state', ?)", (json.dumps(legacy),))
+    conn.commit()
+    conn.close()
+
+    state = storage.load_state()
+    self.assertEqual(state["games"]["AAA111"].pop("revision"), 1)
+    self.assertEqual(state, legacy)
+    conn = sqlite3.connect(storage.DB_PATH)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    self.assertNotIn("kv", tables)
+
+  def test_filtered_game_pages_search_an_index(self):
+    storage.load_state()
+    queries = [
+      ("g.active = ? AND (g.created_at, g.game_id) < (?, ?)", (1, "2030", "z"), "idx_games_active_created"),
+      ("g.title_key >= ? AND g.title_key < ?", ("nav", "nav\U0010ffff"), "idx_games_title_key"),
+    ]
+    with storage._get_pool().connection() as conn:
+      for where, params, index in queries:
+        plan = " ".join(row[3] for row in conn.execute(
+          f"EXPLAIN QUERY PLAN SELECT g.game_id FROM games g WHERE {where}"
+          " ORDER BY g.created_at DESC, g.game_id DESC LIMIT 10",
+          params,
+        ))
+        self.assertIn(f"SEARCH g USING COVERING INDEX {index}", plan)
+
+  def test_scoped_edit_only_writes_touched_game(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+      state["games"]["BBB222"] = self._game("BBB222", ["Carlos", "Diana", "Elena"])
+
+    conn = sqlite3.connect(storage.DB_PATH)
+    conn.execute("CREATE TABLE touched (tbl TEXT)")
+    for table in ("games", "participants", "wishlist_items"):
+      conn.execute(f"CREATE TRIGGER t_{table} AFTER UPDATE ON {table} BEGIN INSERT INTO touched VALUES('{table}'); END")
+    conn.commit()
+    conn.close()
+
+    with storage.edit_state(["AAA111"], include_people=False) as state:
+      self.assertEqual(list(state["games"]), ["AAA111"])
+      state["games"]["AAA111"]["participants"][1]["viewed"] = True
+
+    conn = sqlite3.connect(storage.DB_PATH)
+    touched = [row[0] for row in conn.execute("SELECT tbl FROM touched")]
+    conn.close()
+    # Besides the participant row, only the game's revision counter moves.
+    self.assertEqual(sorted(touched), ["games", "participants"])
+    reloaded = storage.load_game("AAA111")
+    self.assertEqual(reloaded["revision"], 2)
+    self.assertEqual(storage.load_game("BBB222")["revision"], 1)
+    self.assertTrue(reloaded["participants"][1]["viewed"])
+    self.assertFalse(storage.load_game("BBB222")["participants"][1]["viewed"])
+
+  def test_deleting_game_removes_its_rows(self):
+    with storage.edit_state() as state:
+      game = self._game("AAA111", ["Ana", "Luis", "Eva"])
+      game["participants"][0]["wish_list"] = [{"id": "w1", "title": "Libro", "price": None, "url": None}]
+      state["games"]["AAA111"] = game
+    with storage.edit_state(["AAA111"], include_people=False) as state:
+      del state["games"]["AAA111"]
+    self.assertIsNone(storage.load_game("AAA111"))
+    conn = sqlite3.connect(storage.DB_PATH)
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("participants", "wishlist_items")]
+    conn.close()
+    self.assertEqual(counts, [0, 0])
+
+
+  def test_export_does_not_hold_a_pooled_connection(self):
+    with storage.edit_state() as state:
+      state["people"] = [{"id": "u1", "name": "Ana", "active": True}]
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis"])
+    storage.close_pool()
+    with mock.patch.object(storage, "POOL_SIZE", 1):
+      export = storage.iter_export(batch_size=1)
+      self.assertEqual(next(export)[0], "person")  # snapshot open, download stalled
+      reader = threading.Thread(target=storage.load_game, args=("AAA111",))
+      reader.start()
+      reader.join(2)
+      self.assertFalse(reader.is_alive())
+      self.assertEqual([kind for kind, _ in export], ["game"])
+
+
+class WriteLockTests(StorageTestCase):
+  def test_unrelated_games_commit_while_another_is_held(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+      state["games"]["BBB222"] = self._game("BBB222", ["Carlos", "Diana", "Elena"])
+    inside = threading.Event()
+    release = threading.Event()
+
+    def slow_edit():
+      with storage.edit_state(["AAA111"], include_people=False) as state:
+        inside.set()
+        release.wait(5)
+        state["games"]["AAA111"]["title"] = "Slow"
+
+    worker = threading.Thread(target=slow_edit)
+    worker.start()
+    self.assertTrue(inside.wait(5))
+    with storage.edit_state(["BBB222"], include_people=False) as state:
+      state["games"]["BBB222"]["title"] = "Fast"
+    self.assertEqual(storage.load_game("BBB222")["title"], "Fast")
+    self.assertEqual(storage.load_game("AAA111")["title"], "Game AAA111")
+    release.set()
+    worker.join(5)
+    self.assertEqual(storage.load_game("AAA111")["title"], "Slow")
+
+  def test_rejects_games_outside_scope(self):
+    with self.assertRaises(RuntimeError):
+      with storage.edit_state(["AAA111"], include_people=False) as state:
+        state["games"]["BBB222"] = self._game("BBB222", ["Carlos", "Diana", "Elena"])
+    self.assertIsNone(storage.load_game("BBB222"))
+
+
+class GroupCommitTests(StorageTestCase):
+  def test_concurrent_edits_share_a_transaction(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", [f"P{i}" for i in range(9)])
+      state["games"]["BBB222"] = self._game("BBB222", ["Carlos", "Diana", "Elena"])
+    commits = []
+    storage.add_commit_listener(commits.append)
+    self.addCleanup(storage.remove_commit_listener, commits.append)
+    barrier = threading.Barrier(10)
+    results = {}
+
+    def view(i):
+      def mutate(state):
+        if i == 3:
+          state["games"]["AAA111"]["title"] = "Never committed"
+          raise ValueError("boom")
+        if i == 9:
+          state["games"]["BBB222"]["title"] = "Other game"
+          return "b"
+        state["games"]["AAA111"]["participants"][i]["viewed"] = True
+        return i
+      barrier.wait(5)
+      try:
+        gid = "BBB222" if i == 9 else "AAA111"
+        results[i] = storage.submit_edit([gid], mutate)
+      except ValueError as exc:
+        results[i] = exc
+
+    with mock.patch.object(storage, "GROUP_COMMIT_WINDOW_MS", 200):
+      threads = [threading.Thread(target=view, args=(i,)) for i in range(10)]
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join(10)
+    self.assertIsInstance(results.pop(3), ValueError)
+    self.assertEqual(results.pop(9), "b")
+    self.assertEqual(results, {i: i for i in range(9) if i != 3})
+    self.assertLess(len(commits), 10)
+    game = storage.load_game("AAA111")
+    self.assertEqual(game["title"], "Game AAA111")
+    self.assertEqual([p["viewed"] for p in game["participants"]], [i != 3 for i in range(9)])
+    self.assertEqual(storage.load_game("BBB222")["title"], "Other game")
+
+  def test_slow_transaction_does_not_hold_back_other_games(self):
+    from backend.repositories.games_repository import GameRepository
+
+    repo = GameRepository()
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+      state["games"]["BBB222"] = self._game("BBB222", ["Carlos", "Diana", "Elena"])
+    inside = threading.Event()
+    release = threading.Event()
+
+    def slow(state):
+      inside.set()
+      release.wait(5)
+      state["games"]["AAA111"]["title"] = "Slow"
+
+    def fast(state):
+      state["games"]["BBB222"]["title"] = "Fast"
+
+    with mock.patch.object(storage, "GROUP_COMMIT_WINDOW_MS", 50):
+      slow_worker = threading.Thread(target=repo.transact, args=("AAA111", slow))
+      slow_worker.start()
+      self.assertTrue(inside.wait(5))
+      fast_worker = threading.Thread(target=repo.transact, args=("BBB222", fast))
+      fast_worker.start()
+      fast_worker.join(2)
+      blocked = fast_worker.is_alive()
+      release.set()
+      slow_worker.join(5)
+      fast_worker.join(5)
+    self.assertFalse(blocked, "BBB222 waited for AAA111's mutator")
+    self.assertEqual(storage.load_game("BBB222")["title"], "Fast")
+    self.assertEqual(storage.load_game("AAA111")["title"], "Slow")
+
+  def test_batched_edits_report_their_own_phases(self):
+    from backend import slowlog
+
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+    spans = {}
+
+    def edit(name, delay):
+      def mutate(state):
+        time.sleep(delay)
+        state["games"]["AAA111"]["participants"][0 if name == "leader" else 1]["viewed"] = True
+
+      started = time.perf_counter()
+      with slowlog.span("transaction", 60000) as span:
+        storage.submit_edit(["AAA111"], mutate)
+      spans[name] = (span.phases, time.perf_counter() - started)
+
+    with mock.patch.object(storage, "GROUP_COMMIT_WINDOW_MS", 300):
+      leader = threading.Thread(target=edit, args=("leader", 0))
+      leader.start()
+      time.sleep(0.05)
+      follower = threading.Thread(target=edit, args=("follower", 0.2))
+      follower.start()
+      leader.join(5)
+      follower.join(5)
+    for phases, elapsed in spans.values():
+      self.assertLessEqual(sum(phases.values()), elapsed)  # nothing counted twice
+    self.assertLess(spans["leader"][0]["mutate"], 0.1)
+    self.assertGreaterEqual(spans["follower"][0]["mutate"], 0.2)
+    self.assertNotIn("commit", spans["follower"][0])
+
+  def test_failed_commit_reaches_every_caller(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+
+    def mutate(state):
+      state["games"]["AAA111"]["title"] = "X"
+
+    with mock.patch.object(storage, "_write_game_diff", side_effect=sqlite3.OperationalError("disk")):
+      with self.assertRaises(sqlite3.OperationalError):
+        storage.submit_edit(["AAA111"], mutate)
+    self.assertEqual(storage.load_game("AAA111")["title"], "Game AAA111")
+
+
+class CrossProcessWriteTests(StorageTestCase):
+  def test_workers_never_lose_updates(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva", "Marta"])
+    storage.close_pool()
+    workers, rounds = 4, 30
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+      ctx.Process(target=_stress_worker, args=(self.temp_dir.name, w, rounds)) for w in range(workers)
+    ]
+    for proc in procs:
+      proc.start()
+    for proc in procs:
+      proc.join(60)
+      self.assertEqual(proc.exitcode, 0)
+    game = storage.load_game("AAA111")
+    self.assertEqual(game["assignment_version"], workers * rounds)
+    for w, participant in enumerate(game["participants"]):
+      ids = sorted(item["id"] for item in participant["wish_list"])
+      self.assertEqual(ids, sorted(f"w{w}-{n}" for n in range(rounds)))
+
+  def test_conflicting_commit_is_rejected_and_retried(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+    with self.assertRaises(storage.WriteConflict):
+      with storage.edit_state(["AAA111"], include_people=False) as state:
+        conn = sqlite3.connect(storage.DB_PATH)
+        conn.execute("UPDATE games SET assignment_version = 7, revision = revision + 1 WHERE game_id = 'AAA111'")
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        conn.commit()
+        conn.close()
+        state["games"]["AAA111"]["assignment_version"] += 1
+    self.assertEqual(storage.load_game("AAA111")["assignment_version"], 7)
+    calls = []
+
+    def bump(state):
+      calls.append(1)
+      if len(calls) == 1:
+        conn = sqlite3.connect(storage.DB_PATH)
+        conn.execute("UPDATE games SET assignment_version = 8, revision = revision + 1 WHERE game_id = 'AAA111'")
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        conn.commit()
+        conn.close()
+      state["games"]["AAA111"]["assignment_version"] += 1
+
+    storage.submit_edit(["AAA111"], bump)
+    self.assertEqual(len(calls), 2)
+    self.assertEqual(storage.load_game("AAA111")["assignment_version"], 9)
+
+
+  def test_people_conflicts_compare_a_revision_not_the_directory(self):
+    with storage.edit_state() as state:
+      state["people"] = [{"id": "u1", "name": "Ana", "active": True}]
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis"])
+    storage.load_people()
+    with mock.patch.object(storage, "_fetch_people", side_effect=AssertionError("re-read the directory")):
+      with storage.edit_state([], include_people=True, optimistic=True) as state:
+        with storage.edit_state(["AAA111"], include_people=False) as other:
+          other["games"]["AAA111"]["title"] = "Moved on"
+        state["people"][0]["name"] = "Ana María"
+      self.assertEqual(storage.load_people()[0]["name"], "Ana María")
+      with self.assertRaises(storage.WriteConflict):
+        with storage.edit_state([], include_people=True, optimistic=True) as state:
+          with storage.edit_state([], include_people=True) as other:
+            other["people"][0]["active"] = False
+          state["people"][0]["name"] = "Ana"
+    self.assertEqual(storage.load_people(), [{"id": "u1", "name": "Ana María", "active": False}])
+
+
+class StateCacheTests(StorageTestCase):
+  def test_reads_follow_local_commits(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+    first = storage.load_game("AAA111")
+    self.assertIs(storage.load_game("AAA111"), first)
+    with storage.edit_state(["AAA111"], include_people=False) as state:
+      state["games"]["AAA111"]["title"] = "Renamed"
+    self.assertEqual(storage.load_game("AAA111")["title"], "Renamed")
+    self.assertEqual(first["title"], "Game AAA111")
+
+  def test_sees_writes_from_other_connections(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+    self.assertEqual(storage.load_game("AAA111")["title"], "Game AAA111")
+    conn = sqlite3.connect(storage.DB_PATH)
+    conn.execute("UPDATE games SET title = 'Elsewhere' WHERE game_id = 'AAA111'")
+    conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+    conn.commit()
+    conn.close()
+    self.assertEqual(storage.load_game("AAA111")["title"], "Elsewhere")
+
+
+class TokenIndexTests(StorageTestCase):
+  def test_tokens_follow_adds_and_removals(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis"])
+      state["games"]["BBB222"] = self._game("BBB222", ["Eva"])
+    self.assertEqual(storage.resolve_token("BBB222-tok-0"), ("BBB222", "p1"))
+    index = storage.participant_index("AAA111")
+    self.assertEqual(index.by_token["AAA111-tok-1"], 1)
+    self.assertEqual(index.by_id["p2"], 1)
+    with storage.edit_state(["AAA111"], include_people=False) as state:
+      participants = state["games"]["AAA111"]["participants"]
+      participants.pop(0)
+      participants.append(dict(participants[0], id="p3", token="AAA111-new"))
+    self.assertIsNone(storage.resolve_token("AAA111-tok-0"))
+    self.assertEqual(storage.resolve_token("AAA111-new"), ("AAA111", "p3"))
+    self.assertEqual(storage.participant_index("AAA111").by_id, {"p2": 0, "p3": 1})
+
+  def test_resolves_tokens_written_by_other_connections(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana"])
+    storage.load_state()
+    conn = sqlite3.connect(storage.DB_PATH)
+    conn.execute("UPDATE participants SET token = 'moved' WHERE game_id = 'AAA111'")
+    conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+    conn.commit()
+    conn.close()
+    self.assertEqual(storage.resolve_token("moved"), ("AAA111", "p1"))
+    self.assertIsNone(storage.resolve_token("AAA111-tok-0"))
+
+
+class BackupServiceTests(StorageTestCase):
+  def test_snapshot_rotation_and_status(self):
+    with storage.edit_state() as state:
+      state["games"]["AAA111"] = self._game("AAA111", ["Ana", "Luis", "Eva"])
+    service = BackupService(interval_seconds=0, keep=2)
+    paths = [service.run_once() for _ in range(3)]
+    self.assertEqual(service.list_backups(), [os.path.basename(p) for p in paths[1:]])
+    conn = sqlite3.connect(paths[-1])
+    self.assertEqual(conn.execute("SELECT title FROM games").fetchone()[0], "Game AAA111")
+    conn.close()
+    status = service.status()
+    self.assertLess(status["last_backup_age_seconds"], 60)
+    self.assertFalse(os.path.exists(storage.JSON_FALLBACK + ".bak"))
+
+  def test_backup_after_n_commits(self):
+    service = BackupService(interval_seconds=0, every_commits=2, keep=5)
+    service.start()
+    try:
+      for title in ("One", "Two"):
+        with storage.edit_state() as state:
+          state["games"]["AAA111"] = {**self._game("AAA111", ["Ana", "Luis", "Eva"]), "title": title}
+      for _ in range(100):
+        if service.list_backups():
+          break
+        threading.Event().wait(0.05)
+    finally:
+      service.stop()
+    self.assertEqual(len(service.list_backups()), 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
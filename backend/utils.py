@@ -1,7 +1,12 @@
 import os
+import random
 import secrets
 import string
-from typing import List, Dict, Any, Optional
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import metrics, slowlog
 
 try:
     import bcrypt  # type: ignore
@@ -27,10 +32,14 @@ def hash_password(password: str) -> str:
 
 def verify_password(password: str, stored_hash: str) -> bool:
     if stored_hash.startswith("$2"):
+        metrics.bcrypt_verifications.inc()
+        started = time.perf_counter()
         try:
             return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
         except Exception:
             return False
+        finally:
+            slowlog.record("bcrypt", time.perf_counter() - started)
     if stored_hash.startswith("sha256:"):
         import hashlib
 
@@ -38,29 +47,150 @@ def verify_password(password: str, stored_hash: str) -> bool:
     return False
 
 
-def derangement_assignment(ids: List[str]) -> Dict[str, str]:
+class DrawImpossibleError(ValueError):
+    """Raised when exclusions leave some participant with nobody valid to draw."""
+
+    def __init__(self, message: str, giver: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.giver = giver
+
+
+# One CSPRNG for every draw; SystemRandom keeps no state, so sharing it is safe.
+_rng = secrets.SystemRandom()
+
+
+def derangement_assignment(
+    ids: List[str],
+    exclusions: Optional[Iterable[Tuple[str, str]]] = None,
+    rng: Optional[random.Random] = None,
+    attempts: int = 64,
+) -> Dict[str, str]:
     """Return a mapping id -> assigned_id with no self-assignments.
-    Simple shuffle-with-retry suitable for small N.
-    Raises ValueError if not possible (N < 2).
+
+    Without exclusions the result is a uniformly random derangement, sampled by
+    rejecting shuffles with a fixed point (expected e ~ 2.72 shuffles, so O(n)).
+    `exclusions` is a set of forbidden (giver, receiver) pairs; pairs naming
+    unknown ids are ignored. Rejection sampling is tried first (still exactly
+    uniform over valid draws); if constraints are too tight for it, a randomized
+    matching solver finds a valid draw and mixes it with random swaps.
+    Raises ValueError for N < 2 and DrawImpossibleError if no valid draw exists.
     """
     n = len(ids)
     if n < 2:
         raise ValueError("At least 2 participants required for derangement")
-    for _ in range(1000):
-        shuffled = ids.copy()
-        secrets.SystemRandom().shuffle(shuffled)
+    if len(set(ids)) != n:
+        raise ValueError("Participant ids must be unique")
+    rng = rng or _rng
+    blocked = _blocked_receivers(ids, exclusions)
+    for _ in range(attempts if blocked else 1):
+        mapping = _uniform_derangement(ids, rng)
+        if all(mapping[g] not in blocked.get(g, ()) for g in blocked):
+            return mapping
+    metrics.draw_solver_fallbacks.inc()
+    return _constrained_assignment(ids, blocked, rng)
+
+
+def _blocked_receivers(
+    ids: List[str], exclusions: Optional[Iterable[Tuple[str, str]]]
+) -> Dict[str, Set[str]]:
+    known = set(ids)
+    blocked: Dict[str, Set[str]] = {}
+    for giver, receiver in exclusions or ():
+        if giver in known and receiver in known and giver != receiver:
+            blocked.setdefault(giver, set()).add(receiver)
+    return blocked
+
+
+def _uniform_derangement(ids: List[str], rng: random.Random) -> Dict[str, str]:
+    shuffled = list(ids)
+    shuffles = 0
+    while True:
+        rng.shuffle(shuffled)
+        shuffles += 1
         if all(a != b for a, b in zip(ids, shuffled)):
-            return {a: b for a, b in zip(ids, shuffled)}
-    # Last resort: perform a simple fix by swapping a conflicting pair
-    shuffled = ids.copy()
-    secrets.SystemRandom().shuffle(shuffled)
-    for i in range(n):
-        if ids[i] == shuffled[i]:
-            j = (i + 1) % n
-            shuffled[i], shuffled[j] = shuffled[j], shuffled[i]
-    if any(ids[i] == shuffled[i] for i in range(n)):
-        raise RuntimeError("Failed to compute derangement")
-    return {a: b for a, b in zip(ids, shuffled)}
+            metrics.draw_shuffles.inc(shuffles)
+            return dict(zip(ids, shuffled))
+
+
+def _constrained_assignment(
+    ids: List[str], blocked: Dict[str, Set[str]], rng: random.Random
+) -> Dict[str, str]:
+    """Random perfect matching giver -> receiver avoiding self and `blocked`."""
+
+    def allowed(giver: str, receiver: str) -> bool:
+        return giver != receiver and receiver not in blocked.get(giver, ())
+
+    assigned: Dict[str, str] = {}
+    owner: Dict[str, str] = {}
+
+    # Greedy pass: a few random picks from the free receivers settles almost
+    # everyone when constraints are sparse.
+    free = list(ids)
+    rng.shuffle(free)
+    position = {r: i for i, r in enumerate(free)}
+    givers = list(ids)
+    rng.shuffle(givers)
+    for giver in givers:
+        for _ in range(8):
+            if not free:
+                break
+            receiver = free[rng.randrange(len(free))]
+            if allowed(giver, receiver):
+                last = free.pop()
+                if last != receiver:
+                    free[position[receiver]] = last
+                    position[last] = position[receiver]
+                del position[receiver]
+                assigned[giver] = receiver
+                owner[receiver] = giver
+                break
+
+    # Augmenting paths (BFS, Kuhn) for whoever is left. If one cannot be
+    # augmented now it never can, so no complete draw exists.
+    for giver in givers:
+        if giver not in assigned:
+            _augment(giver, ids, allowed, assigned, owner, rng)
+
+    # Random transpositions that keep every constraint satisfied; the chain is
+    # symmetric, so it drifts towards the uniform distribution over valid draws.
+    n = len(ids)
+    for _ in range(4 * n):
+        a = ids[rng.randrange(n)]
+        b = ids[rng.randrange(n)]
+        ra, rb = assigned[a], assigned[b]
+        if a != b and allowed(a, rb) and allowed(b, ra):
+            assigned[a], assigned[b] = rb, ra
+    return {g: assigned[g] for g in ids}
+
+
+def _augment(
+    start: str,
+    ids: List[str],
+    allowed: Callable[[str, str], bool],
+    assigned: Dict[str, str],
+    owner: Dict[str, str],
+    rng: random.Random,
+) -> None:
+    unvisited = set(ids)
+    parent: Dict[str, str] = {}
+    queue = deque([start])
+    while queue:
+        giver = queue.popleft()
+        reachable = [r for r in unvisited if allowed(giver, r)]
+        rng.shuffle(reachable)
+        for receiver in reachable:
+            unvisited.discard(receiver)
+            parent[receiver] = giver
+            if receiver not in owner:
+                while receiver is not None:
+                    g = parent[receiver]
+                    previous = assigned.get(g)
+                    assigned[g] = receiver
+                    owner[receiver] = g
+                    receiver = previous
+                return
+            queue.append(owner[receiver])
+    raise DrawImpossibleError(f"No valid draw: participant {start} cannot be assigned anyone", start)
 
 
 def get_share_base_url(origin: Optional[str] = None) -> str:
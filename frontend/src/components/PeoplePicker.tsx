@@ -1,4 +1,4 @@
-import { useCallback, useEffect, useMemo, useState } from 'react'
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react'
 import Modal from './Modal'
 import Button from './Button'
 import { api } from '../lib/api'
@@ -18,40 +18,67 @@ type Props = {
   open: boolean
   onClose: () => void
   onConfirm: (selection: SelectionResult) => void
-  initialSelected?: string[]
+  initialSelected?: { id: string; name: string }[]
 }
 
+const PAGE_SIZE = 50
+const SEARCH_DEBOUNCE_MS = 250
+
 export default function PeoplePicker({ open, onClose, onConfirm, initialSelected = [] }: Props) {
   const { t } = useI18n()
   const [people, setPeople] = useState<Person[]>([])
   const [query, setQuery] = useState('')
   const [selected, setSelected] = useState<Record<string, boolean>>({})
+  // Cursor of the next page of the current search; null once the last page is in.
+  const [more, setMore] = useState<{ q: string; cursor: string } | null>(null)
+  const [loading, setLoading] = useState(false)
+  // Names of everyone seen or preselected, so selections survive a new search.
+  const known = useRef<Record<string, { id: string; name: string }>>({})
+  const latest = useRef(0)
 
-  const loadPeople = useCallback(async () => {
+  const loadPage = useCallback(async (q: string, cursor: string | null) => {
+    const requestId = ++latest.current
+    setLoading(true)
     try {
-      setPeople(await api.listPeople())
+      const page = await api.searchPeople(q, cursor, PAGE_SIZE)
+      if (requestId !== latest.current) return
+      page.items.forEach((p: Person) => { known.current[p.id] = p })
+      setPeople(prev => (cursor ? [...prev, ...page.items] : page.items))
+      setMore(page.nextCursor ? { q, cursor: page.nextCursor } : null)
     } catch {
       /* ignore */
+    } finally {
+      if (requestId === latest.current) setLoading(false)
     }
   }, [])
 
+  // The server does the prefix search; typing only fetches the first page of matches.
   useEffect(() => {
     if (!open) return
-    loadPeople()
-  }, [open, loadPeople])
+    const q = query.trim()
+    const timer = setTimeout(() => loadPage(q, null), q ? SEARCH_DEBOUNCE_MS : 0)
+    return () => clearTimeout(timer)
+  }, [open, query, loadPage])
 
   useEffect(() => {
     if (!open) return
     const sel: Record<string, boolean> = {}
-    ;(initialSelected || []).forEach(id => { if (id) sel[id] = true })
+    ;(initialSelected || []).forEach(p => {
+      if (!p.id) return
+      sel[p.id] = true
+      known.current[p.id] = known.current[p.id] || p
+    })
     setSelected(sel)
   }, [open, initialSelected])
 
-  const filtered = useMemo(() => {
-    const q = query.trim().toLowerCase()
-    if (!q) return people
-    return people.filter(p => p.name.toLowerCase().includes(q))
-  }, [people, query])
+  const loadMore = useCallback(() => {
+    if (more && !loading) loadPage(more.q, more.cursor)
+  }, [more, loading, loadPage])
+
+  const onScroll = (e: React.UIEvent<HTMLDivElement>) => {
+    const el = e.currentTarget
+    if (el.scrollTop + el.clientHeight >= el.scrollHeight - 40) loadMore()
+  }
 
   const count = useMemo(() => Object.values(selected).filter(Boolean).length, [selected])
   const minParticipants = validationRules.game.minParticipants
@@ -63,8 +90,8 @@ export default function PeoplePicker({ open, onClose, onConfirm, initialSelected
         value={query}
         onChange={e=>setQuery(e.target.value)}
       />
-      <div className="max-h-80 overflow-auto rounded-2xl border border-white/20 p-2 bg-white/5">
-        {filtered.map(p => (
+      <div className="max-h-80 overflow-auto rounded-2xl border border-white/20 p-2 bg-white/5" onScroll={onScroll}>
+        {people.map(p => (
           <label key={p.id} className={`flex items-center gap-2 px-2 py-1 rounded-xl ${p.active ? '' : 'opacity-60'}`}>
             <input type="checkbox" disabled={!p.active}
               checked={!!selected[p.id]}
@@ -73,7 +100,10 @@ export default function PeoplePicker({ open, onClose, onConfirm, initialSelected
             <span><AnimatedText watch={`picker-${p.id}-${p.name}`}>{p.name}</AnimatedText></span>
           </label>
         ))}
-        {filtered.length === 0 && <div className="text-sm text-slate-300"><AnimatedText>{t('peoplePicker.noResults')}</AnimatedText></div>}
+        {people.length === 0 && !loading && <div className="text-sm text-slate-300"><AnimatedText>{t('peoplePicker.noResults')}</AnimatedText></div>}
+        {more && (
+          <Button variant="ghost" onClick={loadMore} disabled={loading}>{t('peoplePicker.loadMore')}</Button>
+        )}
       </div>
       <div className="flex items-center justify-between">
         <span className="text-sm text-slate-300">
@@ -83,7 +113,9 @@ export default function PeoplePicker({ open, onClose, onConfirm, initialSelected
           <Button variant="ghost" onClick={onClose}>{t('buttons.cancel')}</Button>
           <Button
             onClick={() => {
-              const selectedPeople = people.filter(p => selected[p.id])
+              const selectedPeople = Object.keys(selected)
+                .filter(id => selected[id] && known.current[id])
+                .map(id => known.current[id])
               onConfirm({
                 ids: selectedPeople.map(p => p.id),
                 people: selectedPeople.map(p => ({ id: p.id, name: p.name })),
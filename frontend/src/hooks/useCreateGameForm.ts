@@ -22,8 +22,10 @@ export function useCreateGameForm(initialTitle = 'Amigo Secreto') {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
 
-  const selectedDirectoryIds = useMemo(
-    () => selectedPeople.filter(person => person.source === 'directory' && person.personId).map(person => person.personId!) ,
+  const selectedDirectoryPeople = useMemo(
+    () => selectedPeople
+      .filter(person => person.source === 'directory' && person.personId)
+      .map(person => ({ id: person.personId!, name: person.name })),
     [selectedPeople],
   )
   const participantCount = selectedPeople.length
@@ -153,7 +155,7 @@ export function useCreateGameForm(initialTitle = 'Amigo Secreto') {
     closePicker,
     handlePickerConfirm,
     selectedPeople,
-    selectedDirectoryIds,
+    selectedDirectoryPeople,
     participantCount,
     handleSubmit,
     loading,
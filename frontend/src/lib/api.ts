@@ -22,7 +22,7 @@ type CreateGameOptions = {
   participants?: string[]
 }
 
-async function request(path: string, init?: RequestInit) {
+async function send(path: string, init?: RequestInit): Promise<{ data: any; headers: Headers }> {
   const res = await fetch(`${API_BASE}${path}`, {
     headers: { 'Content-Type': 'application/json', ...(init?.headers || {}) },
     ...init,
@@ -62,13 +62,29 @@ async function request(path: string, init?: RequestInit) {
     throw err
   }
 
-  if (isNoContent) return null
+  if (isNoContent) return { data: null, headers: res.headers }
   if (contentType.includes('application/json')) {
     const text = await res.text()
-    if (!text) return null
-    return JSON.parse(text)
+    return { data: text ? JSON.parse(text) : null, headers: res.headers }
   }
-  return null
+  return { data: null, headers: res.headers }
+}
+
+async function request(path: string, init?: RequestInit) {
+  return (await send(path, init)).data
+}
+
+// Follows X-Next-Cursor until the last page; each call is one bounded page on the server.
+async function requestAllPages(path: string, init?: RequestInit) {
+  const items: any[] = []
+  let cursor: string | null = null
+  do {
+    const sep = path.includes('?') ? '&' : '?'
+    const page = await send(cursor ? `${path}${sep}cursor=${encodeURIComponent(cursor)}` : path, init)
+    items.push(...(page.data || []))
+    cursor = page.headers.get('X-Next-Cursor')
+  } while (cursor)
+  return items
 }
 
 export const api = {
@@ -107,7 +123,7 @@ export const api = {
   reactivate: (gameId: string, adminPassword: string, token: string) =>
     request(`/api/games/${gameId}/${token}/reactivate`, { method: 'POST', headers: { 'X-Admin-Password': adminPassword } }),
 
-  listGames: () => request('/api/games'),
+  listGames: () => requestAllPages('/api/games?limit=500'),
   updateGameTitle: (gameId: string, adminPassword: string, title: string) =>
     request(`/api/games/${gameId}`, { method: 'PATCH', headers: { 'X-Admin-Password': adminPassword }, body: JSON.stringify({ title }) }),
   toggleGameActive: (gameId: string, adminPassword: string, active: boolean) =>
@@ -118,7 +134,15 @@ export const api = {
     request(`/api/games/${gameId}`, { method: 'DELETE', headers: { 'X-Admin-Password': adminPassword } }),
 
   // People directory (global)
-  listPeople: () => request('/api/people'),
+  listPeople: () => requestAllPages('/api/people?limit=1000'),
+  // One page of the directory; `q` matches the start of names, ignoring case and accents.
+  searchPeople: async (q: string, cursor?: string | null, limit = 50) => {
+    const params = new URLSearchParams({ limit: String(limit) })
+    if (q) params.set('q', q)
+    if (cursor) params.set('cursor', cursor)
+    const page = await send(`/api/people?${params}`)
+    return { items: (page.data || []) as any[], nextCursor: page.headers.get('X-Next-Cursor') }
+  },
   addPeople: (names: string[], masterPassword?: string) =>
     request('/api/people', { method: 'POST', headers: masterPassword ? { 'X-Master-Password': masterPassword } : {}, body: JSON.stringify({ names }) }),
   renamePerson: (personId: string, name: string, masterPassword?: string) =>
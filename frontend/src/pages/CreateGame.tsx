@@ -29,7 +29,7 @@ export default function CreateGame() {
     closePicker,
     handlePickerConfirm,
     selectedPeople,
-    selectedDirectoryIds,
+    selectedDirectoryPeople,
     participantCount,
     handleSubmit,
     loading,
@@ -120,7 +120,7 @@ export default function CreateGame() {
         open={pickerOpen}
         onClose={closePicker}
         onConfirm={handlePickerConfirm}
-        initialSelected={selectedDirectoryIds}
+        initialSelected={selectedDirectoryPeople}
       />
     </Layout>
   )